@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Amion Stand-in Server
+
+Local HTTP server that answers fetch_availability.py's individual schedule
+requests, so concurrency, retries, resume and --refresh can be exercised
+without touching Amion. The provider and month are read from the query
+string (Ui=<prefix>*<Last, First>&Mo=<M>-<YY>), exactly as build_url()
+writes them.
+
+Each page is served from --fixtures when the directory holds a saved page
+named like the fetcher's output (schedule_<Last>_<First>_<MM>_<YYYY>.html);
+otherwise a synthetic calendar is generated, deterministic per provider,
+month and --revision. Responses carry an ETag and honour If-None-Match.
+
+Usage:
+    python -m analysis.amion_standin                       # port 8000
+    python -m analysis.amion_standin --port 8001 --fail-every 7 --latency 0.05
+    python -m analysis.amion_standin --fixtures saved_pages/
+    python -m analysis.amion_standin --revision 2 --revise "Shah, Hely"
+
+    # then, in another shell
+    python fetch_availability.py --provider-file roster.txt --months 3 4 5 \\
+        --year 2026 --output-dir /tmp/avail --jobs 6 --rate 0 \\
+        --base-url http://127.0.0.1:8000/cgi-bin/ocs
+"""
+
+import argparse
+import calendar
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ── Project root setup ──────────────────────────────────────────────────────
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from fetch_availability import make_filename
+
+
+def synthetic_page(name, month, year, revision=""):
+    """Amion-style individual schedule page with random availability.
+
+    Roughly 60% of days are available, 20% unavailable and 20% blank.
+    """
+    rng = random.Random(f"{name}|{month}|{year}|{revision}")
+    n_days = calendar.monthrange(year, month)[1]
+    rows = []
+    for first in range(1, n_days + 1, 7):
+        days = range(first, min(n_days, first + 6) + 1)
+        rows.append('<tr bgcolor="#f6deac">'
+                    + "".join(f"<td>{d} {calendar.month_name[month]}</td>" for d in days)
+                    + "</tr>")
+        cells = []
+        for _ in days:
+            r = rng.random()
+            if r < 0.6:
+                img = '<img src="../oci/wp_av.gif">'
+            elif r < 0.8:
+                img = '<img src="../oci/wp_unav.gif">'
+            else:
+                img = ""
+            cells.append(f"<td>{img}<table><tr><td>shift</td></tr></table></td>")
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+    return (f"<html><head><TITLE>Schedule for {name}, {calendar.month_name[month]} "
+            f"{year}</TITLE></head><body><table border=1>{''.join(rows)}</table>"
+            f"</body></html>")
+
+
+def make_handler(args):
+    """Request handler class bound to the server's options."""
+    counter = {"requests": 0, "failed": 0, "not_modified": 0}
+    lock = threading.Lock()
+    revised = set(args.revise or [])
+
+    class StandinHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        stats = counter
+
+        def log_message(self, fmt, *log_args):
+            if args.verbose:
+                super().log_message(fmt, *log_args)
+
+        def _send(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            try:
+                name = query["Ui"][0].split("*")[-1]
+                mo, yy = query["Mo"][0].split("-")
+                month, year = int(mo), 2000 + int(yy)
+            except (KeyError, IndexError, ValueError):
+                self._send(400, b"missing or malformed Ui/Mo")
+                return
+
+            with lock:
+                counter["requests"] += 1
+                fail = args.fail_every and counter["requests"] % args.fail_every == 0
+                if fail:
+                    counter["failed"] += 1
+            if args.latency:
+                time.sleep(args.latency)
+            if fail:
+                self._send(503, b"busy")
+                return
+
+            fixture = None
+            if args.fixtures:
+                fixture = os.path.join(
+                    args.fixtures,
+                    os.path.splitext(make_filename(name, month, year))[0] + ".html")
+            if fixture and os.path.isfile(fixture):
+                with open(fixture, "rb") as f:
+                    body = f.read()
+            else:
+                revision = args.revision if not revised or name in revised else ""
+                body = synthetic_page(name, month, year, revision).encode("utf-8")
+
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            if self.headers.get("If-None-Match") == etag:
+                with lock:
+                    counter["not_modified"] += 1
+                self._send(304, headers={"ETag": etag})
+                return
+            self._send(200, body, {"ETag": etag,
+                                   "Content-Type": "text/html; charset=utf-8"})
+
+    return StandinHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for Amion schedule pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fixtures", default=None,
+                        help="Directory of saved pages named schedule_<Last>_<First>_<MM>_<YYYY>.html")
+    parser.add_argument("--revision", default="",
+                        help="Salt for synthetic pages; change it to simulate schedule edits")
+    parser.add_argument("--revise", nargs="+", metavar="PROVIDER",
+                        help="Apply --revision only to these providers (\"Last, First\")")
+    parser.add_argument("--fail-every", type=int, default=0,
+                        help="Answer every Nth request with HTTP 503 (default: never)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds to sleep before each response")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    handler = make_handler(args)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Serving Amion stand-in on http://{args.host}:{args.port}/cgi-bin/ocs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = handler.stats
+        print(f"\n{stats['requests']} requests, {stats['failed']} failed (503), "
+              f"{stats['not_modified']} not modified (304)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
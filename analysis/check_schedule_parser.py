@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Schedule Parser Backend Check
+
+Golden-output equivalence check and throughput benchmark for the two
+parse_schedule backends (see parse_schedule.py):
+
+  - every monthly HTML file must parse to identical output with the fast
+    tokenizer and with the standard-library HTMLParser
+  - each backend's parse throughput is reported in MB/s
+
+A built-in set of synthetic pages covering edge-case markup (self-closing
+table/tr/td/font tags, stray "<" outside cells) is checked alongside the
+files.
+
+Exits non-zero if any page differs. Pages that make the fast backend fall
+back to HTMLParser are listed separately (their output is trivially equal).
+
+Usage:
+    python -m analysis.check_schedule_parser
+    python -m analysis.check_schedule_parser --repeat 10
+    python -m analysis.check_schedule_parser path/to/2026-03.html ...
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+# ── Project root setup ──────────────────────────────────────────────────────
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from parse_schedule import (
+    BACKENDS, AmionScheduleParser, FastPathUnsupported, extract_year_from_html,
+    fast_parse, parse_html,
+)
+
+DEFAULT_GLOBS = [
+    os.path.join(_PROJECT_ROOT, "input", "monthlySchedules", "*.html"),
+    os.path.join(_PROJECT_ROOT, "input", "*.html"),
+]
+
+# Edge-case markup both backends must agree on. Each body is appended to a
+# page holding a header row for services S0-S2.
+_SYNTHETIC_HEAD = (
+    "<title>Schedule 3/2 to 3/29, 2026</title>"
+    '<table border="1"><tr><td>Date</td><td>S0</td><td>S1</td><td>S2</td></tr>'
+)
+SYNTHETIC_CASES = {
+    "self-closing td": "<tr><td>Mon 3/2</td><td/><td>Smith, J</td></tr></table>",
+    "self-closing td (spaced)": "<tr><td>Mon 3/2</td><td /><td>Smith, J</td></tr></table>",
+    "td with space after slash": "<tr><td>Mon 3/2</td><td / >Doe, A</td><td>Smith, J</td></tr></table>",
+    "td with unquoted value before slash": "<tr><td>Mon 3/2</td><td a=b/>Doe, A</td><td>Smith, J</td></tr></table>",
+    "self-closing tr": "<tr/><tr><td>Mon 3/2</td><td>Doe, A</td><td>Smith, J</td></tr></table>",
+    "self-closing tr inside row": "<tr><td>Mon 3/2</td><tr/><td>Doe, A</td></tr></table>",
+    "self-closing table": '<table border="1"/><tr><td>Mon 3/2</td><td>Doe, A</td></tr></table>',
+    "self-closing nested table": "<tr><td>Mon 3/2</td><td><table/>Doe, A</td></tr></table>",
+    "self-closing footnote font": (
+        '<tr><td>Mon 3/2</td><td>Doe, A<font style="font-size:8px"/>2</td></tr></table>'),
+    "stray '<' in a cell": "<tr><td>Mon 3/2</td><td>a<b Doe, A</td></tr></table>",
+    "stray '<' outside cells": (
+        '</table>a<b<table border="1"><tr><td>Mon 3/2</td><td>Doe, A</td></tr></table>'),
+    "stray '<' between rows": "<tr><td>Mon 3/2</td><td>Doe, A</td></tr>x<y<tr><td>Tue 3/3</td></tr></table>",
+}
+
+
+def synthetic_pages():
+    """(name, html) pairs for SYNTHETIC_CASES."""
+    return [(f"<synthetic: {name}>", _SYNTHETIC_HEAD + body)
+            for name, body in SYNTHETIC_CASES.items()]
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _snapshot(parser):
+    """Everything parse_schedule() returns, plus the parser's row bookkeeping."""
+    return (parser.year, parser.services, parser.schedule,
+            parser.header_row_index, parser.row_count, parser.table_count)
+
+
+def uses_fast_path(html):
+    """True if the fast backend handles html without falling back."""
+    parser = AmionScheduleParser()
+    parser.year = extract_year_from_html(html)
+    try:
+        fast_parse(parser, html)
+    except FastPathUnsupported:
+        return False
+    return True
+
+
+def check_equivalence(pages):
+    """Compare backend outputs per file.
+
+    Returns:
+        (mismatched, fell_back) — lists of file names
+    """
+    mismatched = []
+    fell_back = []
+    for path, html in pages:
+        name = os.path.basename(path)
+        if not uses_fast_path(html):
+            fell_back.append(name)
+        outputs = [_snapshot(parse_html(html, backend)) for backend in BACKENDS]
+        if any(out != outputs[0] for out in outputs[1:]):
+            mismatched.append(name)
+    return mismatched, fell_back
+
+
+def benchmark(pages, repeat):
+    """Best-of-repeat parse throughput per backend over all pages.
+
+    Returns:
+        dict: backend -> (seconds for one pass, MB/s)
+    """
+    total_mb = sum(len(html.encode("utf-8")) for _, html in pages) / 1e6
+    results = {}
+    for backend in BACKENDS:
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _, html in pages:
+                parse_html(html, backend)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        results[backend] = (best, total_mb / best if best else float("inf"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark schedule parser backends")
+    parser.add_argument("files", nargs="*",
+                        help="Monthly HTML files (default: input/monthlySchedules/*.html "
+                             "and input/*.html)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Benchmark passes per backend; the fastest is reported (default: 3)")
+    args = parser.parse_args()
+
+    paths = args.files or sorted(p for g in DEFAULT_GLOBS for p in glob.glob(g))
+    if not paths:
+        print("No schedule HTML files found.")
+        return 1
+    pages = [(p, _read(p)) for p in paths]
+    total_mb = sum(len(html.encode("utf-8")) for _, html in pages) / 1e6
+    print(f"{len(pages)} files, {total_mb:.2f} MB")
+
+    checked = pages + synthetic_pages()
+    mismatched, fell_back = check_equivalence(checked)
+    print(f"\nEquivalence: {len(checked) - len(mismatched)}/{len(checked)} identical "
+          f"({len(SYNTHETIC_CASES)} synthetic)")
+    for name in mismatched:
+        print(f"  MISMATCH: {name}")
+    if fell_back:
+        print(f"  {len(fell_back)} file(s) used the HTMLParser fallback: {', '.join(fell_back)}")
+
+    print(f"\n{'Backend':<12} {'Time':>9} {'MB/s':>8}")
+    results = benchmark(pages, args.repeat)
+    for backend, (seconds, mbps) in results.items():
+        print(f"{backend:<12} {seconds * 1000:>7.1f}ms {mbps:>8.2f}")
+    base = results["htmlparser"][0]
+    print(f"\nfast speedup: {base / results['fast'][0]:.2f}x")
+
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1032,7 +1032,7 @@ def main():
     providers = load_providers()
     tags_data = load_tags()
     sites_demand = load_sites()
-    unavailable_dates = load_availability()
+    unavailable_dates = load_availability(BLOCK_3_START, BLOCK_3_END)
     name_map, unmatched = build_name_map(providers, unavailable_dates)
 
     prior_actuals_path = os.path.join(_PROJECT_ROOT, "output", "prior_actuals.json")
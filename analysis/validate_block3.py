@@ -41,13 +41,13 @@ _PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from parse_schedule import parse_schedule, merge_schedules
-from name_match import to_canonical, match_provider, clean_html_provider
-from block.recalculate_prior_actuals import classify_service, parse_date
+from name_match import match_provider
+import schedule_corpus
+from block.recalculate_prior_actuals import classify_service
 from block.engines.shared.loader import (
     load_providers, load_tags, load_sites, load_availability,
     build_name_map, build_periods, get_eligible_sites, has_tag,
-    get_tag_rules, SITE_PCT_MAP, PCT_TO_SITES,
+    get_tag_rules, is_available, SITE_PCT_MAP, PCT_TO_SITES,
 )
 
 
@@ -144,66 +144,50 @@ def parse_block3():
     Returns all assignments including excluded/night/swing — callers filter.
     Moonlighting shifts are excluded here (Section 1.3 Classification Notes).
     """
-    all_months = []
     for fname in BLOCK_3_FILES:
         fpath = os.path.join(MONTHLY_DIR, fname)
         if not os.path.exists(fpath):
             print(f"  WARNING: Missing {fpath}")
-            continue
-        month_data = parse_schedule(fpath)
-        all_months.append(month_data)
+    for fname, month_data in schedule_corpus.load_months(MONTHLY_DIR, BLOCK_3_FILES):
         print(f"  Parsed {fname}: {len(month_data['schedule'])} days, "
               f"{len(month_data['services'])} services")
 
-    merged = merge_schedules(all_months)
+    # Rows come with junk entries (OPEN SHIFT, RESIDENT, etc.) already dropped,
+    # classified per service and hours (Section 1.3)
+    rows = schedule_corpus.assignment_rows(MONTHLY_DIR, BLOCK_3_FILES, classify_service,
+                                           by_hours=True)
 
     assignments = []
+    site_cache = {}
 
-    for day in merged["schedule"]:
-        raw_date = day["date"]
-        try:
-            d = parse_date(raw_date)
-        except Exception:
-            continue
+    for row in rows:
+        d = row["date"]
 
         # Filter to Block 3 date range
-        if d < BLOCK_3_START or d > BLOCK_3_END:
+        if d is None or d < BLOCK_3_START or d > BLOCK_3_END:
             continue
 
-        for a in day["assignments"]:
-            provider_raw = a["provider"]
-            if not provider_raw:
-                continue
-
-            # Clean junk entries (OPEN SHIFT, RESIDENT, etc.)
-            cleaned = clean_html_provider(provider_raw)
-            if not cleaned:
-                continue
-
-            # Classify service (Section 1.3)
-            svc_type = classify_service(a["service"], a["hours"])
-
-            # Skip moonlighting (Section 1.3 Classification Notes)
-            if a["moonlighting"]:
-                continue
-
-            # Map service to site
-            site = service_to_site(a["service"])
-
-            canonical = to_canonical(cleaned)
+        # Skip moonlighting (Section 1.3 Classification Notes)
+        if row["moonlighting"]:
+            continue
 
-            assignments.append({
-                "provider": canonical,
-                "html_provider": provider_raw,
-                "date": d,
-                "day_of_week": day["day_of_week"],
-                "service": a["service"],
-                "hours": a["hours"],
-                "site": site,
-                "service_type": svc_type,
-                "moonlighting": False,  # already filtered
-                "note": a.get("note", ""),
-            })
+        # Map service to site
+        service = row["service"]
+        if service not in site_cache:
+            site_cache[service] = service_to_site(service)
+
+        assignments.append({
+            "provider": row["canonical"],
+            "html_provider": row["html_provider"],
+            "date": d,
+            "day_of_week": row["day_of_week"],
+            "service": service,
+            "hours": row["hours"],
+            "site": site_cache[service],
+            "service_type": row["service_class"],
+            "moonlighting": False,  # already filtered
+            "note": row["note"],
+        })
 
     return assignments
 
@@ -720,9 +704,8 @@ def check_availability(day_assignments, providers, unavailable_dates, name_map):
         if json_name is None:
             continue
 
-        unav = unavailable_dates.get(json_name, set())
         date_str = a["date"].strftime("%Y-%m-%d")
-        if date_str in unav:
+        if not is_available(pname, json_name, [date_str], unavailable_dates):
             key = (pname, a["date"])
             if key not in seen:
                 seen[key] = {
@@ -946,7 +929,7 @@ def main():
     providers = load_providers()
     tags_data = load_tags()
     sites_demand = load_sites()
-    unavailable_dates = load_availability()
+    unavailable_dates = load_availability(BLOCK_3_START, BLOCK_3_END)
     name_map, unmatched = build_name_map(providers, unavailable_dates)
 
     print(f"  Providers: {len(providers)}")
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Consolidated provider availability store (SQLite).
+
+Replaces walking ~1,000 per-provider-month JSON files in
+input/individualSchedules/ with one indexed SQLite file that lives in the
+same directory. fetch_availability.py writes into it alongside the JSONs,
+and every availability reader queries it when it is current (falling back
+to the directory walk when it is missing or stale).
+
+Tables:
+  provider_months(name, year, month, source)  — one row per provider-month
+  days(name, date, status)                    — one row per provider-day
+  files(fname, mtime_ns)                      — the JSONs the rows came from
+
+The store is current when the directory's JSONs (names and mtimes) match the
+files table. JSONs written without the store (fetch_availability.py
+--no-store, other tools, hand edits), or deleted since, make it stale until
+the next import.
+
+Usage:
+    from availability_store import open_store, load_unavailable_dates, query_days
+
+    # One-shot import of the existing JSON directory
+    python availability_store.py import
+    python availability_store.py import --dir input/individualSchedules
+
+    # Cold-start load time and peak memory: store vs directory walk
+    python availability_store.py compare
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.path.join(SCRIPT_DIR, "input", "individualSchedules")
+STORE_FILENAME = "availability.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS provider_months (
+    name   TEXT NOT NULL,
+    year   INTEGER NOT NULL,
+    month  INTEGER NOT NULL,
+    source TEXT,
+    PRIMARY KEY (name, year, month)
+);
+CREATE TABLE IF NOT EXISTS days (
+    name   TEXT NOT NULL,
+    date   TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (name, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_days_date ON days (date);
+CREATE INDEX IF NOT EXISTS idx_days_status_date ON days (status, date);
+CREATE TABLE IF NOT EXISTS files (
+    fname    TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+# ---------------------------------------------------------------------------
+# Connection
+# ---------------------------------------------------------------------------
+
+def store_path(directory=None):
+    """Path of the store file for an availability directory."""
+    return os.path.join(directory or DEFAULT_DIR, STORE_FILENAME)
+
+
+def has_store(directory=None):
+    """True if the directory has a consolidated store file."""
+    return os.path.isfile(store_path(directory))
+
+
+def json_files(directory=None):
+    """Availability JSONs in directory: {filename: mtime_ns}.
+
+    Dotfiles are the fetcher's own bookkeeping and are not listed.
+    """
+    files = {}
+    with os.scandir(directory or DEFAULT_DIR) as it:
+        for entry in it:
+            if entry.name.startswith(".") or not entry.name.endswith(".json"):
+                continue
+            if entry.is_file():
+                files[entry.name] = entry.stat().st_mtime_ns
+    return files
+
+
+def store_is_current(directory=None):
+    """True if the store exists and was built from the directory's JSONs as
+    they are now — same files, none modified since they were stored."""
+    if not has_store(directory):
+        return False
+    try:
+        conn = sqlite3.connect(store_path(directory))
+        try:
+            stored = dict(conn.execute("SELECT fname, mtime_ns FROM files"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False  # e.g. a store from before the files table existed
+    return stored == json_files(directory)
+
+
+def open_store(path=None):
+    """Open (creating if needed) the store at path and ensure the schema."""
+    conn = sqlite3.connect(path or store_path())
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+def _record_file(conn, directory, fname):
+    """Record the current mtime of a JSON whose contents are now stored."""
+    try:
+        mtime_ns = os.stat(os.path.join(directory, fname)).st_mtime_ns
+    except OSError:
+        return
+    conn.execute("INSERT OR REPLACE INTO files (fname, mtime_ns) VALUES (?, ?)",
+                 (fname, mtime_ns))
+
+
+def upsert_month(conn, name, month, year, days, source=None):
+    """Replace one provider-month with freshly fetched days.
+
+    Args:
+        conn: store connection
+        name: provider name as shown in Amion ("Last, First")
+        month, year: integers
+        days: [{"date": "YYYY-MM-DD", "status": ...}, ...]
+        source: filename of the JSON just written with the same days, next
+            to the store; recorded so the store stays current
+    """
+    name = name.strip()
+    first = f"{year:04d}-{month:02d}-01"
+    last = f"{year:04d}-{month:02d}-31"
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO provider_months (name, year, month, source) "
+            "VALUES (?, ?, ?, ?)", (name, year, month, source))
+        conn.execute("DELETE FROM days WHERE name = ? AND date BETWEEN ? AND ?",
+                     (name, first, last))
+        conn.executemany(
+            "INSERT OR REPLACE INTO days (name, date, status) VALUES (?, ?, ?)",
+            [(name, d["date"], d.get("status", "blank")) for d in days])
+        if source:
+            directory = os.path.dirname(
+                conn.execute("PRAGMA database_list").fetchone()[2])
+            _record_file(conn, directory, source)
+
+
+def import_directory(directory=None, path=None):
+    """Rebuild the store from the availability JSONs in directory.
+
+    Existing rows are dropped first, so days cleared and files deleted since
+    the last import do not linger. Mirrors the directory walk in
+    load_availability(): unreadable files and files without a name are
+    skipped, and when two files of this import cover the same provider-day,
+    "unavailable" wins.
+
+    Returns:
+        (files_imported, files_skipped)
+    """
+    directory = directory or DEFAULT_DIR
+    conn = open_store(path or store_path(directory))
+    imported = 0
+    skipped = 0
+
+    with conn:
+        conn.execute("DELETE FROM days")
+        conn.execute("DELETE FROM provider_months")
+        conn.execute("DELETE FROM files")
+        for fname in sorted(os.listdir(directory)):
+            if not fname.endswith(".json"):
+                continue
+            # Stat before reading: a file rewritten mid-import stays stale
+            if not fname.startswith("."):
+                _record_file(conn, directory, fname)
+            try:
+                with open(os.path.join(directory, fname)) as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                skipped += 1
+                continue
+
+            name = data.get("name", "").strip()
+            if not name:
+                skipped += 1
+                continue
+
+            conn.execute(
+                "INSERT OR REPLACE INTO provider_months (name, year, month, source) "
+                "VALUES (?, ?, ?, ?)",
+                (name, data.get("year"), data.get("month"), fname))
+            conn.executemany(
+                "INSERT INTO days (name, date, status) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, date) DO UPDATE SET status = "
+                "CASE WHEN days.status = 'unavailable' THEN days.status "
+                "ELSE excluded.status END",
+                [(name, d["date"], d.get("status", "blank"))
+                 for d in data.get("days", [])])
+            imported += 1
+
+    conn.close()
+    return imported, skipped
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def query_days(conn, name=None, start=None, end=None, status=None):
+    """Query provider-days by provider, inclusive date range and/or status.
+
+    Returns:
+        list of (name, date, status) tuples ordered by name, date
+    """
+    return _select_days(conn, name, start, end, status).fetchall()
+
+
+def _select_days(conn, name=None, start=None, end=None, status=None):
+    """Cursor over matching (name, date, status) rows."""
+    clauses = []
+    params = []
+    if name is not None:
+        clauses.append("name = ?")
+        params.append(name)
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(str(start)[:10])
+    if end is not None:
+        clauses.append("date <= ?")
+        params.append(str(end)[:10])
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(
+        f"SELECT name, date, status FROM days{where} ORDER BY name, date",
+        params)
+
+
+def provider_names(conn):
+    """All provider names with at least one stored month."""
+    return [r[0] for r in conn.execute(
+        "SELECT DISTINCT name FROM provider_months ORDER BY name")]
+
+
+def load_unavailable_dates(path=None, start=None, end=None):
+    """Store equivalent of the directory walk in load_availability().
+
+    Returns:
+        dict: provider_name -> set of unavailable date strings. Providers
+        with no unavailable days still get an (empty) entry.
+    """
+    conn = sqlite3.connect(path or store_path())
+    try:
+        availability = {n: set() for n in provider_names(conn)}
+        for name, d_str, _ in _select_days(conn, start=start, end=end,
+                                           status="unavailable"):
+            availability.setdefault(name, set()).add(d_str)
+    finally:
+        conn.close()
+    return availability
+
+
+def load_status_map(path=None, start=None, end=None):
+    """All statuses, for calendar rendering.
+
+    Returns:
+        dict: provider_name -> {date_str: status}
+    """
+    conn = sqlite3.connect(path or store_path())
+    try:
+        status_map = {n: {} for n in provider_names(conn)}
+        for name, d_str, status in _select_days(conn, start=start, end=end):
+            status_map.setdefault(name, {})[d_str] = status
+    finally:
+        conn.close()
+    return status_map
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _walk_unavailable(directory):
+    """Reference directory walk (same logic as the pre-store loader)."""
+    availability = {}
+    for fname in os.listdir(directory):
+        if not fname.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, fname)) as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            continue
+        name = data.get("name", "").strip()
+        if not name:
+            continue
+        unavail = availability.setdefault(name, set())
+        for day in data.get("days", []):
+            if day.get("status") == "unavailable":
+                unavail.add(day["date"])
+    return availability
+
+
+def _measure(fn):
+    """Run fn once, returning (result, seconds, peak traced bytes)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consolidated availability store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for cmd, help_text in [("import", "Import the JSON directory into the store"),
+                           ("compare", "Compare store vs directory-walk load time/memory")]:
+        p = sub.add_parser(cmd, help=help_text)
+        p.add_argument("--dir", default=DEFAULT_DIR,
+                       help=f"Availability JSON directory (default: {DEFAULT_DIR})")
+    args = parser.parse_args()
+
+    path = store_path(args.dir)
+
+    if args.command == "import":
+        t0 = time.perf_counter()
+        imported, skipped = import_directory(args.dir, path)
+        print(f"Imported {imported} files ({skipped} skipped) into {path} "
+              f"in {time.perf_counter() - t0:.2f}s")
+        return 0
+
+    if not os.path.isfile(path):
+        print(f"ERROR: no store at {path} — run the import command first", file=sys.stderr)
+        return 1
+
+    walked, walk_s, walk_peak = _measure(lambda: _walk_unavailable(args.dir))
+    stored, store_s, store_peak = _measure(lambda: load_unavailable_dates(path))
+    print(f"{'Source':<16} {'Load time':>10} {'Peak memory':>12} {'Providers':>10}")
+    print(f"{'directory walk':<16} {walk_s * 1000:>8.1f}ms {walk_peak / 1e6:>10.2f}MB {len(walked):>10}")
+    print(f"{'sqlite store':<16} {store_s * 1000:>8.1f}ms {store_peak / 1e6:>10.2f}MB {len(stored):>10}")
+    print(f"Identical unavailable dates: {walked == stored}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,7 +20,7 @@ import math
 import os
 import urllib.request
 from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 # Project-root shared module for name matching
 import sys
@@ -29,6 +29,7 @@ if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
 from name_match import normalize_name, to_canonical, match_provider, clean_html_provider
+import availability_store
 
 # ─── Configuration ───────────────────────────────────────────────────────────
 
@@ -202,25 +203,43 @@ def load_sites():
     return sites
 
 
-def load_availability():
+def load_availability(block_start=None, block_end=None, schedules_dir=None):
     """Load individual schedule JSONs to build per-provider unavailable dates.
 
     Reads all JSON files from input/individualSchedules/. Each file contains
     one provider's availability for one month (status: available/unavailable/blank).
+    If the directory holds a consolidated store (availability_store.py) that
+    is current with the JSONs, it is queried instead of walking them.
+
+    Args:
+        block_start, block_end: optional date/datetime window. When both are
+            given, the result is an AvailabilityIndex over that window.
+        schedules_dir: directory to read instead of SCHEDULES_DIR
 
     Returns:
         dict: provider_name (as in JSON) -> set of unavailable date strings (YYYY-MM-DD)
     """
     availability = {}  # name -> set of unavailable dates
+    schedules_dir = schedules_dir or SCHEDULES_DIR
 
-    if not os.path.isdir(SCHEDULES_DIR):
-        print(f"  WARNING: Schedules directory not found: {SCHEDULES_DIR}")
+    if not os.path.isdir(schedules_dir):
+        print(f"  WARNING: Schedules directory not found: {schedules_dir}")
         return availability
 
-    for fname in os.listdir(SCHEDULES_DIR):
+    if availability_store.store_is_current(schedules_dir):
+        availability = availability_store.load_unavailable_dates(
+            availability_store.store_path(schedules_dir))
+        if block_start is not None and block_end is not None:
+            return AvailabilityIndex(availability, block_start, block_end)
+        return availability
+    if availability_store.has_store(schedules_dir):
+        print("  NOTE: availability store is out of date with the JSONs; reading "
+              "the JSONs (run availability_store.py import to refresh it)")
+
+    for fname in os.listdir(schedules_dir):
         if not fname.endswith(".json"):
             continue
-        fpath = os.path.join(SCHEDULES_DIR, fname)
+        fpath = os.path.join(schedules_dir, fname)
         try:
             with open(fpath) as f:
                 data = json.load(f)
@@ -238,9 +257,66 @@ def load_availability():
             if day.get("status") == "unavailable":
                 availability[name].add(day["date"])
 
+    if block_start is not None and block_end is not None:
+        return AvailabilityIndex(availability, block_start, block_end)
     return availability
 
 
+class AvailabilityIndex(dict):
+    """Bitset view of load_availability() output over a fixed date window.
+
+    Still a dict of json_name -> set of unavailable date strings, so it can
+    be passed anywhere the plain dict is accepted (build_name_map, reports).
+    In addition, each provider's unavailable days inside the window are
+    packed into an int bitmask (bit i = window start + i days), and date
+    lists are converted to masks once and memoized. An availability check
+    is then a single AND-and-test.
+
+    Treat it as read-only: masks are built at construction time.
+    """
+
+    def __init__(self, unavailable_dates, block_start, block_end):
+        super().__init__(unavailable_dates)
+        self.origin = block_start.toordinal()
+        self.n_days = block_end.toordinal() - self.origin + 1
+        self.masks = {}
+        for name, dates in unavailable_dates.items():
+            mask = 0
+            for d_str in dates:
+                offset = date.fromisoformat(d_str).toordinal() - self.origin
+                if 0 <= offset < self.n_days:
+                    mask |= 1 << offset
+            self.masks[name] = mask
+        self._date_masks = {}
+
+    def dates_mask(self, dates):
+        """Bitmask for a list of date strings, or None if any falls outside the window."""
+        key = tuple(dates)
+        if key in self._date_masks:
+            return self._date_masks[key]
+        mask = 0
+        for d_str in key:
+            offset = date.fromisoformat(d_str).toordinal() - self.origin
+            if not 0 <= offset < self.n_days:
+                mask = None
+                break
+            mask |= 1 << offset
+        self._date_masks[key] = mask
+        return mask
+
+    def unavailable_mask(self, json_name):
+        """Bitmask of a provider's unavailable days (0 for unknown/None names)."""
+        return self.masks.get(json_name, 0)
+
+    def is_available(self, json_name, dates):
+        """True if json_name has no unavailable day among dates."""
+        mask = self.dates_mask(dates)
+        if mask is None:
+            unavail = self.get(json_name, set())
+            return not any(d in unavail for d in dates)
+        return not (self.masks.get(json_name, 0) & mask)
+
+
 def build_name_map(sheet_providers, json_availability):
     """Build a mapping from Google Sheet provider names to JSON availability names.
 
@@ -394,12 +470,15 @@ def is_available(provider_name, json_name, dates, unavailable_dates):
         provider_name: Google Sheet name (for logging)
         json_name: matched JSON name (or None)
         dates: list of date strings to check
-        unavailable_dates: dict json_name -> set of unavailable date strings
+        unavailable_dates: dict json_name -> set of unavailable date strings,
+            or an AvailabilityIndex (bitmask check)
 
     Returns:
         True if provider is available for all dates
     """
     if json_name is None:
         return True  # no JSON = fully available
+    if isinstance(unavailable_dates, AvailabilityIndex):
+        return unavailable_dates.is_available(json_name, dates)
     unavail = unavailable_dates.get(json_name, set())
     return not any(d in unavail for d in dates)
@@ -76,7 +76,7 @@ def phase1_setup(block_start, block_end, seed=42):
     providers = load_providers()
     tags_data = load_tags()
     sites_demand = load_sites()
-    unavailable_dates = load_availability()
+    unavailable_dates = load_availability(block_start, block_end)
 
     print(f"  Providers:     {len(providers)}")
     print(f"  Tags:          {sum(len(v) for v in tags_data.values())} tags across {len(tags_data)} providers")
@@ -36,6 +36,7 @@ from block.engines.shared.loader import (
     load_availability,
 )
 from name_match import match_provider
+import availability_store
 
 
 # ─── Helpers ─────────────────────────────────────────────────────────────────
@@ -367,6 +368,8 @@ def _load_full_availability():
     avail_all = {}
     if not os.path.isdir(SCHEDULES_DIR):
         return avail_all
+    if availability_store.store_is_current(SCHEDULES_DIR):
+        return availability_store.load_status_map(availability_store.store_path(SCHEDULES_DIR))
     for fname in os.listdir(SCHEDULES_DIR):
         if not fname.endswith(".json"):
             continue
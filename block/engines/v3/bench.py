@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Phase timing benchmark for Block Schedule Engine v3.
+
+Builds a deterministic synthetic roster shaped like Block 3 (site mix,
+provider pools, remaining capacity, availability holes) and times each
+engine phase. The real workbook and availability JSONs are not needed, so
+hot-path changes can be measured anywhere.
+
+Usage:
+    python -m block.engines.v3.bench                     # Block 3-sized roster
+    python -m block.engines.v3.bench --providers 1000    # larger roster
+    python -m block.engines.v3.bench --seeds 42 7 --repeat 3
+    python -m block.engines.v3.bench --check-scoring     # batched vs scalar scores
+    python -m block.engines.v3.bench --memory            # engine state footprint
+    python -m block.engines.v3.bench --check-rollback    # savepoint undo journal
+    python -m block.engines.v3.bench --search 5          # add Phase 4b local search
+    python -m block.engines.v3.bench --mode flow         # min-cost-flow Phases 2-3
+"""
+
+import argparse
+import contextlib
+import copy
+import gc
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+_V3_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.abspath(os.path.join(_V3_DIR, "..", "..", ".."))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from block.engines.v3 import engine
+from block.engines.v3.run import BLOCK_START, BLOCK_END
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# SYNTHETIC INPUTS
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Site demand per day type (docs/block-scheduling-rules.md, Input 3)
+SYNTHETIC_DEMAND = {
+    "Cooper":             (26, 19),
+    "Mullica Hill":       (11, 10),
+    "Vineland":           (11, 11),
+    "Elmer":              (1, 1),
+    "Cape":               (7, 6),
+    "Mannington":         (1, 1),
+    "Virtua Voorhees":    (2, 2),
+    "Virtua Marlton":     (1, 1),
+    "Virtua Willingboro": (1, 1),
+    "Virtua Mt Holly":    (2, 2),
+}
+
+# Provider archetypes: (share of roster, {pct_field: fraction})
+SYNTHETIC_MIX = [
+    (0.38, {"pct_cooper": 1.0}),
+    (0.10, {"pct_cooper": 0.5, "pct_inspira_mhw": 0.5}),
+    (0.18, {"pct_inspira_veb": 0.5, "pct_inspira_mhw": 0.5}),
+    (0.06, {"pct_inspira_veb": 0.7, "pct_mannington": 0.3}),
+    (0.12, {"pct_cape": 1.0}),
+    (0.10, {"pct_virtua": 1.0}),
+    (0.06, {"pct_cooper": 0.6, "pct_virtua": 0.4}),
+]
+
+_PCT_FIELDS = ["pct_cooper", "pct_inspira_veb", "pct_inspira_mhw",
+               "pct_mannington", "pct_virtua", "pct_cape"]
+
+
+def build_synthetic_inputs(n_providers=260, block_start=BLOCK_START,
+                           block_end=BLOCK_END, seed=0):
+    """Build a load_inputs()-shaped dict for a synthetic roster.
+
+    Demand is scaled with the roster so larger rosters stay roughly as
+    tight as Block 3. Output is fully determined by the arguments.
+    """
+    rng = random.Random(f"bench_{n_providers}_{seed}")
+    scale = n_providers / 260.0
+
+    sites_demand = {}
+    for site, (wk, we) in SYNTHETIC_DEMAND.items():
+        sites_demand[(site, "weekday")] = max(1, round(wk * scale))
+        sites_demand[(site, "weekend")] = max(1, round(we * scale))
+
+    n_days = (block_end - block_start).days + 1
+    block_dates = [(block_start + timedelta(days=i)).strftime("%Y-%m-%d")
+                   for i in range(n_days)]
+
+    providers = {}
+    unavailable_dates = {}
+    name_map = {}
+    weights = [w for w, _ in SYNTHETIC_MIX]
+
+    for i in range(n_providers):
+        name = f"Provider{i:04d}, Synthetic"
+        _, pcts = rng.choices(SYNTHETIC_MIX, weights=weights)[0]
+        fte = rng.choice([1.0, 1.0, 1.0, 0.8, 0.6, 0.5])
+        annual_wk = round(26 * fte)
+        annual_we = round(22 * fte)
+        done = rng.uniform(0.62, 0.78)
+
+        pdata = {
+            "shift_type": "Days",
+            "fte": fte,
+            "scheduler": "",
+            "annual_weeks": annual_wk,
+            "annual_weekends": annual_we,
+            "annual_nights": 0.0,
+            "weeks_remaining": round(annual_wk * (1 - done), 1),
+            "weekends_remaining": round(annual_we * (1 - done), 1),
+            "nights_remaining": 0.0,
+            "holiday_1": "",
+            "holiday_2": "",
+        }
+        for field in _PCT_FIELDS:
+            pdata[field] = pcts.get(field, 0.0)
+        providers[name] = pdata
+
+        # Vacation blocks plus scattered single days off
+        unavail = set()
+        for _ in range(rng.randint(0, 3)):
+            start = rng.randrange(n_days)
+            for d in range(rng.randint(2, 9)):
+                if start + d < n_days:
+                    unavail.add(block_dates[start + d])
+        for _ in range(rng.randint(0, 6)):
+            unavail.add(rng.choice(block_dates))
+
+        json_name = name.upper()
+        unavailable_dates[json_name] = unavail
+        name_map[name] = json_name
+
+    return {
+        "pre_data": {},
+        "providers": providers,
+        "tags_data": {},
+        "sites_demand": sites_demand,
+        "unavailable_dates": unavailable_dates,
+        "name_map": name_map,
+        "unmatched": [],
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# TIMING
+# ═══════════════════════════════════════════════════════════════════════════
+
+PHASES = [
+    ("phase1", engine.phase1_reserve_critical),
+    ("phase2", engine.phase2_general_assignment),
+    ("phase3", engine.phase3_behind_pace),
+    ("phase4", engine.phase4_swap_evaluation),
+    ("phase5", engine.phase5_output),
+]
+
+# mode="flow" fills Phases 2-3 in one min-cost-flow pass
+FLOW_PHASES = [
+    ("phase1", engine.phase1_reserve_critical),
+    ("phase2-3", engine.phase2_flow_assignment),
+    ("phase4", engine.phase4_swap_evaluation),
+    ("phase5", engine.phase5_output),
+]
+
+MODE_PHASES = {"greedy": PHASES, "flow": FLOW_PHASES}
+
+
+def time_engine(inputs, seed=42, block_start=BLOCK_START, block_end=BLOCK_END,
+                search_seconds=0, mode="greedy"):
+    """Run every engine phase once on inputs, timing each one.
+
+    Engine logging is captured so only the timings reach stdout. With
+    search_seconds > 0, Phase 4b local search runs (and is timed) before
+    phase 5; its summary is added to results as "local_search".
+
+    Returns:
+        (timings, results) — timings maps phase name -> seconds
+    """
+    timings = {}
+    results = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        state = engine.build_state(inputs, block_start, block_end, seed=seed)
+        timings["setup"] = time.perf_counter() - t0
+
+        search = None
+        for name, fn in MODE_PHASES[mode]:
+            if name == "phase5" and search_seconds > 0:
+                t0 = time.perf_counter()
+                search = engine.phase4b_local_search(state, search_seconds)
+                timings["phase4b"] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            out = fn(state)
+            timings[name] = time.perf_counter() - t0
+            if name == "phase5":
+                results = out
+        if search is not None:
+            results["local_search"] = search
+
+    timings["total"] = sum(timings.values())
+    return timings, results
+
+
+def check_scoring(inputs, seed=42, block_start=BLOCK_START, block_end=BLOCK_END):
+    """Run the engine, comparing every batched scoring call with the scalar path.
+
+    Each _score_candidates() call is replayed through _score_candidate() from
+    the same random state; scores, candidate rankings and the random state
+    afterwards must all match exactly.
+
+    Returns:
+        dict: calls, batched (calls that used NumPy), candidates, mismatches
+    """
+    batched_fn = engine._score_candidates
+    stats = {"calls": 0, "batched": 0, "candidates": 0, "mismatches": 0}
+
+    def compare(state, pids, period_idx, s, period_type):
+        before = random.getstate()
+        scalar = [engine._score_candidate(state, p, period_idx, s, period_type)
+                  for p in pids]
+        after_scalar = random.getstate()
+        random.setstate(before)
+        scores = batched_fn(state, pids, period_idx, s, period_type)
+
+        def ranking(values):
+            return [p for p, _ in sorted(zip(pids, values), key=lambda x: -x[1])]
+
+        stats["calls"] += 1
+        stats["batched"] += (state.score_views is not None
+                             and len(pids) >= engine.SCORE_BATCH_MIN)
+        stats["candidates"] += len(pids)
+        if (scores != scalar or ranking(scores) != ranking(scalar)
+                or random.getstate() != after_scalar):
+            stats["mismatches"] += 1
+        return scores
+
+    engine._score_candidates = compare
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            state = engine.build_state(inputs, block_start, block_end, seed=seed)
+            for _, fn in PHASES:
+                fn(state)
+    finally:
+        engine._score_candidates = batched_fn
+    return stats
+
+
+def _state_snapshot(state):
+    """Everything a rollback must restore, in comparable form."""
+    return (
+        bytes(state.site_code), bytes(state.placed_seq), bytes(state.site_first),
+        bytes(state.site_count), bytes(state.week_count), bytes(state.weekend_count),
+        bytes(state.max_streak), bytes(state.fill), bytes(state.shortfall),
+        [list(r.items()) for r in state.roster], [list(r) for r in state.runs],
+        state._seq,
+        {slot: sorted(m) for slot, m in state.slot_candidates.items()},
+        {slot: list(c) for slot, c in state.slot_candidate_count.items()},
+        {p: sorted(o) for p, o in state.prov_open_periods.items()},
+    )
+
+
+def check_rollback(inputs, seed=42, trials=200, block_start=BLOCK_START,
+                   block_end=BLOCK_END):
+    """Apply random compound moves to a finished schedule and roll them back.
+
+    Each trial opens a savepoint, applies 2-4 reassignments (remove a
+    provider from one period, place them at another feasible slot; some
+    inside a nested savepoint), then rolls back. The state — arrays,
+    roster order, runs and candidate index — must match its snapshot.
+
+    Returns:
+        dict: trials, changes, mismatches, rollback_ms (mean per trial),
+        copy_ms (one copy.deepcopy of the state, for comparison)
+    """
+    rng = random.Random(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = engine.build_state(inputs, block_start, block_end, seed=seed)
+        for name, fn in PHASES:
+            if name != "phase5":
+                fn(state)
+
+    views, state.score_views = state.score_views, None
+    t0 = time.perf_counter()
+    copy.deepcopy(state)
+    copy_ms = (time.perf_counter() - t0) * 1000
+    state.score_views = views
+
+    stats = {"trials": trials, "changes": 0, "mismatches": 0}
+    rollback_s = 0.0
+    for _ in range(trials):
+        before = _state_snapshot(state)
+        savepoint = state.checkpoint()
+        nested = None
+        for step in range(rng.randint(2, 4)):
+            if step == 1 and rng.random() < 0.5:
+                nested = state.checkpoint()
+            held = [(p, idx) for idx, r in enumerate(state.roster) for p in r]
+            p, idx = rng.choice(held)
+            engine._remove_provider(state, p, idx)
+            stats["changes"] += 1
+            targets = [(j, s) for j in range(state.n_periods) for s in state.prov_sites[p]
+                       if engine._can_assign(state, p, j, s, use_cap=False)[0]]
+            if targets:
+                engine._place_provider(state, p, *rng.choice(targets))
+                stats["changes"] += 1
+        if nested is not None:
+            if rng.random() < 0.5:
+                state.release(nested)
+            else:
+                engine._rollback(state, nested)
+        t0 = time.perf_counter()
+        engine._rollback(state, savepoint)
+        rollback_s += time.perf_counter() - t0
+        if _state_snapshot(state) != before:
+            stats["mismatches"] += 1
+
+    stats["rollback_ms"] = rollback_s / trials * 1000
+    stats["copy_ms"] = copy_ms
+    return stats
+
+
+def measure_memory(inputs, seed=42, block_start=BLOCK_START, block_end=BLOCK_END):
+    """Traced memory of the engine state built and filled through phase 4.
+
+    Runs under tracemalloc, so the phase time reported here is slower than
+    time_engine()'s.
+
+    Returns:
+        dict: retained_mb (state after phase 4), peak_mb, seconds
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            state = engine.build_state(inputs, block_start, block_end, seed=seed)
+            for name, fn in PHASES:
+                if name != "phase5":
+                    fn(state)
+            seconds = time.perf_counter() - t0
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del state
+    return {"retained_mb": (current - base) / 1e6, "peak_mb": (peak - base) / 1e6,
+            "seconds": seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark V3 engine phases on a synthetic roster")
+    parser.add_argument("--providers", type=int, default=260,
+                        help="Synthetic roster size (default: 260, about Block 3)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[42],
+                        help="Engine seeds to run (default: 42)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per seed; the fastest is reported (default: 1)")
+    parser.add_argument("--check-scoring", action="store_true",
+                        help="Check batched candidate scoring against the scalar path")
+    parser.add_argument("--check-rollback", action="store_true",
+                        help="Roll back random compound moves and compare engine state")
+    parser.add_argument("--mode", choices=engine.ENGINE_MODES, default="greedy",
+                        help="Phase 2-3 fill strategy (default: greedy)")
+    parser.add_argument("--search", type=float, default=0, metavar="SECONDS",
+                        help="Run Phase 4b local search with this budget and "
+                             "report its improvement curve")
+    parser.add_argument("--memory", action="store_true",
+                        help="Report traced engine-state memory through phase 4")
+    args = parser.parse_args()
+
+    inputs = build_synthetic_inputs(args.providers)
+    print(f"Synthetic roster: {args.providers} providers, "
+          f"block {BLOCK_START.strftime('%Y-%m-%d')} to {BLOCK_END.strftime('%Y-%m-%d')}")
+
+    if args.check_scoring:
+        if engine.np is None:
+            print("NumPy is not installed — the engine uses the scalar scorer only.")
+            return 0
+        failed = False
+        print(f"\n{'Seed':>6} {'Calls':>7} {'Batched':>8} {'Candidates':>11} {'Mismatches':>11}")
+        for seed in args.seeds:
+            st = check_scoring(inputs, seed=seed)
+            failed = failed or st["mismatches"] > 0
+            print(f"{seed:>6} {st['calls']:>7} {st['batched']:>8} "
+                  f"{st['candidates']:>11} {st['mismatches']:>11}")
+        return 1 if failed else 0
+
+    if args.check_rollback:
+        failed = False
+        print(f"\n{'Seed':>6} {'Trials':>7} {'Changes':>8} {'Mismatches':>11} "
+              f"{'Rollback':>10} {'Deepcopy':>10}")
+        for seed in args.seeds:
+            st = check_rollback(inputs, seed=seed)
+            failed = failed or st["mismatches"] > 0
+            print(f"{seed:>6} {st['trials']:>7} {st['changes']:>8} {st['mismatches']:>11} "
+                  f"{st['rollback_ms']:>8.3f}ms {st['copy_ms']:>8.1f}ms")
+        return 1 if failed else 0
+
+    if args.memory:
+        print(f"\n{'Seed':>6} {'Retained':>10} {'Peak':>10} {'Traced time':>12}")
+        for seed in args.seeds:
+            m = measure_memory(inputs, seed=seed)
+            print(f"{seed:>6} {m['retained_mb']:>8.2f}MB {m['peak_mb']:>8.2f}MB "
+                  f"{m['seconds']:>11.2f}s")
+        return 0
+
+    cols = ["setup"] + [name for name, _ in MODE_PHASES[args.mode]] + ["total"]
+    if args.search > 0:
+        cols.insert(cols.index("phase5"), "phase4b")
+    print(f"\n{'Seed':>6} " + " ".join(f"{c:>8}" for c in cols) + f" {'Gaps':>6} {'ZG':>4}")
+    searches = []
+    for seed in args.seeds:
+        best = None
+        for _ in range(args.repeat):
+            timings, results = time_engine(inputs, seed=seed, search_seconds=args.search,
+                                           mode=args.mode)
+            if best is None or timings["total"] < best["total"]:
+                best = timings
+        s = results["stats"]
+        print(f"{seed:>6} " + " ".join(f"{best[c]:>7.3f}s" for c in cols) +
+              f" {s['total_gaps']:>6} {s['zero_gap_violations']:>4}")
+        if "local_search" in results:
+            searches.append((seed, results["local_search"]))
+
+    for seed, search in searches:
+        curve = search["curve"]
+        print(f"\nSeed {seed} local search: {search['moves']} moves, "
+              f"{search['accepted']} accepted, objective "
+              f"{search['start_objective']} -> {search['best_objective']}")
+        print(f"  {'Time':>8} {'Moves':>8} {'Objective':>10} {'Gaps':>5} {'ZG':>4}")
+        for k, pt in enumerate(curve):
+            if 0 < k < len(curve) - 1 and pt["total_gaps"] == curve[k - 1]["total_gaps"]:
+                continue
+            print(f"  {pt['seconds']:>7.2f}s {pt['moves']:>8} {pt['objective']:>10.1f} "
+                  f"{pt['total_gaps']:>5} {pt['zero_gap_violations']:>4}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Coverage bound and gap certificates for Block Schedule Engine v3.
+
+Tells whether the gaps in a gap report are unavoidable or an artefact of the
+greedy engine. Each day type (weekday, weekend) is an independent flow
+network — capacity is counted separately for weeks and weekends:
+
+  source -> provider            cap: floor(weeks_remaining) or floor(weekends_remaining)
+         -> (provider, period)  cap 1, only if available for the whole period
+         -> (period, site)      cap 1, only if the site is eligible
+         -> sink                cap: site demand
+
+The maximum flow is the most slots any schedule can fill. The network keeps
+capacity, availability, site eligibility and one slot per period, and drops
+the constraints that only make things harder (consecutive-day limit,
+conflict pairs, fair-share cap), so no schedule can beat it:
+
+  min_gaps                 total demand - max flow
+  min_zero_gap_violations  the same, over zero-gap sites only
+  by_site                  best coverage of each site on its own
+
+The nodes that can still reach a short slot in the residual network form
+Hall violators: sets of slots whose demand exceeds what every provider who
+could cover them can give. Each certificate lists those slots and providers
+and what binds each provider — remaining capacity, or already covering
+every period of the set they are available for.
+
+Usage:
+    python -m block.engines.v3.bounds                     # Block 3 inputs
+    python -m block.engines.v3.bounds --json bound.json   # also write JSON
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+from collections import deque
+
+import networkx as nx
+from networkx.algorithms.flow import shortest_augmenting_path
+
+_V3_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.abspath(os.path.join(_V3_DIR, "..", "..", ".."))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from block.engines.v3 import engine
+
+# Largest number of slots / providers printed per certificate
+CERT_PRINT_LIMIT = 8
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# FLOW NETWORK
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _build_network(state, is_week, sites):
+    """Flow network for one day type, restricted to the given site IDs.
+
+    Returns:
+        (graph, slots) — slots lists the ("slot", idx, s) nodes with demand
+    """
+    graph = nx.DiGraph()
+    graph.add_node("source")
+    graph.add_node("sink")
+    caps = state.wk_cap if is_week else state.we_cap
+    periods = [idx for idx in range(state.n_periods) if state.period_is_week[idx] == is_week]
+
+    slots = []
+    for idx in periods:
+        for s in sites:
+            demand = state.site_demand(idx, s)
+            if demand > 0:
+                slots.append(("slot", idx, s))
+                graph.add_edge(("slot", idx, s), "sink", capacity=demand)
+    if not slots:
+        return graph, slots
+
+    wanted = set(sites)
+    for p in range(state.n_providers):
+        psites = [s for s in state.prov_sites[p] if s in wanted]
+        if caps[p] <= 0 or not psites:
+            continue
+        for idx in periods:
+            if state.unavail_mask[p] & state.period_masks[idx]:
+                continue
+            if len(sites) == 1:
+                # One site: one slot per period, no per-period node needed
+                if state.site_demand(idx, psites[0]) > 0:
+                    graph.add_edge(("prov", p), ("slot", idx, psites[0]), capacity=1)
+                continue
+            node = ("avail", p, idx)
+            for s in psites:
+                if state.site_demand(idx, s) > 0:
+                    graph.add_edge(node, ("slot", idx, s), capacity=1)
+            if node in graph:
+                graph.add_edge(("prov", p), node, capacity=1)
+        if ("prov", p) in graph:
+            graph.add_edge("source", ("prov", p), capacity=caps[p])
+    return graph, slots
+
+
+def _max_flow(graph):
+    """Residual network after a maximum flow (flow value in .graph["flow_value"])."""
+    return shortest_augmenting_path(graph, "source", "sink")
+
+
+def _slot_flow(residual, slot):
+    return residual[slot]["sink"]["flow"]
+
+
+def _violators(residual, short_slots):
+    """Split everything that reaches a short slot into Hall violators.
+
+    Collects every node that reaches one of short_slots in the residual
+    network (not passing through the sink). Edges entering that set are
+    saturated and edges leaving it carry no flow, so its slots can never
+    receive more than they do now. Each connected piece of the set holds
+    at least one short slot, so each piece is a violator on its own.
+
+    Returns:
+        list of node sets
+    """
+    reach = set(short_slots)
+    queue = deque(short_slots)
+    while queue:
+        v = queue.popleft()
+        for u, attrs in residual.pred[v].items():
+            if u in reach or u == "sink" or attrs["capacity"] - attrs["flow"] <= 0:
+                continue
+            reach.add(u)
+            queue.append(u)
+    assert "source" not in reach, "augmenting path left in a maximum flow"
+
+    pieces = []
+    unseen = set(reach)
+    while unseen:
+        piece = {unseen.pop()}
+        queue = deque(piece)
+        while queue:
+            v = queue.popleft()
+            for u in list(residual.succ[v]) + list(residual.pred[v]):
+                if u in unseen:
+                    unseen.discard(u)
+                    piece.add(u)
+                    queue.append(u)
+        pieces.append(piece)
+    return pieces
+
+
+def _certificate(state, residual, piece):
+    """Describe one Hall violator: its slots, providers and what binds them.
+
+    Returns:
+        dict: slots, sites, demand, max_coverage, shortfall, providers
+        (each with its binding constraint), binding. Which slots of the set
+        stay short is up to the schedule; only the total is forced.
+    """
+    slots = sorted((node for node in piece if node[0] == "slot"),
+                   key=lambda n: (n[1], state.sites[n[2]]))
+    demand = sum(residual[slot]["sink"]["capacity"] for slot in slots)
+    covered = sum(_slot_flow(residual, slot) for slot in slots)
+
+    # Everyone with an edge into the set, and what stops them giving more
+    contributors = {}
+    for slot in slots:
+        for avail in residual.pred[slot]:
+            if avail == "sink" or residual[avail][slot]["capacity"] <= 0:
+                continue
+            p = avail[1]
+            info = contributors.setdefault(p, {"periods": set(), "covering": 0})
+            info["periods"].add(avail[2])
+            info["covering"] += residual[avail][slot]["flow"]
+    caps = state.wk_cap if state.period_is_week[slots[0][1]] else state.we_cap
+
+    providers = []
+    for p, info in sorted(contributors.items(), key=lambda kv: state.names[kv[0]]):
+        providers.append({
+            "provider": state.names[p],
+            "capacity": caps[p],
+            "periods_available": len(info["periods"]),
+            "covering": info["covering"],
+            # In the set: capacity edge saturated. Outside: every period used.
+            "binding": "capacity" if ("prov", p) in piece else "periods",
+        })
+
+    return {
+        "slots": [{"period_idx": idx,
+                   "label": state.periods[idx]["label"],
+                   "site": state.sites[s],
+                   "demand": residual[("slot", idx, s)]["sink"]["capacity"]}
+                  for _, idx, s in slots],
+        "sites": sorted({state.sites[s] for _, _, s in slots}),
+        "demand": demand,
+        "max_coverage": covered,
+        "shortfall": demand - covered,
+        "providers": providers,
+        "binding": _binding_summary(providers),
+    }
+
+
+def _binding_summary(providers):
+    """One-line reason a certificate's slots cannot all be filled."""
+    if not providers:
+        return "no eligible provider is available for these periods"
+    at_capacity = sum(1 for pr in providers if pr["binding"] == "capacity")
+    if at_capacity == len(providers):
+        return (f"all {len(providers)} eligible, available providers are out of "
+                f"remaining capacity")
+    if at_capacity:
+        return (f"{at_capacity} of {len(providers)} eligible, available providers are "
+                f"out of remaining capacity; the rest already cover every period "
+                f"here they are available for")
+    return (f"all {len(providers)} eligible, available providers already cover "
+            f"every period here they are available for")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# BOUND
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _coverage(state, sites):
+    """Max flow over both day types for a set of site IDs.
+
+    Returns:
+        (demand, max_coverage, [(residual, slots), ...])
+    """
+    demand = covered = 0
+    solved = []
+    for is_week in (True, False):
+        graph, slots = _build_network(state, is_week, sites)
+        if not slots:
+            continue
+        residual = _max_flow(graph)
+        demand += sum(graph[slot]["sink"]["capacity"] for slot in slots)
+        covered += residual.graph["flow_value"]
+        solved.append((residual, slots))
+    return demand, covered, solved
+
+
+def coverage_bound(state, certificates=True):
+    """Best coverage any schedule can reach, with certificates for the gaps.
+
+    Args:
+        state: EngineState from engine.build_state() (no assignments needed)
+        certificates: also build Hall-violator certificates for the gaps
+
+    Returns:
+        dict: total_demand, max_coverage, min_gaps, zero_gap_demand,
+        zero_gap_max_coverage, min_zero_gap_violations, by_site, certificates
+    """
+    all_sites = list(range(state.n_sites))
+    zero_gap_sites = [s for s in all_sites if state.gap_tol[s] == 0]
+
+    demand, covered, solved = _coverage(state, all_sites)
+
+    # Sites the joint flow leaves short; every other site is fully coverable
+    site_demand = [0] * state.n_sites
+    site_joint = [0] * state.n_sites
+    for residual, slots in solved:
+        for slot in slots:
+            site_demand[slot[2]] += residual[slot]["sink"]["capacity"]
+            site_joint[slot[2]] += _slot_flow(residual, slot)
+    short_sites = {s for s in all_sites if site_joint[s] < site_demand[s]}
+
+    if short_sites & set(zero_gap_sites):
+        zg_demand, zg_covered, _ = _coverage(state, zero_gap_sites)
+    else:
+        zg_demand = zg_covered = sum(site_demand[s] for s in zero_gap_sites)
+
+    by_site = {}
+    for s in all_sites:
+        if not site_demand[s]:
+            continue
+        site_covered = (_coverage(state, [s])[1] if s in short_sites
+                        else site_demand[s])
+        by_site[state.sites[s]] = {
+            "demand": site_demand[s],
+            "max_coverage": site_covered,
+            "min_gaps": site_demand[s] - site_covered,
+        }
+
+    certs = []
+    if certificates:
+        for residual, slots in solved:
+            short = [slot for slot in slots
+                     if _slot_flow(residual, slot) < residual[slot]["sink"]["capacity"]]
+            if short:
+                certs.extend(_certificate(state, residual, piece)
+                             for piece in _violators(residual, short))
+        certs.sort(key=lambda c: (-c["shortfall"], c["slots"][0]["period_idx"]))
+
+    return {
+        "total_demand": demand,
+        "max_coverage": covered,
+        "min_gaps": demand - covered,
+        "zero_gap_demand": zg_demand,
+        "zero_gap_max_coverage": zg_covered,
+        "min_zero_gap_violations": zg_demand - zg_covered,
+        "by_site": by_site,
+        "certificates": certs,
+    }
+
+
+def bound_for_inputs(inputs, block_start, block_end, certificates=True):
+    """coverage_bound() on a fresh state built from load_inputs() output."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = engine.build_state(inputs, block_start, block_end)
+    return coverage_bound(state, certificates=certificates)
+
+
+def gap_floor(bound):
+    """(min_gaps, min_zero_gap_violations) for phase4b_local_search()."""
+    return (bound["min_gaps"], bound["min_zero_gap_violations"])
+
+
+def reached_bound(stats, bound):
+    """True if a run's stats already match the bound (no seed can do better)."""
+    return (stats["total_gaps"] <= bound["min_gaps"]
+            and stats["zero_gap_violations"] <= bound["min_zero_gap_violations"])
+
+
+def print_bound(bound):
+    """Print the bound, per-site coverage and certificates."""
+    print(f"  Max coverage:           {bound['max_coverage']}/{bound['total_demand']} "
+          f"(at least {bound['min_gaps']} gaps)")
+    print(f"  Zero-gap max coverage:  {bound['zero_gap_max_coverage']}/{bound['zero_gap_demand']} "
+          f"(at least {bound['min_zero_gap_violations']} zero-gap violations)")
+
+    print(f"\n  {'Site':<20} {'Demand':>7} {'Max':>6} {'Min gaps':>9}")
+    for site, b in sorted(bound["by_site"].items()):
+        print(f"  {site:<20} {b['demand']:>7} {b['max_coverage']:>6} {b['min_gaps']:>9}")
+
+    if not bound["certificates"]:
+        print("\n  No unavoidable gaps.")
+        return
+    print(f"\n  {len(bound['certificates'])} certificate(s) of unavoidable gaps:")
+    for n, cert in enumerate(bound["certificates"], 1):
+        print(f"\n  [{n}] {len(cert['slots'])} slot(s) at {', '.join(cert['sites'])}: "
+              f"demand {cert['demand']}, at most {cert['max_coverage']} fillable "
+              f"(short {cert['shortfall']})")
+        print(f"      {cert['binding']}")
+        for slot in cert["slots"][:CERT_PRINT_LIMIT]:
+            print(f"      - {slot['label']} {slot['site']}: demand {slot['demand']}")
+        if len(cert["slots"]) > CERT_PRINT_LIMIT:
+            print(f"      ... {len(cert['slots']) - CERT_PRINT_LIMIT} more slot(s)")
+        for pr in cert["providers"][:CERT_PRINT_LIMIT]:
+            print(f"      * {pr['provider']}: capacity {pr['capacity']}, available "
+                  f"{pr['periods_available']} period(s), covering {pr['covering']} "
+                  f"[{pr['binding']}]")
+        if len(cert["providers"]) > CERT_PRINT_LIMIT:
+            print(f"      ... {len(cert['providers']) - CERT_PRINT_LIMIT} more provider(s)")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    from block.engines.v3.run import (
+        BLOCK_START, BLOCK_END, DEFAULT_EXCEL, DEFAULT_PRE_SCHEDULE,
+        DEFAULT_AVAILABILITY_DIR,
+    )
+
+    parser = argparse.ArgumentParser(description="Coverage bound for the v3 block schedule")
+    parser.add_argument("--excel", type=str, default=DEFAULT_EXCEL,
+                        help="Path to hospitalist_scheduler.xlsx")
+    parser.add_argument("--pre-schedule", type=str, default=DEFAULT_PRE_SCHEDULE,
+                        help="Path to pre_schedule_output.json")
+    parser.add_argument("--no-pre-schedule", action="store_true",
+                        help="Skip loading pre-scheduler data")
+    parser.add_argument("--availability-dir", type=str, default=DEFAULT_AVAILABILITY_DIR,
+                        help="Directory with individual availability JSONs")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Also write the bound and certificates to this JSON file")
+    args = parser.parse_args()
+
+    pre_schedule_path = None if args.no_pre_schedule else args.pre_schedule
+    inputs = engine.load_inputs(args.excel, pre_schedule_path, args.availability_dir,
+                                use_cache=True)
+
+    print(f"\nCoverage bound, block {BLOCK_START.strftime('%Y-%m-%d')} to "
+          f"{BLOCK_END.strftime('%Y-%m-%d')}")
+    bound = bound_for_inputs(inputs, BLOCK_START, BLOCK_END)
+    print_bound(bound)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(bound, f, indent=2)
+        print(f"\n  Saved: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Site-cluster decomposition for Block Schedule Engine v3.
+
+The sites fall into largely separate provider pools (SITE_PCT_MAP): Cooper,
+the Inspira sites, the Virtua sites, Cape, Mannington. Only providers whose
+percentages span two pools tie them together, so most of the block can be
+scheduled one site cluster at a time:
+
+  1. Clusters: pools are joined when at least CLUSTER_BRIDGE_SHARE of the
+     smaller pool's providers also work the other one. Each cluster is then
+     a connected component of the provider-site graph once the remaining
+     multi-cluster ("bridge") providers are set aside.
+  2. Coordination: each bridge provider's capacity, fair share and weeks of
+     the block are split between their clusters by site percentage, weighted
+     towards clusters their own providers cannot cover, so no two clusters
+     can book them for the same week.
+  3. Each cluster runs phases 1-4 (and 4b) in its own worker process.
+  4. Merge: cluster rosters are replayed into one full-roster state with
+     the hard-constraint check (streaks and conflict pairs can cross
+     clusters), then phases 1-4 run once more over the whole block to fill
+     whatever the split or the merge left open, and phase5_output()
+     compiles the usual result.
+
+Wall time follows the largest cluster plus the merge pass rather than the
+whole roster. The merged schedule is not the one run_engine() produces for
+the same seed, but it is the same for any number of workers.
+
+Usage:
+    python -m block.engines.v3.decompose            # show clusters and bridges
+    python -m block.engines.v3.run --decompose --jobs 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from block.engines.shared.loader import SITE_PCT_MAP, PCT_TO_SITES
+from block.engines.v3 import bounds, engine
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+# Two pools form one cluster when this share of the smaller pool's providers
+# also work the other pool
+CLUSTER_BRIDGE_SHARE = 0.5
+
+
+def _pool(site):
+    """Pool of a site: its percentage field, or the site itself if unmapped."""
+    return SITE_PCT_MAP.get(site, site)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLUSTERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def find_clusters(state, bridge_share=CLUSTER_BRIDGE_SHARE):
+    """Group the demanded sites into clusters and find the bridge providers.
+
+    Args:
+        state: EngineState from build_state()
+        bridge_share: see CLUSTER_BRIDGE_SHARE
+
+    Returns:
+        dict: clusters (list of dicts with sites, pools and member provider
+        names, largest first) and bridges (provider name -> cluster indexes)
+    """
+    demanded = sorted({site for (site, _), needed in state.sites_demand.items() if needed > 0})
+    pools = sorted({_pool(site) for site in demanded})
+
+    prov_pools = []
+    pool_size = dict.fromkeys(pools, 0)
+    shared = {}
+    for p in range(state.n_providers):
+        mine = sorted({_pool(state.sites[s]) for s in state.prov_sites[p]} & set(pools))
+        prov_pools.append(mine)
+        for a in mine:
+            pool_size[a] += 1
+        for i, a in enumerate(mine):
+            for b in mine[i + 1:]:
+                shared[(a, b)] = shared.get((a, b), 0) + 1
+
+    # Union-find over pools
+    parent = {pool: pool for pool in pools}
+
+    def find(pool):
+        while parent[pool] != pool:
+            parent[pool] = parent[parent[pool]]
+            pool = parent[pool]
+        return pool
+
+    for (a, b), count in sorted(shared.items()):
+        if count >= bridge_share * min(pool_size[a], pool_size[b]):
+            parent[find(a)] = find(b)
+
+    groups = {}
+    for pool in pools:
+        groups.setdefault(find(pool), []).append(pool)
+
+    clusters = []
+    for group in groups.values():
+        group = set(group)
+        members = [state.names[p] for p in range(state.n_providers)
+                   if set(prov_pools[p]) & group]
+        clusters.append({
+            "sites": [site for site in demanded if _pool(site) in group],
+            "pools": sorted(group),
+            "members": members,
+        })
+    clusters.sort(key=lambda c: (-len(c["members"]), c["sites"]))
+
+    cluster_of_pool = {pool: k for k, c in enumerate(clusters) for pool in c["pools"]}
+    bridges = {}
+    for p in range(state.n_providers):
+        ks = sorted({cluster_of_pool[pool] for pool in prov_pools[p]})
+        if len(ks) > 1:
+            bridges[state.names[p]] = ks
+
+    return {"clusters": clusters, "bridges": bridges}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# COORDINATION: SPLITTING BRIDGE PROVIDERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _split(total, weights):
+    """Split an integer total in proportion to weights (largest remainder)."""
+    wsum = sum(weights)
+    if total <= 0 or wsum <= 0:
+        return [0] * len(weights)
+    exact = [total * w / wsum for w in weights]
+    shares = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda k: (-(exact[k] - shares[k]), k))
+    for k in by_remainder[:total - sum(shares)]:
+        shares[k] += 1
+    return shares
+
+
+def _supply(state, p, is_week):
+    """Periods of one day type p can cover: capacity, capped by availability."""
+    cap = state.wk_cap[p] if is_week else state.we_cap[p]
+    open_periods = sum(1 for idx in range(state.n_periods)
+                       if state.period_is_week[idx] == is_week
+                       and engine._is_provider_available(state, p, idx))
+    return max(0, min(cap, open_periods))
+
+
+def cluster_need(state, plan):
+    """Share of each cluster's bridge supply its own providers leave it needing.
+
+    Returns:
+        dict: cluster index -> {is_week: ratio in [0, 1]} — demand minus the
+        supply of the cluster's single-cluster members, over the supply of
+        its bridge providers
+    """
+    need = {}
+    for k, cluster in enumerate(plan["clusters"]):
+        sids = [state.sid[site] for site in cluster["sites"]]
+        need[k] = {}
+        for is_week in (True, False):
+            demand = sum(state.site_demand(idx, s) for idx in range(state.n_periods)
+                         if state.period_is_week[idx] == is_week for s in sids)
+            own = bridged = 0
+            for name in cluster["members"]:
+                supply = _supply(state, state.pid[name], is_week)
+                if name in plan["bridges"]:
+                    bridged += supply
+                else:
+                    own += supply
+            short = max(0, demand - own)
+            need[k][is_week] = min(1.0, short / bridged) if bridged else 0.0
+    return need
+
+
+def plan_bridges(state, plan):
+    """Share each bridge provider out between the clusters they work in.
+
+    Weekday and weekend capacity (and fair share) are split in proportion
+    to the provider's site percentages in each cluster, weighted by how
+    short each cluster is without its bridge providers (cluster_need());
+    when none of their clusters is short, by percentage alone. The weeks
+    the provider is available are split the same way into contiguous runs
+    (a week and its weekend go together), starting from a different cluster
+    for each provider so the early weeks do not all land in one cluster.
+
+    Returns:
+        dict: provider name -> {cluster index: overrides} where overrides
+        holds wk_cap, we_cap, fs_wk, fs_we and blocked_mask (the periods
+        the cluster must treat as unavailable)
+    """
+    clusters = plan["clusters"]
+    need = cluster_need(state, plan)
+    week_nums = sorted(state.week_periods)
+    shares = {}
+
+    for name, ks in plan["bridges"].items():
+        p = state.pid[name]
+        pdata = state.prov_data[p]
+        pct = [sum(pdata.get(pool, 0) for pool in clusters[k]["pools"]) for k in ks]
+        by_type = {}
+        for is_week in (True, False):
+            weighted = [w * need[k][is_week] for w, k in zip(pct, ks)]
+            by_type[is_week] = weighted if sum(weighted) > 0 else pct
+        weights = [sum(by_type[t][i] / sum(by_type[t]) for t in by_type)
+                   for i in range(len(ks))]
+
+        available = [wn for wn in week_nums
+                     if any(engine._is_provider_available(state, p, idx)
+                            for idx in state.week_periods[wn])]
+        rotate = p % len(ks)
+        order = ks[rotate:] + ks[:rotate]
+        counts = dict(zip(ks, _split(len(available), weights)))
+        weeks_of = {}
+        start = 0
+        for k in order:
+            weeks_of[k] = set(available[start:start + counts[k]])
+            start += counts[k]
+
+        caps = {field: dict(zip(ks, _split(getattr(state, field)[p], by_type[is_week])))
+                for field, is_week in (("wk_cap", True), ("we_cap", False),
+                                       ("fs_wk", True), ("fs_we", False))}
+
+        shares[name] = {}
+        for k in ks:
+            blocked = 0
+            for idx in range(state.n_periods):
+                if state.periods[idx]["num"] not in weeks_of[k]:
+                    blocked |= state.period_masks[idx]
+            shares[name][k] = dict({field: caps[field][k] for field in caps},
+                                   blocked_mask=blocked)
+    return shares
+
+
+def _cluster_inputs(inputs, cluster):
+    """load_inputs()-shaped dict restricted to one cluster's sites and members.
+
+    Bridge providers keep only the percentages of the cluster's pools, so
+    get_eligible_sites() confines them to the cluster.
+    """
+    pools = set(cluster["pools"])
+    sites = set(cluster["sites"])
+    providers = {}
+    for name in cluster["members"]:
+        pdata = dict(inputs["providers"][name])
+        for pct_field in PCT_TO_SITES:
+            if pct_field not in pools:
+                pdata[pct_field] = 0.0
+        providers[name] = pdata
+    return dict(inputs,
+                providers=providers,
+                sites_demand={key: needed for key, needed in inputs["sites_demand"].items()
+                              if key[0] in sites})
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLUSTER WORKERS
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _run_cluster(task):
+    """Worker: schedule one cluster with engine logging muted.
+
+    Returns:
+        dict: cluster index, assignments [(period_idx, provider, site)],
+        gaps, zero-gap violations and seconds
+    """
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = engine.build_state(task["inputs"], task["block_start"], task["block_end"],
+                                   seed=task["seed"])
+        for name, overrides in task["bridges"].items():
+            p = state.pid.get(name)
+            if p is None:
+                continue  # excluded in the cluster as well
+            for field in ("wk_cap", "we_cap", "fs_wk", "fs_we"):
+                getattr(state, field)[p] = overrides[field]
+            state.unavail_mask[p] |= overrides["blocked_mask"]
+        if task["bridges"]:
+            # Caps and availability changed: reseed the indexes built from them
+            engine._build_candidate_index(state)
+            if state.score_views is not None:
+                state.score_views = engine._build_score_views(state)
+        gap_floor = None
+        if task["stop_at_bound"] and task["search_seconds"] > 0:
+            # The whole-block floor does not apply to one cluster: bound the
+            # cluster itself, bridge caps and blocked weeks included
+            gap_floor = bounds.gap_floor(bounds.coverage_bound(state, certificates=False))
+        engine._fill_phases(state, search_seconds=task["search_seconds"], mode=task["mode"],
+                            gap_floor=gap_floor)
+
+    assignments = [(idx, state.names[p], state.sites[s])
+                   for idx in range(state.n_periods)
+                   for p, s in state.roster[idx].items()]
+    return {
+        "cluster": task["cluster"],
+        "assignments": assignments,
+        "gaps": engine._count_site_gaps(state),
+        "zero_gap_violations": engine._count_site_gaps(state, zero_gap_only=True),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# MERGE
+# ═══════════════════════════════════════════════════════════════════════════
+
+def merge_clusters(state, cluster_results):
+    """Replay cluster rosters into the full-roster state.
+
+    Every placement is re-checked with the hard constraints (fair-share cap
+    lifted, as in Phase 3); the ones that collide across clusters are
+    dropped and left for the merge fill.
+
+    Returns:
+        list of dropped (period_idx, provider, site, reason)
+    """
+    dropped = []
+    for result in sorted(cluster_results, key=lambda r: r["cluster"]):
+        for idx, name, site in sorted(result["assignments"]):
+            p, s = state.pid[name], state.sid[site]
+            ok, reason = engine._can_assign(state, p, idx, s, use_cap=False)
+            if ok:
+                engine._place_provider(state, p, idx, s)
+            else:
+                dropped.append((idx, name, site, reason))
+    return dropped
+
+
+def run_engine_decomposed(inputs, block_start, block_end, seed=42, jobs=1,
+                          search_seconds=0, mode="greedy", gap_floor=None):
+    """Run the V3 engine one site cluster at a time and merge the results.
+
+    Args:
+        inputs: load_inputs() output
+        jobs: worker processes for the clusters (1 runs them in-process)
+        search_seconds: Phase 4b budget per cluster
+        mode: Phase 2-3 fill strategy for the clusters and the merge fill
+        gap_floor: whole-block (gaps, zero-gap violations) bound from
+            bounds.gap_floor(). When given, each cluster's Phase 4b stops at
+            that cluster's own coverage bound; the merge fill runs no Phase
+            4b, and the merged result can be checked against the whole-block
+            bound with bounds.reached_bound().
+
+    Returns:
+        dict — phase5_output() result plus a "decomposition" summary
+    """
+    if mode not in engine.ENGINE_MODES:
+        raise ValueError(f"Unknown engine mode {mode!r} (expected one of {engine.ENGINE_MODES})")
+    t0 = time.perf_counter()
+    state = engine.build_state(inputs, block_start, block_end, seed=seed)
+    plan = find_clusters(state)
+    shares = plan_bridges(state, plan)
+    print_clusters(plan)
+
+    tasks = []
+    for k, cluster in enumerate(plan["clusters"]):
+        if not cluster["members"]:
+            continue  # nobody to schedule; the merge reports the gaps
+        tasks.append({
+            "cluster": k,
+            "inputs": _cluster_inputs(inputs, cluster),
+            "bridges": {name: per[k] for name, per in shares.items() if k in per},
+            "block_start": block_start,
+            "block_end": block_end,
+            "seed": seed,
+            "search_seconds": search_seconds,
+            "mode": mode,
+            "stop_at_bound": gap_floor is not None,
+        })
+
+    print(f"\n[Clusters] Scheduling {len(tasks)} cluster(s) with {max(1, jobs)} worker(s)...")
+    t_clusters = time.perf_counter()
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            cluster_results = list(pool.map(_run_cluster, tasks))
+    else:
+        cluster_results = [_run_cluster(task) for task in tasks]
+    t_clusters = time.perf_counter() - t_clusters
+    for r in cluster_results:
+        print(f"  Cluster {r['cluster'] + 1}: {len(r['assignments'])} assignments, "
+              f"{r['gaps']} gaps, {r['zero_gap_violations']} zero-gap violations "
+              f"({r['seconds']:.2f}s)")
+
+    print(f"\n[Merge] Combining cluster rosters...")
+    dropped = merge_clusters(state, cluster_results)
+    print(f"  Placed {state.total_weeks() + state.total_weekends()}, "
+          f"dropped {len(dropped)} cross-cluster conflict(s)")
+    engine._log_phase_stats(state, "Merge")
+
+    # Same random stream however many workers ran the clusters
+    random.seed(seed)
+    t_merge = time.perf_counter()
+    engine._fill_phases(state, mode=mode)
+    t_merge = time.perf_counter() - t_merge
+
+    results = engine.phase5_output(state)
+    results["stats"]["mode"] = mode
+    results["decomposition"] = {
+        "clusters": [{"sites": c["sites"], "providers": len(c["members"])}
+                     for c in plan["clusters"]],
+        "bridge_providers": sorted(plan["bridges"]),
+        "cluster_results": [{k: r[k] for k in ("cluster", "gaps", "zero_gap_violations",
+                                                "seconds")}
+                            for r in cluster_results],
+        "dropped": [{"period_idx": idx, "provider": name, "site": site, "reason": reason}
+                    for idx, name, site, reason in dropped],
+        "cluster_seconds": round(t_clusters, 3),
+        "merge_fill_seconds": round(t_merge, 3),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+    print(f"\n{'=' * 70}")
+    print(f"Engine v3 complete (seed={seed}, mode={mode}, {len(tasks)} clusters)")
+    print(f"{'=' * 70}\n")
+    return results
+
+
+def print_clusters(plan):
+    """Print the cluster table and the bridge providers."""
+    print(f"\n  Site clusters:")
+    for k, cluster in enumerate(plan["clusters"]):
+        print(f"    {k + 1}. {', '.join(cluster['sites'])}: {len(cluster['members'])} providers")
+    bridges = plan["bridges"]
+    print(f"  Bridge providers (split between clusters): {len(bridges)}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    from block.engines.v3.run import (
+        BLOCK_START, BLOCK_END, DEFAULT_EXCEL, DEFAULT_PRE_SCHEDULE,
+        DEFAULT_AVAILABILITY_DIR,
+    )
+
+    parser = argparse.ArgumentParser(description="Site clusters for the v3 block schedule")
+    parser.add_argument("--excel", type=str, default=DEFAULT_EXCEL,
+                        help="Path to hospitalist_scheduler.xlsx")
+    parser.add_argument("--pre-schedule", type=str, default=DEFAULT_PRE_SCHEDULE,
+                        help="Path to pre_schedule_output.json")
+    parser.add_argument("--no-pre-schedule", action="store_true",
+                        help="Skip loading pre-scheduler data")
+    parser.add_argument("--availability-dir", type=str, default=DEFAULT_AVAILABILITY_DIR,
+                        help="Directory with individual availability JSONs")
+    args = parser.parse_args()
+
+    pre_schedule_path = None if args.no_pre_schedule else args.pre_schedule
+    inputs = engine.load_inputs(args.excel, pre_schedule_path, args.availability_dir,
+                                use_cache=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = engine.build_state(inputs, BLOCK_START, BLOCK_END)
+    plan = find_clusters(state)
+    print_clusters(plan)
+    for name, ks in sorted(plan["bridges"].items()):
+        print(f"    {name}: clusters {', '.join(str(k + 1) for k in ks)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
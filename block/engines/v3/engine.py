@@ -9,6 +9,7 @@ Key differences from v1/v2:
   - Never force-fills — unfilled slots go to actionable gap report
   - Two-stage output: clean draft schedule + gap report with candidate lists
   - Swap evaluation reduces gaps without creating new violations
+  - Optional time-boxed local search (Phase 4b) polishes the finished schedule
 
 Design principles:
   - Hard constraints are NEVER relaxed
@@ -17,12 +18,24 @@ Design principles:
   - Gaps are reported with viable candidates so manual scheduler can close them
 """
 
+import bisect
 import json
 import math
 import os
 import random
+import time
 from collections import defaultdict
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import networkx as nx
+except ImportError:
+    nx = None
 
 import sys
 _ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -35,12 +48,14 @@ if _PROJECT_ROOT not in sys.path:
 
 from block.engines.shared.loader import (
     load_availability, build_name_map, build_periods,
-    get_eligible_sites, has_tag, get_tag_rules, is_available,
-    SITE_PCT_MAP, PCT_TO_SITES,
+    get_eligible_sites, has_tag, get_tag_rules,
+    AvailabilityIndex, SITE_PCT_MAP, PCT_TO_SITES,
 )
 from block.engines.v3.excel_io import (
     load_providers_from_excel, load_tags_from_excel, load_sites_from_excel,
 )
+from block.engines.v3 import input_cache
+from block.engines.v3.engine_state import EngineState
 
 # ═════════════════════════════════════════════════════════════════════════════
 # CONSTANTS
@@ -67,6 +82,28 @@ ZERO_GAP_SITES = [
 # Maximum consecutive calendar days a provider can work (hard constraint)
 MAX_CONSECUTIVE_DAYS = 12
 
+# Smallest candidate list scored with NumPy; shorter lists use the scalar path
+SCORE_BATCH_MIN = 8
+
+# Phase 4b local search objective weights (lower objective = better schedule)
+SEARCH_WEIGHTS = {
+    "gap": 100,           # per unfilled slot
+    "zero_gap": 1000,     # extra per unfilled slot at a zero-gap site
+    "stretch": 5,         # per day a consecutive run goes past 7 days
+    "distribution": 1,    # per shift away from the provider's site percentages
+}
+
+# Phase 4b simulated-annealing temperature at the start and end of the budget
+SEARCH_TEMPERATURE = (20.0, 0.2)
+
+# Fill strategy for Phases 2-3: greedy slot-by-slot, or min-cost flow per period
+ENGINE_MODES = ("greedy", "flow")
+
+# Flow mode costs: score scale, and a per-slot bonus by gap tolerance tier so
+# zero-gap sites win over tolerant ones when a period can't fill everything
+FLOW_SCORE_SCALE = 10
+FLOW_TIER_BONUS = {0: 300000, 1: 200000, 2: 100000}
+
 # Conflict pairs — providers who cannot work the same week
 CONFLICT_PAIR_NAMES = [("HAROLDSON", "MCMILLIAN")]
 
@@ -83,25 +120,67 @@ def _gap_tolerance(site):
 # ═════════════════════════════════════════════════════════════════════════════
 
 def phase0_load(excel_path, pre_schedule_path, availability_dir,
-                block_start, block_end, seed=42):
+                block_start, block_end, seed=42,
+                use_cache=False, rebuild_cache=False):
     """Load all data, filter eligible providers, compute targets.
 
     Consumes pre-scheduler output for accurate prior actuals and tag config.
     Reads Excel workbook for provider data, site demand, and manual corrections.
+    With use_cache, parsed inputs come from the snapshot cache when unchanged.
 
     Returns:
-        dict (engine state) — all data structures needed by later phases
+        EngineState — all data structures needed by later phases
     """
-    random.seed(seed)
-
     print(f"{'=' * 70}")
     print(f"BLOCK SCHEDULE ENGINE v3 — seed={seed}")
     print(f"Block: {block_start.strftime('%Y-%m-%d')} to {block_end.strftime('%Y-%m-%d')}")
     print(f"{'=' * 70}")
 
-    # ── Load pre-scheduler output ─────────────────────────────────────
     print("\n[Phase 0] Loading data...")
+    inputs = load_inputs(excel_path, pre_schedule_path, availability_dir,
+                         use_cache=use_cache, rebuild_cache=rebuild_cache)
+    return build_state(inputs, block_start, block_end, seed=seed)
+
+
+def load_inputs(excel_path, pre_schedule_path, availability_dir,
+                use_cache=False, rebuild_cache=False):
+    """Read every seed-independent engine input from disk.
+
+    Covers the pre-scheduler JSON, the Excel workbook (with prior-actuals
+    overrides applied), availability JSONs and name matching. The result is
+    consumed by build_state() and can be reused across seeds.
+
+    With use_cache, a snapshot keyed by the input files' contents is served
+    when present (see input_cache.py); rebuild_cache forces a fresh read
+    and overwrites the snapshot.
 
+    Returns:
+        dict with pre_data, providers, tags_data, sites_demand,
+        unavailable_dates, name_map, unmatched
+    """
+    if not use_cache:
+        return _read_inputs(excel_path, pre_schedule_path, availability_dir)
+
+    key = input_cache.snapshot_key(excel_path, pre_schedule_path, availability_dir)
+    if not rebuild_cache:
+        inputs = input_cache.read_snapshot(key)
+        if inputs is not None:
+            print(f"  Input snapshot: hit ({key[:12]})")
+            print(f"  Providers:     {len(inputs['providers'])}")
+            print(f"  Availability:  {len(inputs['unavailable_dates'])} providers with JSON files")
+            print(f"  Name matching: {len(inputs['name_map']) - len(inputs['unmatched'])}"
+                  f"/{len(inputs['providers'])} matched")
+            return inputs
+
+    inputs = _read_inputs(excel_path, pre_schedule_path, availability_dir)
+    path = input_cache.write_snapshot(key, inputs)
+    print(f"  Input snapshot: {'rebuilt' if rebuild_cache else 'saved'} ({key[:12]}) -> {path}")
+    return inputs
+
+
+def _read_inputs(excel_path, pre_schedule_path, availability_dir):
+    """Uncached body of load_inputs()."""
+    # ── Load pre-scheduler output ─────────────────────────────────────
     pre_data = {}
     if pre_schedule_path and os.path.exists(pre_schedule_path):
         with open(pre_schedule_path) as f:
@@ -144,6 +223,45 @@ def phase0_load(excel_path, pre_schedule_path, availability_dir,
                     pdata["weekends_remaining"] = new_we_rem
             print(f"  Prior actuals: {len(computed_actuals)} computed, {overrides} overrides applied")
 
+    # ── Load availability ─────────────────────────────────────────────
+    unavailable_dates = load_availability(schedules_dir=availability_dir)
+    print(f"  Availability:  {len(unavailable_dates)} providers with JSON files")
+
+    # ── Match provider names to availability JSONs ────────────────────
+    name_map, unmatched = build_name_map(providers, unavailable_dates)
+    matched_count = len(name_map) - len(unmatched)
+    print(f"  Name matching: {matched_count}/{len(providers)} matched "
+          f"({len(unmatched)} unmatched — treated as fully available)")
+
+    return {
+        "pre_data": pre_data,
+        "providers": providers,
+        "tags_data": tags_data,
+        "sites_demand": sites_demand,
+        "unavailable_dates": unavailable_dates,
+        "name_map": name_map,
+        "unmatched": unmatched,
+    }
+
+
+def build_state(inputs, block_start, block_end, seed=42):
+    """Build the engine state for one seed from load_inputs() output.
+
+    Filters eligible providers, computes targets, site pools and periods,
+    and initializes empty assignment tracking. Does not mutate inputs.
+
+    Returns:
+        EngineState — all data structures needed by later phases
+    """
+    random.seed(seed)
+
+    pre_data = inputs["pre_data"]
+    providers = inputs["providers"]
+    tags_data = inputs["tags_data"]
+    sites_demand = inputs["sites_demand"]
+    unavailable_dates = inputs["unavailable_dates"]
+    name_map = inputs["name_map"]
+
     # ── Load difficulty/holiday info from pre-scheduler ────────────────
     difficulty_records = {}
     if "difficulty" in pre_data:
@@ -155,22 +273,27 @@ def phase0_load(excel_path, pre_schedule_path, availability_dir,
         for rec in pre_data["holiday"].get("records", []):
             holiday_records[rec["provider"]] = rec
 
-    # ── Load availability ─────────────────────────────────────────────
-    unavailable_dates = load_availability()
-    print(f"  Availability:  {len(unavailable_dates)} providers with JSON files")
-
-    # ── Match provider names to availability JSONs ────────────────────
-    name_map, unmatched = build_name_map(providers, unavailable_dates)
-    matched_count = len(name_map) - len(unmatched)
-    print(f"  Name matching: {matched_count}/{len(providers)} matched "
-          f"({len(unmatched)} unmatched — treated as fully available)")
-
     # ── Build period list ─────────────────────────────────────────────
     periods = build_periods(block_start, block_end)
     n_weeks = sum(1 for p in periods if p["type"] == "week")
     n_weekends = sum(1 for p in periods if p["type"] == "weekend")
     print(f"  Periods:       {n_weeks} weeks, {n_weekends} weekends")
 
+    # Day-ordinal span of each period (dates within a period are contiguous)
+    period_spans = [
+        (date.fromisoformat(p["dates"][0]).toordinal(),
+         date.fromisoformat(p["dates"][-1]).toordinal())
+        for p in periods
+    ]
+
+    # ── Bitset availability: one mask per period and per provider ─────
+    avail_index = AvailabilityIndex(unavailable_dates, block_start, block_end)
+    period_masks = [avail_index.dates_mask(p["dates"]) for p in periods]
+    prov_unavail_mask = {
+        pname: avail_index.unavailable_mask(name_map.get(pname))
+        for pname in providers
+    }
+
     # ── Identify Memorial Day week ────────────────────────────────────
     memorial_day_date = _find_memorial_day(block_start.year, block_end.year)
     memorial_week_num = None
@@ -271,45 +394,35 @@ def phase0_load(excel_path, pre_schedule_path, availability_dir,
         print(f"    {site}: {len(pool)} providers")
 
     # ── Initialize assignment state ───────────────────────────────────
-    state = {
-        # Raw data
-        "providers": providers,
-        "tags_data": tags_data,
-        "sites_demand": sites_demand,
-        "unavailable_dates": unavailable_dates,
-        "name_map": name_map,
-
-        # Pre-scheduler data
-        "difficulty_records": difficulty_records,
-        "holiday_records": holiday_records,
-
-        # Computed
-        "periods": periods,
-        "eligible": eligible,
-        "excluded_reasons": dict(excluded_reasons),
-        "fair_share_wk": fair_share_wk,
-        "fair_share_we": fair_share_we,
-        "provider_eligible_sites": provider_eligible_sites,
-        "site_list_weekday": site_list_weekday,
-        "site_list_weekend": site_list_weekend,
-        "conflict_pairs": conflict_pairs,
-        "site_provider_pool": dict(site_provider_pool),
-        "memorial_week_num": memorial_week_num,
-
-        # Assignment tracking (mutable)
-        "prov_assignments": defaultdict(list),       # pname -> [(period_idx, site), ...]
-        "prov_week_count": defaultdict(int),          # pname -> int
-        "prov_we_count": defaultdict(int),            # pname -> int
-        "prov_site_counts": defaultdict(lambda: defaultdict(int)),  # pname -> {site -> int}
-        "prov_week_site": {},                         # (pname, week_num) -> site
-        "period_assignments": defaultdict(list),      # period_idx -> [(pname, site), ...]
-
-        # Metadata
-        "seed": seed,
-        "block_start": block_start,
-        "block_end": block_end,
-        "n_weeks": n_weeks,
-    }
+    state = EngineState(
+        providers=providers,
+        tags_data=tags_data,
+        sites_demand=sites_demand,
+        unavailable_dates=avail_index,
+        name_map=name_map,
+        difficulty_records=difficulty_records,
+        holiday_records=holiday_records,
+        periods=periods,
+        period_spans=period_spans,
+        period_masks=period_masks,
+        prov_unavail_mask=prov_unavail_mask,
+        eligible=eligible,
+        excluded_reasons=dict(excluded_reasons),
+        fair_share_wk=fair_share_wk,
+        fair_share_we=fair_share_we,
+        provider_eligible_sites=provider_eligible_sites,
+        site_list_weekday=site_list_weekday,
+        site_list_weekend=site_list_weekend,
+        conflict_pairs=conflict_pairs,
+        site_provider_pool=dict(site_provider_pool),
+        memorial_week_num=memorial_week_num,
+        seed=seed,
+        block_start=block_start,
+        block_end=block_end,
+        gap_tolerance=_gap_tolerance,
+    )
+    _build_candidate_index(state)
+    state.score_views = _build_score_views(state) if np is not None else None
 
     print(f"\n[Phase 0] Setup complete.")
     return state
@@ -329,126 +442,70 @@ def _find_memorial_day(start_year, end_year):
 # ═════════════════════════════════════════════════════════════════════════════
 # HARD CONSTRAINT CHECKS
 # ═════════════════════════════════════════════════════════════════════════════
+#
+# From here on providers, sites and periods are EngineState integer IDs:
+# p (provider), s (site), idx (period). Names reappear in phase5_output().
 
-def _get_assigned_dates(state, pname):
-    """Get set of all date strings where provider is assigned."""
-    dates = set()
-    for pa_idx, _ in state["prov_assignments"].get(pname, []):
-        for d_str in state["periods"][pa_idx]["dates"]:
-            dates.add(d_str)
-    return dates
-
-
-def _max_consecutive_with_dates(existing_dates, new_dates):
-    """Compute max consecutive days if new_dates were added to existing_dates.
-
-    Returns the max consecutive streak length.
-    """
-    all_dates = existing_dates | new_dates
-    if not all_dates:
-        return 0
-
-    sorted_dates = sorted(all_dates)
-    max_streak = 1
-    current_streak = 1
-
-    for i in range(1, len(sorted_dates)):
-        d1 = datetime.strptime(sorted_dates[i - 1], "%Y-%m-%d").date()
-        d2 = datetime.strptime(sorted_dates[i], "%Y-%m-%d").date()
-        if (d2 - d1).days == 1:
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 1
-
-    return max_streak
-
-
-def _would_exceed_consecutive(state, pname, period_idx):
+def _would_exceed_consecutive(state, p, period_idx):
     """Check if assigning this period would create a >12 consecutive day run."""
-    existing = _get_assigned_dates(state, pname)
-    new_dates = set(state["periods"][period_idx]["dates"])
-    max_streak = _max_consecutive_with_dates(existing, new_dates)
+    max_streak, _ = state.streak_if_added(p, period_idx)
     return max_streak > MAX_CONSECUTIVE_DAYS
 
 
-def _current_consecutive_days(state, pname):
-    """Get the current max consecutive day run for a provider."""
-    dates = _get_assigned_dates(state, pname)
-    if not dates:
-        return 0
-    return _max_consecutive_with_dates(dates, set())
-
-
-def _check_conflict_pairs(state, pname, period_idx):
-    """Returns True if assigning pname here violates a conflict pair."""
-    week_num = state["periods"][period_idx]["num"]
-    for p1, p2 in state["conflict_pairs"]:
-        partner = None
-        if pname == p1:
-            partner = p2
-        elif pname == p2:
-            partner = p1
-        if partner is None:
-            continue
-        for pa_idx, _ in state["prov_assignments"].get(partner, []):
-            if state["periods"][pa_idx]["num"] == week_num:
+def _check_conflict_pairs(state, p, period_idx):
+    """Returns True if assigning p here violates a conflict pair."""
+    partners = state.partners[p]
+    if not partners:
+        return False
+    for idx in state.week_periods[state.periods[period_idx]["num"]]:
+        for partner in partners:
+            if state.site_at(partner, idx) >= 0:
                 return True
     return False
 
 
-def _is_provider_available(state, pname, dates):
-    """Check if provider is available for all dates."""
-    return is_available(pname, state["name_map"].get(pname),
-                        dates, state["unavailable_dates"])
+def _is_provider_available(state, p, period_idx):
+    """Check if provider is available for every date in the period."""
+    return not (state.unavail_mask[p] & state.period_masks[period_idx])
 
 
-def _can_assign(state, pname, period_idx, site, use_cap=True):
-    """Full hard constraint check for assigning pname to site in period.
+def _can_assign(state, p, period_idx, s, use_cap=True):
+    """Full hard constraint check for assigning p to site s in period.
 
     Returns (True, "") or (False, reason_string).
     """
-    period = state["periods"][period_idx]
-    ptype = period["type"]
-    week_num = period["num"]
-    dates = period["dates"]
-    pdata = state["eligible"].get(pname)
-
-    if pdata is None:
-        return False, "not_eligible"
-
     # Already assigned this period?
-    if any(n == pname for n, _ in state["period_assignments"][period_idx]):
+    if p in state.roster[period_idx]:
         return False, "already_assigned_period"
 
     # Capacity check
-    if ptype == "week":
-        cap = math.floor(pdata["weeks_remaining"])
-        if cap <= 0 or state["prov_week_count"][pname] >= cap:
+    if state.period_is_week[period_idx]:
+        cap = state.wk_cap[p]
+        if cap <= 0 or state.week_count[p] >= cap:
             return False, "capacity_exhausted"
-        if use_cap and state["prov_week_count"][pname] >= state["fair_share_wk"][pname]:
+        if use_cap and state.week_count[p] >= state.fs_wk[p]:
             return False, "fair_share_cap"
     else:
-        cap = math.floor(pdata["weekends_remaining"])
-        if cap <= 0 or state["prov_we_count"][pname] >= cap:
+        cap = state.we_cap[p]
+        if cap <= 0 or state.weekend_count[p] >= cap:
             return False, "capacity_exhausted"
-        if use_cap and state["prov_we_count"][pname] >= state["fair_share_we"][pname]:
+        if use_cap and state.weekend_count[p] >= state.fs_we[p]:
             return False, "fair_share_cap"
 
     # Site eligibility
-    if site not in state["provider_eligible_sites"].get(pname, []):
+    if s not in state.prov_site_set[p]:
         return False, "site_ineligible"
 
     # Availability (SACRED)
-    if not _is_provider_available(state, pname, dates):
+    if not _is_provider_available(state, p, period_idx):
         return False, "unavailable"
 
     # Consecutive day check (>12 days)
-    if _would_exceed_consecutive(state, pname, period_idx):
+    if _would_exceed_consecutive(state, p, period_idx):
         return False, "consecutive_violation"
 
     # Conflict pair check
-    if _check_conflict_pairs(state, pname, period_idx):
+    if _check_conflict_pairs(state, p, period_idx):
         return False, "conflict_pair"
 
     return True, ""
@@ -458,62 +515,44 @@ def _can_assign(state, pname, period_idx, site, use_cap=True):
 # ASSIGNMENT OPERATIONS
 # ═════════════════════════════════════════════════════════════════════════════
 
-def _place_provider(state, pname, period_idx, site):
+def _place_provider(state, p, period_idx, s):
     """Place a provider into a period at a site. Updates all tracking state."""
-    period = state["periods"][period_idx]
-    ptype = period["type"]
-    week_num = period["num"]
+    before = _candidate_flags(state, p, period_idx)
+    state.place(p, period_idx, s)
+    _reindex_candidates(state, p, period_idx, before, state.run_extent(p, period_idx))
 
-    state["prov_assignments"][pname].append((period_idx, site))
-    state["period_assignments"][period_idx].append((pname, site))
-    state["prov_site_counts"][pname][site] += 1
 
-    if ptype == "week":
-        state["prov_week_count"][pname] += 1
-        state["prov_week_site"][(pname, week_num)] = site
-    else:
-        state["prov_we_count"][pname] += 1
-
-
-def _remove_provider(state, pname, period_idx):
-    """Remove a provider from a period. Returns the site they were at."""
-    period = state["periods"][period_idx]
-    ptype = period["type"]
-    week_num = period["num"]
-
-    # Remove from prov_assignments
-    pa_list = state["prov_assignments"][pname]
-    site = None
-    for i, (pidx, s) in enumerate(pa_list):
-        if pidx == period_idx:
-            site = s
-            pa_list.pop(i)
-            break
+def _remove_provider(state, p, period_idx):
+    """Remove a provider from a period. Returns the site they were at (or -1)."""
+    before = _candidate_flags(state, p, period_idx)
+    extent = state.run_extent(p, period_idx) if state.site_at(p, period_idx) >= 0 else None
+    s = state.remove(p, period_idx)
+    _reindex_candidates(state, p, period_idx, before, extent)
+    return s
 
-    # Remove from period_assignments
-    pa_period = state["period_assignments"][period_idx]
-    for i, (n, s) in enumerate(pa_period):
-        if n == pname:
-            pa_period.pop(i)
-            break
 
-    if site:
-        state["prov_site_counts"][pname][site] -= 1
-
-    if ptype == "week":
-        state["prov_week_count"][pname] -= 1
-        state["prov_week_site"].pop((pname, week_num), None)
-    else:
-        state["prov_we_count"][pname] -= 1
+def _rollback(state, savepoint):
+    """Undo every placement and removal since state.checkpoint() returned savepoint.
 
-    return site
+    Reverts the journaled changes newest first, keeping the candidate index
+    in step, so a trial move costs time proportional to its size.
+    """
+    for entry in state.unwind(savepoint):
+        p, period_idx = entry[1], entry[2]
+        before = _candidate_flags(state, p, period_idx)
+        held = state.site_at(p, period_idx) >= 0
+        extent = state.run_extent(p, period_idx) if held else None
+        state.revert(entry)
+        if not held and state.site_at(p, period_idx) >= 0:
+            extent = state.run_extent(p, period_idx)
+        _reindex_candidates(state, p, period_idx, before, extent)
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # SCORING
 # ═════════════════════════════════════════════════════════════════════════════
 
-def _score_candidate(state, pname, period_idx, site, period_type):
+def _score_candidate(state, p, period_idx, s, period_type):
     """Score a candidate for assignment. Higher = better.
 
     Scoring factors:
@@ -523,60 +562,50 @@ def _score_candidate(state, pname, period_idx, site, period_type):
       - Site percentage alignment
       - Anti-compression (avoid consecutive when slack exists)
     """
-    pdata = state["eligible"][pname]
-    period = state["periods"][period_idx]
-    week_num = period["num"]
+    pdata = state.prov_data[p]
+    week_num = state.periods[period_idx]["num"]
 
     score = 0.0
 
     # ── Stretch pairing bonus (weekends should match weekday site) ────
     if period_type == "weekend":
-        prev_site = state["prov_week_site"].get((pname, week_num))
-        if prev_site == site:
+        prev_site = state.week_site(p, week_num)
+        if prev_site == s:
             score += 100  # Strong bonus: keep at same site for stretch
-        elif prev_site is not None and prev_site != site:
+        elif prev_site >= 0:
             score -= 50   # Penalty: different site breaks stretch
 
     # ── Site allocation: how far behind at this site ──────────────────
-    pct_field = SITE_PCT_MAP.get(site, "")
+    pct_field = SITE_PCT_MAP.get(state.sites[s], "")
     site_pct = pdata.get(pct_field, 0) if pct_field else 0
-    rem_key = "weeks_remaining" if period_type == "week" else "weekends_remaining"
-    target_at_site = math.floor(pdata[rem_key]) * site_pct
-    done_at_site = state["prov_site_counts"][pname].get(site, 0)
+    rem = state.wk_cap[p] if period_type == "week" else state.we_cap[p]
+    target_at_site = rem * site_pct
+    done_at_site = state.site_count[p * state.n_sites + s]
     behind_at_site = target_at_site - done_at_site
     score += behind_at_site * 5
 
     # ── Spacing from last assignment ──────────────────────────────────
-    assigned_periods = state["prov_assignments"].get(pname, [])
-    if assigned_periods:
-        last_idx = max(pidx for pidx, _ in assigned_periods)
+    last_idx = state.last_assigned(p)
+    if last_idx >= 0:
         gap = period_idx - last_idx
     else:
         gap = period_idx + 10
     score += gap * 3
 
     # ── Anti-compression: avoid extending consecutive runs when there's slack ──
-    existing_dates = _get_assigned_dates(state, pname)
-    new_dates = set(state["periods"][period_idx]["dates"])
-    would_be_streak = _max_consecutive_with_dates(existing_dates, new_dates)
-    current_streak = _max_consecutive_with_dates(existing_dates, set()) if existing_dates else 0
+    would_be_streak, current_streak = state.streak_if_added(p, period_idx)
 
     if would_be_streak > current_streak:
         # This assignment extends a consecutive run
         if period_type == "week":
-            total_periods = sum(1 for p in state["periods"] if p["type"] == period_type)
-            target = math.floor(pdata["weeks_remaining"])
-            slack = total_periods - target
+            slack = state.n_weeks - state.wk_cap[p]
             if slack >= 3 and would_be_streak > 7:
                 score -= 150  # Plenty of room, avoid long stretches
             elif slack >= 1 and would_be_streak > 7:
                 score -= 50
         elif period_type == "weekend":
-            prev_site = state["prov_week_site"].get((pname, week_num))
-            if prev_site is None and would_be_streak > 7:
-                total_we = sum(1 for p in state["periods"] if p["type"] == "weekend")
-                target = math.floor(pdata["weekends_remaining"])
-                slack = total_we - target
+            if prev_site < 0 and would_be_streak > 7:
+                slack = state.n_weekends - state.we_cap[p]
                 if slack >= 3:
                     score -= 120
 
@@ -589,79 +618,375 @@ def _score_candidate(state, pname, period_idx, site, period_type):
     return score
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# BATCHED SCORING
+# ═════════════════════════════════════════════════════════════════════════════
+#
+# _score_candidates() scores a whole candidate list for one (period, site)
+# slot with NumPy, reading the EngineState arrays through zero-copy views.
+# Every term is computed with the same float operations in the same order as
+# _score_candidate, and the jitter is drawn from the seeded `random` stream
+# one candidate at a time, so scores — and rankings — match it exactly.
+
+def _build_score_views(state):
+    """NumPy views of the EngineState arrays plus static per-provider inputs."""
+    def view(arr, *shape):
+        return np.frombuffer(arr, dtype=np.dtype(arr.typecode)).reshape(shape)
+
+    pct = np.zeros((state.n_providers, state.n_sites))
+    for s, site in enumerate(state.sites):
+        pct_field = SITE_PCT_MAP.get(site, "")
+        if pct_field:
+            pct[:, s] = [pdata.get(pct_field, 0) for pdata in state.prov_data]
+
+    spans = state.period_spans
+    return {
+        "site_code": view(state.site_code, state.n_providers, state.n_periods),
+        "site_count": view(state.site_count, state.n_providers, state.n_sites),
+        "max_streak": view(state.max_streak, state.n_providers),
+        "pct": pct,                                              # [p, s] site percentage
+        "rem": {"week": np.array(state.wk_cap, dtype=np.int64),  # [p] floor(remaining)
+                "weekend": np.array(state.we_cap, dtype=np.int64)},
+        "period_range": np.arange(state.n_periods),
+        "period_len": [last - first + 1 for first, last in spans],
+        # contiguous[k]: period k starts the day after period k-1 ends
+        "contiguous": [k > 0 and spans[k - 1][1] + 1 == spans[k][0]
+                       for k in range(state.n_periods)],
+    }
+
+
+def _streaks_if_added(v, held, period_idx):
+    """Vector streak_if_added: (would_be_streak, current_streak) per row of held.
+
+    Walks outward from the period over contiguous neighbouring periods the
+    providers hold, summing their day counts — the runs on either side.
+    """
+    period_len = v["period_len"]
+    contiguous = v["contiguous"]
+    n = held.shape[0]
+    merged = np.full(n, period_len[period_idx], dtype=np.int64)
+
+    alive = np.ones(n, dtype=bool)
+    k = period_idx - 1
+    while k >= 0 and contiguous[k + 1]:
+        alive &= held[:, k]
+        if not alive.any():
+            break
+        merged += np.where(alive, period_len[k], 0)
+        k -= 1
+
+    alive = np.ones(n, dtype=bool)
+    k = period_idx + 1
+    while k < len(period_len) and contiguous[k]:
+        alive &= held[:, k]
+        if not alive.any():
+            break
+        merged += np.where(alive, period_len[k], 0)
+        k += 1
+
+    return merged
+
+
+def _score_candidates(state, pids, period_idx, s, period_type):
+    """Score a list of candidates for one slot. Higher = better.
+
+    Same scores, in the same order, as calling _score_candidate for each
+    provider (including one jitter draw per candidate). None of pids may
+    already hold period_idx.
+
+    Returns:
+        list of float scores aligned with pids
+    """
+    v = state.score_views
+    if v is None or len(pids) < SCORE_BATCH_MIN:
+        return [_score_candidate(state, p, period_idx, s, period_type) for p in pids]
+
+    n = len(pids)
+    ids = np.fromiter(pids, dtype=np.intp, count=n)
+    codes = v["site_code"][ids]
+    held = codes >= 0
+    week_num = state.periods[period_idx]["num"]
+
+    score = np.zeros(n)
+
+    # Stretch pairing bonus (weekends should match weekday site)
+    if period_type == "weekend":
+        week_idx = state.week_idx_of_num.get(week_num)
+        prev_site = codes[:, week_idx] if week_idx is not None else np.full(n, -1)
+        score += np.where(prev_site == s, 100.0,
+                          np.where(prev_site >= 0, -50.0, 0.0))
+
+    # Site allocation: how far behind at this site
+    site_pct = v["pct"][ids, s]
+    rem = v["rem"]["week" if period_type == "week" else "weekend"][ids]
+    behind_at_site = rem * site_pct - v["site_count"][ids, s]
+    score += behind_at_site * 5
+
+    # Spacing from last assignment
+    last_idx = np.where(held, v["period_range"], -1).max(axis=1)
+    gap = np.where(last_idx >= 0, period_idx - last_idx, period_idx + 10)
+    score += gap * 3
+
+    # Anti-compression
+    current_streak = v["max_streak"][ids]
+    would_be_streak = np.maximum(current_streak, _streaks_if_added(v, held, period_idx))
+    long_ext = (would_be_streak > current_streak) & (would_be_streak > 7)
+    if period_type == "week":
+        slack = state.n_weeks - rem
+        score += np.where(long_ext & (slack >= 3), -150.0,
+                          np.where(long_ext & (slack >= 1), -50.0, 0.0))
+    elif period_type == "weekend":
+        slack = state.n_weekends - rem
+        score += np.where(long_ext & (prev_site < 0) & (slack >= 3), -120.0, 0.0)
+
+    # Site percentage alignment bonus
+    score += site_pct * 2
+
+    # Random jitter, drawn in candidate order from the seeded stream
+    score += np.array([random.uniform(-2, 2) for _ in range(n)])
+
+    return score.tolist()
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # CONSTRAINT PROPAGATION
 # ═════════════════════════════════════════════════════════════════════════════
 
-def _count_available_providers(state, site, period_idx, use_cap=True, exclude=None):
+def _count_available_providers(state, s, period_idx, use_cap=True, exclude=None):
     """Count how many eligible providers could fill this slot.
 
     Used for look-ahead: if assigning someone here reduces a future
-    slot's candidate count to zero, we should reconsider.
+    slot's candidate count to zero, we should reconsider. Indexed slots
+    (see CANDIDATE INDEX) are answered from the maintained counts.
     """
     exclude = exclude or set()
-    count = 0
-    period = state["periods"][period_idx]
-    dates = period["dates"]
+    slot = period_idx * state.n_sites + s
+    members = state.slot_candidates.get(slot)
+    if members is not None:
+        is_week = state.period_is_week[period_idx]
+        count = state.slot_candidate_count[slot][use_cap]
+        for p in exclude:
+            if p in members and _capacity_open(state, p, is_week, use_cap):
+                count -= 1
+        return count
 
-    for pname in state["site_provider_pool"].get(site, []):
-        if pname in exclude:
+    count = 0
+    for p in state.pool[s]:
+        if p in exclude:
             continue
-        ok, _ = _can_assign(state, pname, period_idx, site, use_cap=use_cap)
+        ok, _ = _can_assign(state, p, period_idx, s, use_cap=use_cap)
         if ok:
             count += 1
     return count
 
 
-def _would_starve_critical_slot(state, pname, period_idx, use_cap=True):
-    """Look-ahead: would assigning pname here make a zero-gap slot impossible?
+def _would_starve_critical_slot(state, p, period_idx, use_cap=True):
+    """Look-ahead: would assigning p here make a zero-gap slot impossible?
 
     For each zero-gap site in the same week and adjacent weeks, check if
-    removing pname from the candidate pool reduces any slot to zero candidates.
+    removing p from the candidate pool reduces any slot to zero candidates.
 
     Returns (True, description) or (False, "").
     """
-    period = state["periods"][period_idx]
-    week_num = period["num"]
+    # Zero-gap sites p could fill (see CANDIDATE INDEX), in ZERO_GAP_SITES order
+    sites = state.prov_index_sites[p]
+    if not sites:
+        return False, ""
 
     # Check same week and ±1 week for critical sites
-    check_weeks = {week_num, week_num - 1, week_num + 1}
-
-    for check_idx, p in enumerate(state["periods"]):
-        if p["num"] not in check_weeks:
-            continue
+    week_num = state.periods[period_idx]["num"]
+    n_sites = state.n_sites
+    for check_idx in state.lookahead_periods[week_num]:
         if check_idx == period_idx:
             continue
+        base = check_idx * n_sites
 
-        p_dates = p["dates"]
-        p_type = "weekday" if p["type"] == "week" else "weekend"
-
-        for site in ZERO_GAP_SITES:
-            demand = state["sites_demand"].get((site, p_type), 0)
-            if demand <= 0:
-                continue
-
-            # How many are already filled?
-            filled = sum(1 for _, s in state["period_assignments"][check_idx] if s == site)
-            if filled >= demand:
+        for s in sites:
+            # How many are still needed? (zero when the site has no demand)
+            remaining_need = state.shortfall[base + s]
+            if remaining_need <= 0:
                 continue  # Already covered
 
-            # Is pname even a candidate for this slot?
-            if site not in state["provider_eligible_sites"].get(pname, []):
-                continue
-
-            # Would this slot have zero candidates without pname?
-            remaining_need = demand - filled
+            # Would this slot have zero candidates without p?
             available_count = _count_available_providers(
-                state, site, check_idx, use_cap=use_cap, exclude={pname}
+                state, s, check_idx, use_cap=use_cap, exclude={p}
             )
 
             if available_count < remaining_need:
-                return True, f"{site} week {p['num']} would have {available_count}/{remaining_need} candidates"
+                return True, (f"{state.sites[s]} week {state.periods[check_idx]['num']} "
+                              f"would have {available_count}/{remaining_need} candidates")
 
     return False, ""
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# CANDIDATE INDEX
+# ═════════════════════════════════════════════════════════════════════════════
+#
+# For every (period, zero-gap site) slot the index keeps the set of pool
+# providers that pass the capacity-independent part of _can_assign (not yet
+# in the period, available, within the consecutive-day limit, no conflict
+# partner that week), plus how many of them also have capacity left — with
+# and without the fair-share cap. _count_available_providers() then answers
+# look-ahead queries with a lookup instead of re-checking the whole pool.
+#
+# A placement or removal only re-checks the slots it can change: the
+# provider's own periods next to the consecutive run it touches, its
+# partner's periods in the same week, and — when the provider's capacity
+# opens or closes — the counts for its slots of that period type.
+
+def _capacity_open(state, p, is_week, use_cap):
+    """Capacity part of _can_assign: can p take another week (or weekend)?"""
+    if is_week:
+        cap, done, fair_share = state.wk_cap[p], state.week_count[p], state.fs_wk[p]
+    else:
+        cap, done, fair_share = state.we_cap[p], state.weekend_count[p], state.fs_we[p]
+    if cap <= 0 or done >= cap:
+        return False
+    return not (use_cap and done >= fair_share)
+
+
+def _slot_open(state, p, period_idx):
+    """Capacity-independent part of _can_assign for an eligible provider."""
+    if p in state.roster[period_idx]:
+        return False
+    if not _is_provider_available(state, p, period_idx):
+        return False
+    if _would_exceed_consecutive(state, p, period_idx):
+        return False
+    return not _check_conflict_pairs(state, p, period_idx)
+
+
+def _build_candidate_index(state):
+    """Seed the (period, site) -> feasible-candidate sets and counts."""
+    n_periods, n_sites = state.n_periods, state.n_sites
+    sites = [state.sid[s] for s in ZERO_GAP_SITES
+             if any(state.sites_demand.get((s, dt), 0) > 0
+                    for dt in ("weekday", "weekend"))]
+
+    prov_sites = [[] for _ in range(state.n_providers)]  # p -> indexed sites in its pools
+    for s in sites:
+        for p in state.pool[s]:
+            prov_sites[p].append(s)
+
+    slot_candidates = {idx * n_sites + s: set()
+                       for idx in range(n_periods) for s in sites}
+    slot_count = {slot: [0, 0] for slot in slot_candidates}  # [uncapped, capped]
+    prov_open = {}
+
+    for p, psites in enumerate(prov_sites):
+        if not psites:
+            continue
+        open_idxs = {idx for idx in range(n_periods) if _slot_open(state, p, idx)}
+        prov_open[p] = open_idxs
+        for idx in open_idxs:
+            is_week = state.period_is_week[idx]
+            uncapped = _capacity_open(state, p, is_week, False)
+            capped = _capacity_open(state, p, is_week, True)
+            for s in psites:
+                slot = idx * n_sites + s
+                slot_candidates[slot].add(p)
+                slot_count[slot][0] += uncapped
+                slot_count[slot][1] += capped
+
+    state.slot_candidates = slot_candidates
+    state.slot_candidate_count = slot_count
+    state.prov_index_sites = prov_sites
+    state.prov_open_periods = prov_open
+    state.period_starts = [first for first, _ in state.period_spans]
+    week_periods = state.week_periods
+    state.lookahead_periods = {
+        wn: sorted(idx for w in (wn - 1, wn, wn + 1) for idx in week_periods.get(w, ()))
+        for wn in week_periods
+    }
+
+
+def _candidate_flags(state, p, period_idx):
+    """Snapshot of what a placement can change for p's index entries."""
+    is_week = state.period_is_week[period_idx]
+    return (_capacity_open(state, p, is_week, False),
+            _capacity_open(state, p, is_week, True),
+            state.max_streak[p] > MAX_CONSECUTIVE_DAYS)
+
+
+def _refresh_slot(state, p, period_idx):
+    """Re-check p's capacity-independent feasibility for one period."""
+    open_idxs = state.prov_open_periods.get(p)
+    if open_idxs is None:
+        return
+    is_open = _slot_open(state, p, period_idx)
+    if is_open == (period_idx in open_idxs):
+        return
+
+    is_week = state.period_is_week[period_idx]
+    delta = 1 if is_open else -1
+    uncapped = _capacity_open(state, p, is_week, False)
+    capped = _capacity_open(state, p, is_week, True)
+    if is_open:
+        open_idxs.add(period_idx)
+    else:
+        open_idxs.discard(period_idx)
+    for s in state.prov_index_sites[p]:
+        slot = period_idx * state.n_sites + s
+        if is_open:
+            state.slot_candidates[slot].add(p)
+        else:
+            state.slot_candidates[slot].discard(p)
+        counts = state.slot_candidate_count[slot]
+        counts[0] += delta * uncapped
+        counts[1] += delta * capped
+
+
+def _reindex_candidates(state, p, period_idx, before, extent):
+    """Update the candidate index after p was placed in / removed from a period.
+
+    Args:
+        before: _candidate_flags() taken before the change
+        extent: day-ordinal span of the consecutive run that contained the
+            period while it was assigned, or None if nothing was assigned
+    """
+    is_week = state.period_is_week[period_idx]
+    after = _candidate_flags(state, p, period_idx)
+    open_idxs = state.prov_open_periods.get(p)
+
+    if open_idxs is not None:
+        # Capacity opened or closed: recount p in its open slots of this type
+        if after[:2] != before[:2]:
+            d_uncapped = after[0] - before[0]
+            d_capped = after[1] - before[1]
+            for idx in open_idxs:
+                if state.period_is_week[idx] != is_week:
+                    continue
+                for s in state.prov_index_sites[p]:
+                    counts = state.slot_candidate_count[idx * state.n_sites + s]
+                    counts[0] += d_uncapped
+                    counts[1] += d_capped
+
+        if after[2] != before[2]:
+            # Longest streak crossed the limit: every period may have changed
+            affected = range(state.n_periods)
+        elif extent is not None:
+            # Only periods touching the changed run see a different streak
+            starts = state.period_starts
+            spans = state.period_spans
+            lo, hi = extent[0] - 1, extent[1] + 1
+            first_idx = max(0, bisect.bisect_right(starts, lo) - 1)
+            affected = [idx for idx in range(first_idx, bisect.bisect_right(starts, hi))
+                        if spans[idx][1] >= lo]
+        else:
+            affected = [period_idx]
+        for idx in affected:
+            _refresh_slot(state, p, idx)
+        if period_idx not in affected:
+            _refresh_slot(state, p, period_idx)
+
+    # Conflict partners: p's change opens or closes their same-week periods
+    week_idxs = state.week_periods[state.periods[period_idx]["num"]]
+    for partner in state.partners[p]:
+        for idx in week_idxs:
+            _refresh_slot(state, partner, idx)
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # PHASE 1: RESERVE CRITICAL SITES
 # ═════════════════════════════════════════════════════════════════════════════
@@ -676,67 +1001,59 @@ def phase1_reserve_critical(state):
     This prevents the v1/v2 failure mode where a capable provider gets
     consumed by a larger site early, leaving a small site with no candidates.
     """
-    periods = state["periods"]
+    periods = state.periods
     print(f"\n[Phase 1] Reserving critical sites...")
 
     reservations = 0
-    zero_gap_sites = [s for s in ZERO_GAP_SITES if
-                      any(state["sites_demand"].get((s, dt), 0) > 0
+    zero_gap_sites = [state.sid[s] for s in ZERO_GAP_SITES if
+                      any(state.sites_demand.get((s, dt), 0) > 0
                           for dt in ("weekday", "weekend"))]
 
     # Sort periods by difficulty: fewest available providers first
     period_site_difficulty = []
-    for idx, period in enumerate(periods):
-        dtype = "weekday" if period["type"] == "week" else "weekend"
-        for site in zero_gap_sites:
-            demand = state["sites_demand"].get((site, dtype), 0)
+    for idx in range(len(periods)):
+        for s in zero_gap_sites:
+            demand = state.site_demand(idx, s)
             if demand <= 0:
                 continue
-            available = _count_available_providers(state, site, idx, use_cap=True)
-            period_site_difficulty.append((idx, site, demand, available))
+            available = _count_available_providers(state, s, idx, use_cap=True)
+            period_site_difficulty.append((idx, s, demand, available))
 
     # Fill hardest slots first (fewest available providers)
     period_site_difficulty.sort(key=lambda x: x[3])
 
-    for idx, site, demand, _ in period_site_difficulty:
-        period = state["periods"][idx]
-        dtype = period["type"]
+    for idx, s, demand, _ in period_site_difficulty:
+        dtype = periods[idx]["type"]
 
-        filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-        remaining_need = demand - filled
+        remaining_need = state.site_shortfall(idx, s)
         if remaining_need <= 0:
             continue
 
         # Build candidate list for this slot
+        pids = [p for p in state.pool[s]
+                if _can_assign(state, p, idx, s, use_cap=True)[0]]
         candidates = []
-        for pname in state["site_provider_pool"].get(site, []):
-            ok, _ = _can_assign(state, pname, idx, site, use_cap=True)
-            if not ok:
-                continue
-
-            score = _score_candidate(state, pname, idx, site, dtype)
-
+        for p, score in zip(pids, _score_candidates(state, pids, idx, s, dtype)):
             # Bonus: providers who can ONLY work at this site (or very few sites)
-            n_sites = len(state["provider_eligible_sites"].get(pname, []))
-            if n_sites <= 2:
+            if len(state.prov_sites[p]) <= 2:
                 score += 30  # Prefer dedicated providers for critical sites
 
-            candidates.append((pname, score))
+            candidates.append((p, score))
 
         candidates.sort(key=lambda x: -x[1])
 
         # Assign up to remaining_need
-        for pname, _ in candidates[:remaining_need]:
+        for p, _ in candidates[:remaining_need]:
             # Double-check with look-ahead
-            starves, _ = _would_starve_critical_slot(state, pname, idx, use_cap=True)
+            starves, _ = _would_starve_critical_slot(state, p, idx, use_cap=True)
             if starves:
                 continue
 
-            _place_provider(state, pname, idx, site)
+            _place_provider(state, p, idx, s)
             reservations += 1
 
     gaps_after = _count_site_gaps(state, zero_gap_only=True)
-    total_assigned = sum(state["prov_week_count"].values()) + sum(state["prov_we_count"].values())
+    total_assigned = state.total_weeks() + state.total_weekends()
     print(f"  Reserved: {reservations} assignments for zero-gap sites")
     print(f"  Zero-gap gaps remaining: {gaps_after}")
     print(f"  Total assigned so far: {total_assigned}")
@@ -746,20 +1063,15 @@ def phase1_reserve_critical(state):
 # PHASE 2: GENERAL ASSIGNMENT
 # ═════════════════════════════════════════════════════════════════════════════
 
-def phase2_general_assignment(state):
-    """Fill remaining slots using constrained scoring with look-ahead.
+def _demand_lists(state):
+    """Weekday and weekend (site ID, needed) lists, zero-gap sites first.
 
-    Processes all sites (including gap-tolerant and Cooper), filling
-    zero-gap sites first within each round. Uses constraint propagation
-    to avoid assignments that would make future zero-gap slots impossible.
+    Returns:
+        (all_weekday, all_weekend, max_demand)
     """
-    periods = state["periods"]
-    print(f"\n[Phase 2] General assignment (fair-share capped, with look-ahead)...")
-
-    # Build full demand list sorted by gap tolerance
-    all_weekday = sorted(state["site_list_weekday"],
+    all_weekday = sorted(state.site_list_weekday,
                          key=lambda x: (_gap_tolerance(x[0]), x[0]))
-    all_weekend = sorted(state["site_list_weekend"],
+    all_weekend = sorted(state.site_list_weekend,
                          key=lambda x: (_gap_tolerance(x[0]), x[0]))
 
     max_demand = 0
@@ -768,6 +1080,24 @@ def phase2_general_assignment(state):
     if all_weekend:
         max_demand = max(max_demand, max(n for _, n in all_weekend))
 
+    return ([(state.sid[site], n) for site, n in all_weekday],
+            [(state.sid[site], n) for site, n in all_weekend],
+            max_demand)
+
+
+def phase2_general_assignment(state):
+    """Fill remaining slots using constrained scoring with look-ahead.
+
+    Processes all sites (including gap-tolerant and Cooper), filling
+    zero-gap sites first within each round. Uses constraint propagation
+    to avoid assignments that would make future zero-gap slots impossible.
+    """
+    periods = state.periods
+    print(f"\n[Phase 2] General assignment (fair-share capped, with look-ahead)...")
+
+    # Build full demand list sorted by gap tolerance
+    all_weekday, all_weekend, max_demand = _demand_lists(state)
+
     # Compute week difficulty for ordering
     difficulty = _compute_week_difficulty(state)
 
@@ -777,21 +1107,18 @@ def phase2_general_assignment(state):
         week_nums.sort(key=lambda w: difficulty.get(w, 0), reverse=True)
 
         for wk_num in week_nums:
-            for idx, period in enumerate(periods):
-                if period["num"] != wk_num:
-                    continue
-
+            for idx in state.week_periods[wk_num]:
+                period = periods[idx]
                 if period["type"] == "week":
                     demand_list = all_weekday
                 else:
                     demand_list = all_weekend
 
-                for site, needed in demand_list:
-                    filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-                    if filled >= needed:
+                for s, _ in demand_list:
+                    if state.site_shortfall(idx, s) <= 0:
                         continue
 
-                    _fill_one_slot(state, idx, site, period["type"],
+                    _fill_one_slot(state, idx, s, period["type"],
                                    use_cap=True, use_lookahead=True)
 
     _log_phase_stats(state, "Phase 2")
@@ -803,20 +1130,17 @@ def phase3_behind_pace(state):
     Same logic as Phase 2 but without the fair-share cap, allowing
     providers who are behind on their annual obligations to catch up.
     """
-    periods = state["periods"]
+    periods = state.periods
     print(f"\n[Phase 3] Behind-pace fill (fair-share cap lifted)...")
 
     # All sites sorted by gap tolerance
-    all_weekday = sorted(state["site_list_weekday"],
-                         key=lambda x: (_gap_tolerance(x[0]), x[0]))
-    all_weekend = sorted(state["site_list_weekend"],
-                         key=lambda x: (_gap_tolerance(x[0]), x[0]))
+    all_weekday, all_weekend, max_demand = _demand_lists(state)
 
-    max_demand = 0
-    if all_weekday:
-        max_demand = max(max_demand, max(n for _, n in all_weekday))
-    if all_weekend:
-        max_demand = max(max_demand, max(n for _, n in all_weekend))
+    # Demanded sites per day type with their gap weight
+    weighted_sites = {"weekday": [], "weekend": []}
+    for (site, dt), _ in state.sites_demand.items():
+        if dt in weighted_sites:
+            weighted_sites[dt].append((state.sid[site], 3 if _gap_tolerance(site) == 0 else 1))
 
     # Order by gap-weighted difficulty
     for fill_round in range(max_demand):
@@ -824,16 +1148,10 @@ def phase3_behind_pace(state):
 
         def week_gap_score(wk_num):
             total = 0
-            for idx, p in enumerate(periods):
-                if p["num"] != wk_num:
-                    continue
-                dtype = "weekday" if p["type"] == "week" else "weekend"
-                for (site, dt), demand in state["sites_demand"].items():
-                    if dt != dtype:
-                        continue
-                    filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-                    shortfall = max(0, demand - filled)
-                    weight = 3 if _gap_tolerance(site) == 0 else 1
+            for idx in state.week_periods[wk_num]:
+                dtype = "weekday" if state.period_is_week[idx] else "weekend"
+                for s, weight in weighted_sites[dtype]:
+                    shortfall = max(0, state.site_shortfall(idx, s))
                     total += shortfall * weight
             return total
 
@@ -841,26 +1159,97 @@ def phase3_behind_pace(state):
         week_nums.sort(key=lambda w: -week_gap_score(w))
 
         for wk_num in week_nums:
-            for idx, period in enumerate(periods):
-                if period["num"] != wk_num:
-                    continue
-
+            for idx in state.week_periods[wk_num]:
+                period = periods[idx]
                 if period["type"] == "week":
                     demand_list = all_weekday
                 else:
                     demand_list = all_weekend
 
-                for site, needed in demand_list:
-                    filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-                    if filled >= needed:
+                for s, _ in demand_list:
+                    if state.site_shortfall(idx, s) <= 0:
                         continue
 
-                    _fill_one_slot(state, idx, site, period["type"],
+                    _fill_one_slot(state, idx, s, period["type"],
                                    use_cap=False, use_lookahead=True)
 
     _log_phase_stats(state, "Phase 3")
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# PHASE 2 (FLOW MODE): MIN-COST-FLOW PERIOD FILL
+# ═════════════════════════════════════════════════════════════════════════════
+#
+# Replaces the greedy Phases 2-3 when the engine runs with mode="flow".
+# Filling one period is a transportation problem:
+#
+#   source -> provider (cap 1) -> site (cap 1, cost -score) -> sink (cap shortfall)
+#
+# with a provider -> site edge wherever _can_assign allows it. A maximum flow
+# of minimum cost fills as many slots as the period allows, prefers lower
+# gap-tolerance tiers, then the best-scoring providers. Stretch, capacity and
+# conflict pairs span periods, so periods are solved one at a time in
+# calendar order (a one-period rolling horizon), each against the
+# assignments already made — first with the fair-share cap, then without.
+
+def _flow_fill_period(state, period_idx, use_cap):
+    """Fill one period's open slots with a max-flow min-cost assignment.
+
+    Returns:
+        number of providers placed
+    """
+    period_type = state.periods[period_idx]["type"]
+    base = period_idx * state.n_sites
+    sites = [s for s in range(state.n_sites) if state.shortfall[base + s] > 0]
+
+    graph = nx.DiGraph()
+    edges = []
+    for s in sites:
+        pids = [p for p in state.pool[s]
+                if _can_assign(state, p, period_idx, s, use_cap=use_cap)[0]]
+        if not pids:
+            continue
+        scores = _score_candidates(state, pids, period_idx, s, period_type)
+        for p, score in zip(pids, scores):
+            graph.add_edge("source", ("p", p), capacity=1, weight=0)
+            graph.add_edge(("p", p), ("s", s), capacity=1,
+                           weight=-round(score * FLOW_SCORE_SCALE))
+            edges.append((p, s))
+        graph.add_edge(("s", s), "sink", capacity=state.shortfall[base + s],
+                       weight=-FLOW_TIER_BONUS[state.gap_tol[s]])
+    if not edges:
+        return 0
+
+    flow = nx.max_flow_min_cost(graph, "source", "sink")
+    placed = 0
+    for p, s in edges:
+        if not flow[("p", p)][("s", s)]:
+            continue
+        # Re-check: two conflict partners can both be chosen in one period
+        if _can_assign(state, p, period_idx, s, use_cap=use_cap)[0]:
+            _place_provider(state, p, period_idx, s)
+            placed += 1
+    return placed
+
+
+def phase2_flow_assignment(state):
+    """Fill every period's site slots by min-cost flow (Phases 2-3 in flow mode)."""
+    if nx is None:
+        raise ImportError("Flow mode needs networkx — install with: pip install networkx")
+
+    print(f"\n[Phase 2] Min-cost-flow period fill (fair-share capped)...")
+    placed = sum(_flow_fill_period(state, idx, use_cap=True)
+                 for idx in range(state.n_periods))
+    print(f"  Placed: {placed}")
+    _log_phase_stats(state, "Phase 2")
+
+    print(f"\n[Phase 3] Min-cost-flow period fill (fair-share cap lifted)...")
+    placed = sum(_flow_fill_period(state, idx, use_cap=False)
+                 for idx in range(state.n_periods))
+    print(f"  Placed: {placed}")
+    _log_phase_stats(state, "Phase 3")
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # PHASE 4: SWAP EVALUATION
 # ═════════════════════════════════════════════════════════════════════════════
@@ -872,7 +1261,7 @@ def phase4_swap_evaluation(state):
     two assigned providers would fill the gap. A swap is only executed if
     it reduces total gaps without creating hard constraint violations.
     """
-    periods = state["periods"]
+    periods = state.periods
     print(f"\n[Phase 4] Swap evaluation...")
 
     swaps_executed = 0
@@ -885,46 +1274,47 @@ def phase4_swap_evaluation(state):
         for idx, period in enumerate(periods):
             dtype = "weekday" if period["type"] == "week" else "weekend"
 
-            for (site, dt), demand in state["sites_demand"].items():
+            for (site, dt), demand in state.sites_demand.items():
                 if dt != dtype:
                     continue
                 if _gap_tolerance(site) >= 2:
                     continue  # Don't swap-optimize Cooper
 
-                filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-                shortfall = demand - filled
+                s = state.sid[site]
+                shortfall = state.site_shortfall(idx, s)
                 if shortfall <= 0:
                     continue
 
                 # Find providers assigned to OTHER sites this period who could work here
-                for assigned_name, assigned_site in list(state["period_assignments"][idx]):
-                    if assigned_site == site:
+                for assigned, assigned_site in list(state.roster[idx].items()):
+                    if assigned_site == s:
                         continue
-                    if site not in state["provider_eligible_sites"].get(assigned_name, []):
+                    if s not in state.prov_site_set[assigned]:
                         continue
 
                     # Can we find someone else to cover their current slot?
-                    other_demand = state["sites_demand"].get((assigned_site, dtype), 0)
-                    other_filled = sum(1 for _, s in state["period_assignments"][idx]
-                                       if s == assigned_site)
+                    other_demand = state.site_demand(idx, assigned_site)
+                    other_filled = state.sites_filled(idx, assigned_site)
+                    other_tolerance = state.gap_tol[assigned_site]
 
                     # Only swap if the donor site won't be short
-                    if other_filled <= other_demand and _gap_tolerance(assigned_site) < 2:
+                    if other_filled <= other_demand and other_tolerance < 2:
                         continue  # Would create a new gap at a non-Cooper site
 
                     swaps_evaluated += 1
 
-                    # Try the swap: move assigned_name from assigned_site to site
+                    # Try the swap: move assigned from assigned_site to site
                     # First check if we can find a replacement for assigned_site
                     replacement = _find_replacement(state, idx, assigned_site,
-                                                     period["type"], exclude={assigned_name})
+                                                     period["type"], exclude={assigned})
 
-                    if replacement or other_filled > other_demand or _gap_tolerance(assigned_site) >= 2:
+                    if (replacement is not None or other_filled > other_demand
+                            or other_tolerance >= 2):
                         # Execute swap
-                        _remove_provider(state, assigned_name, idx)
-                        _place_provider(state, assigned_name, idx, site)
+                        _remove_provider(state, assigned, idx)
+                        _place_provider(state, assigned, idx, s)
 
-                        if replacement:
+                        if replacement is not None:
                             _place_provider(state, replacement, idx, assigned_site)
 
                         swaps_executed += 1
@@ -938,26 +1328,24 @@ def phase4_swap_evaluation(state):
     _log_phase_stats(state, "Phase 4")
 
 
-def _find_replacement(state, period_idx, site, period_type, exclude=None):
-    """Find an unassigned provider who could fill this slot."""
+def _find_replacement(state, period_idx, s, period_type, exclude=None):
+    """Find an unassigned provider who could fill this slot (provider ID or None)."""
     exclude = exclude or set()
-    period = state["periods"][period_idx]
-    dates = period["dates"]
 
-    candidates = []
-    for pname in state["site_provider_pool"].get(site, []):
-        if pname in exclude:
+    pids = []
+    for p in state.pool[s]:
+        if p in exclude:
             continue
-        if any(n == pname for n, _ in state["period_assignments"][period_idx]):
+        if p in state.roster[period_idx]:
             continue
 
-        ok, _ = _can_assign(state, pname, period_idx, site, use_cap=False)
+        ok, _ = _can_assign(state, p, period_idx, s, use_cap=False)
         if not ok:
             continue
+        pids.append(p)
 
-        score = _score_candidate(state, pname, period_idx, site, period_type)
-        candidates.append((pname, score))
-
+    candidates = list(zip(pids, _score_candidates(state, pids, period_idx,
+                                                  s, period_type)))
     if not candidates:
         return None
 
@@ -965,6 +1353,302 @@ def _find_replacement(state, period_idx, site, period_type, exclude=None):
     return candidates[0][0]
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# PHASE 4B: LOCAL SEARCH (optional)
+# ═════════════════════════════════════════════════════════════════════════════
+#
+# Time-boxed simulated annealing over the finished schedule. Each move is a
+# short chain of removals and placements run inside an EngineState savepoint:
+#
+#   relocate       move one assignment into an unfilled slot, then refill the
+#                  slot it left if possible
+#   period_swap    two providers trade periods of the same type
+#   site_exchange  two providers in one period trade sites
+#
+# Every placement passes _can_assign (fair-share cap lifted, as in Phase 3),
+# so hard constraints hold throughout. The objective is re-evaluated only for
+# the slots and providers a move touches. Rejected moves are rolled back and
+# the best schedule seen is restored at the end.
+
+def _search_groups(state):
+    """Per provider: [(pct, [site IDs]), ...] site-percentage groups to balance."""
+    groups = []
+    for p in range(state.n_providers):
+        pdata = state.prov_data[p]
+        by_field = {}
+        for s in state.prov_sites[p]:
+            field = SITE_PCT_MAP.get(state.sites[s], "")
+            by_field.setdefault(field or state.sites[s], []).append(s)
+        groups.append([(pdata.get(key, 0) if key in PCT_TO_SITES else 0, sids)
+                       for key, sids in by_field.items()])
+    return groups
+
+
+def _slot_penalty(state, slot):
+    """Objective contribution of one (period, site) slot's shortfall."""
+    need = state.shortfall[slot]
+    if need <= 0:
+        return 0
+    weight = SEARCH_WEIGHTS["gap"]
+    if state.gap_tol[slot % state.n_sites] == 0:
+        weight += SEARCH_WEIGHTS["zero_gap"]
+    return need * weight
+
+
+def _provider_penalty(state, p, groups):
+    """Objective contribution of one provider: long stretches and site mix."""
+    stretch = 0
+    for first, last in state.runs[p]:
+        over = last - first + 1 - 7
+        if over > 0:
+            stretch += over
+
+    total = state.week_count[p] + state.weekend_count[p]
+    base = p * state.n_sites
+    deviation = 0.0
+    for pct, sids in groups[p]:
+        deviation += abs(sum(state.site_count[base + s] for s in sids) - total * pct)
+
+    return SEARCH_WEIGHTS["stretch"] * stretch + SEARCH_WEIGHTS["distribution"] * deviation
+
+
+def _search_objective(state, groups):
+    """Full local-search objective (lower = better)."""
+    return (sum(_slot_penalty(state, slot) for slot in range(len(state.shortfall)))
+            + sum(_provider_penalty(state, p, groups) for p in range(state.n_providers)))
+
+
+def _search_touch(state, ctx, move, slots=(), pids=()):
+    """Record the penalty of slots and providers a move is about to change."""
+    for slot in slots:
+        if slot not in move["slots"]:
+            move["slots"].add(slot)
+            move["before"] += _slot_penalty(state, slot)
+    for p in pids:
+        if p not in move["pids"]:
+            move["pids"].add(p)
+            move["before"] += _provider_penalty(state, p, ctx["groups"])
+
+
+def _move_relocate(state, ctx, move):
+    """Move an assignment into an unfilled slot, refilling the slot it leaves.
+
+    The provider comes from the slot's pool: they change site if they work
+    that period already, take the slot outright if they have capacity left,
+    or give up one of their periods of the same type.
+    """
+    rng = ctx["rng"]
+    n_sites = state.n_sites
+    gaps = [slot for slot, need in enumerate(state.shortfall) if need > 0]
+    if not gaps:
+        return False
+
+    j, t = divmod(rng.choice(gaps), n_sites)
+    if not state.pool[t]:
+        return False
+    p = rng.choice(state.pool[t])
+    if p in state.roster[j]:
+        if state.roster[j][p] == t:
+            return False
+        source = j                      # change site within the period
+    elif _capacity_open(state, p, state.period_is_week[j], False):
+        source = None                   # plain fill
+    else:
+        held = [i for i, _ in state.assignments(p)
+                if state.period_is_week[i] == state.period_is_week[j]]
+        if not held:
+            return False
+        source = rng.choice(held)
+
+    if source is not None:
+        s = state.site_at(p, source)
+        _search_touch(state, ctx, move, (source * n_sites + s,), (p,))
+    _search_touch(state, ctx, move, (j * n_sites + t,), (p,))
+
+    if source is not None:
+        _remove_provider(state, p, source)
+    if not _can_assign(state, p, j, t, use_cap=False)[0]:
+        return False
+    _place_provider(state, p, j, t)
+
+    # Refill the slot p left, starting the pool scan at a random offset
+    if source is not None and state.site_shortfall(source, s) > 0:
+        pool = state.pool[s]
+        start = rng.randrange(len(pool))
+        for k in range(len(pool)):
+            q = pool[(start + k) % len(pool)]
+            if _can_assign(state, q, source, s, use_cap=False)[0]:
+                _search_touch(state, ctx, move, (), (q,))
+                _place_provider(state, q, source, s)
+                break
+    return True
+
+
+def _move_period_swap(state, ctx, move):
+    """Two providers trade periods of the same type (keeping each period's site)."""
+    rng = ctx["rng"]
+    i1, i2 = rng.randrange(state.n_periods), rng.randrange(state.n_periods)
+    if (i1 == i2 or state.period_is_week[i1] != state.period_is_week[i2]
+            or not state.roster[i1] or not state.roster[i2]):
+        return False
+    p1 = rng.choice(list(state.roster[i1]))
+    p2 = rng.choice(list(state.roster[i2]))
+    if p1 in state.roster[i2] or p2 in state.roster[i1]:
+        return False
+    s1, s2 = state.roster[i1][p1], state.roster[i2][p2]
+
+    n_sites = state.n_sites
+    _search_touch(state, ctx, move, (i1 * n_sites + s1, i2 * n_sites + s2), (p1, p2))
+    _remove_provider(state, p1, i1)
+    _remove_provider(state, p2, i2)
+    for p, idx, s in ((p1, i2, s2), (p2, i1, s1)):
+        if not _can_assign(state, p, idx, s, use_cap=False)[0]:
+            return False
+        _place_provider(state, p, idx, s)
+    return True
+
+
+def _move_site_exchange(state, ctx, move):
+    """Two providers working the same period trade sites."""
+    rng = ctx["rng"]
+    idx = rng.randrange(state.n_periods)
+    roster = state.roster[idx]
+    if len(roster) < 2:
+        return False
+    p1, p2 = rng.sample(list(roster), 2)
+    s1, s2 = roster[p1], roster[p2]
+    if s1 == s2:
+        return False
+
+    n_sites = state.n_sites
+    _search_touch(state, ctx, move, (idx * n_sites + s1, idx * n_sites + s2), (p1, p2))
+    _remove_provider(state, p1, idx)
+    _remove_provider(state, p2, idx)
+    for p, s in ((p1, s2), (p2, s1)):
+        if not _can_assign(state, p, idx, s, use_cap=False)[0]:
+            return False
+        _place_provider(state, p, idx, s)
+    return True
+
+
+SEARCH_MOVES = [
+    ("relocate", _move_relocate, 0.6),
+    ("period_swap", _move_period_swap, 0.2),
+    ("site_exchange", _move_site_exchange, 0.2),
+]
+
+
+def phase4b_local_search(state, seconds, max_moves=None, gap_floor=None):
+    """Improve the finished schedule with time-boxed simulated annealing.
+
+    Args:
+        seconds: wall-clock budget
+        max_moves: optional move budget; when given, the cooling schedule
+            follows moves instead of time, so a run is reproducible as long
+            as it finishes within seconds
+        gap_floor: optional (gaps, zero-gap violations) lower bound from
+            bounds.coverage_bound(); the search stops once the best schedule
+            reaches it
+
+    Returns:
+        dict: budget, moves, accepted, per-move counts, start/best objective
+        and the improvement curve (one point per new best schedule)
+    """
+    print(f"\n[Phase 4b] Local search ({seconds:g}s budget)...")
+
+    ctx = {"rng": random.Random(state.seed), "groups": _search_groups(state)}
+    rng = ctx["rng"]
+    names = [name for name, _, _ in SEARCH_MOVES]
+    fns = [fn for _, fn, _ in SEARCH_MOVES]
+    weights = [w for _, _, w in SEARCH_MOVES]
+    by_move = {name: {"tried": 0, "accepted": 0} for name in names}
+    t_hot, t_cold = SEARCH_TEMPERATURE
+
+    def point(elapsed, moves, objective):
+        return {
+            "seconds": round(elapsed, 3),
+            "moves": moves,
+            "objective": round(objective, 1),
+            "total_gaps": _count_site_gaps(state),
+            "zero_gap_violations": _count_site_gaps(state, zero_gap_only=True),
+        }
+
+    def at_floor(pt):
+        return bool(gap_floor) and (pt["total_gaps"], pt["zero_gap_violations"]) <= tuple(gap_floor)
+
+    current = best = start = _search_objective(state, ctx["groups"])
+    curve = [point(0.0, 0, start)]
+    moves = accepted = 0
+    t0 = time.perf_counter()
+    best_savepoint = state.checkpoint()
+
+    while not at_floor(curve[-1]):
+        elapsed = time.perf_counter() - t0
+        progress = moves / max_moves if max_moves else elapsed / seconds
+        if progress >= 1 or elapsed >= seconds:
+            break
+        temperature = t_hot * (t_cold / t_hot) ** progress
+
+        k = rng.choices(range(len(fns)), weights)[0]
+        move = {"slots": set(), "pids": set(), "before": 0.0}
+        moves += 1
+        by_move[names[k]]["tried"] += 1
+        savepoint = state.checkpoint()
+        if not fns[k](state, ctx, move):
+            _rollback(state, savepoint)
+            continue
+
+        after = (sum(_slot_penalty(state, slot) for slot in move["slots"])
+                 + sum(_provider_penalty(state, p, ctx["groups"]) for p in move["pids"]))
+        delta = after - move["before"]
+        if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+            _rollback(state, savepoint)
+            continue
+
+        state.release(savepoint)
+        current += delta
+        accepted += 1
+        by_move[names[k]]["accepted"] += 1
+        if current < best - 1e-6:
+            best = current
+            state.release(best_savepoint)
+            best_savepoint = state.checkpoint()
+            curve.append(point(time.perf_counter() - t0, moves, best))
+
+    elapsed = time.perf_counter() - t0
+    _rollback(state, best_savepoint)
+
+    print(f"  Moves: {moves} tried, {accepted} accepted in {elapsed:.2f}s")
+    if at_floor(curve[-1]):
+        print(f"  Stopped at the coverage bound ({gap_floor[0]} gaps, "
+              f"{gap_floor[1]} zero-gap violations)")
+    for name, counts in by_move.items():
+        print(f"    {name:<14} {counts['tried']:>7} tried {counts['accepted']:>7} accepted")
+    print(f"  Objective: {start:.1f} -> {best:.1f}")
+    print(f"  {'Time':>8} {'Moves':>8} {'Objective':>10} {'Gaps':>5} {'ZG':>4}")
+    # Print the points where the gap counts moved, plus the final best
+    shown = [pt for k, pt in enumerate(curve)
+             if k == 0 or k == len(curve) - 1
+             or (pt["total_gaps"], pt["zero_gap_violations"])
+             != (curve[k - 1]["total_gaps"], curve[k - 1]["zero_gap_violations"])]
+    for pt in shown:
+        print(f"  {pt['seconds']:>7.2f}s {pt['moves']:>8} {pt['objective']:>10.1f} "
+              f"{pt['total_gaps']:>5} {pt['zero_gap_violations']:>4}")
+    _log_phase_stats(state, "Phase 4b")
+
+    return {
+        "budget_seconds": seconds,
+        "seconds": round(elapsed, 3),
+        "moves": moves,
+        "accepted": accepted,
+        "by_move": by_move,
+        "start_objective": round(start, 1),
+        "best_objective": round(best, 1),
+        "reached_bound": at_floor(curve[-1]),
+        "curve": curve,
+    }
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # PHASE 5: OUTPUT
 # ═════════════════════════════════════════════════════════════════════════════
@@ -974,10 +1658,13 @@ def phase5_output(state):
 
     Every assignment in the draft is solid. Every unfilled slot goes to the
     gap report with a list of viable candidates and what constraints they'd bend.
+    Translates EngineState IDs back to provider and site names.
     """
-    periods = state["periods"]
-    eligible = state["eligible"]
-    sites_demand = state["sites_demand"]
+    periods = state.periods
+    eligible = state.eligible
+    sites_demand = state.sites_demand
+    names = state.names
+    site_names = state.sites
     all_sites = sorted(set(s for s, _ in sites_demand.keys()))
 
     print(f"\n[Phase 5] Compiling output...")
@@ -986,8 +1673,8 @@ def phase5_output(state):
     draft_schedule = []
     for idx, period in enumerate(periods):
         assignments = []
-        for pname, site in state["period_assignments"][idx]:
-            assignments.append({"provider": pname, "site": site})
+        for p, s in state.roster[idx].items():
+            assignments.append({"provider": names[p], "site": site_names[s]})
 
         draft_schedule.append({
             "period_idx": idx,
@@ -1008,13 +1695,14 @@ def phase5_output(state):
             if demand <= 0:
                 continue
 
-            filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-            shortfall = demand - filled
+            s = state.sid[site]
+            filled = state.sites_filled(idx, s)
+            shortfall = state.site_shortfall(idx, s)
             if shortfall <= 0:
                 continue
 
             # Find viable candidates for this gap
-            candidates = _build_gap_candidates(state, idx, site, period["type"])
+            candidates = _build_gap_candidates(state, idx, s, period["type"])
 
             gap_report.append({
                 "period_idx": idx,
@@ -1032,26 +1720,27 @@ def phase5_output(state):
     # ── Provider summary ──────────────────────────────────────────────
     provider_summary = {}
     for pname, pdata in eligible.items():
-        wk_used = state["prov_week_count"][pname]
-        we_used = state["prov_we_count"][pname]
+        p = state.pid[pname]
+        wk_used = state.week_count[p]
+        we_used = state.weekend_count[p]
 
         # Target = what's left in their contract (remaining after B1+B2)
-        wk_target = math.floor(pdata["weeks_remaining"])
-        we_target = math.floor(pdata["weekends_remaining"])
+        wk_target = state.wk_cap[p]
+        we_target = state.we_cap[p]
 
         # Prior blocks worked (B1 + B2) = annual - remaining
         wk_prior = round(pdata["annual_weeks"] - pdata["weeks_remaining"], 1)
         we_prior = round(pdata["annual_weekends"] - pdata["weekends_remaining"], 1)
 
         # Fair share (for reference / comparison)
-        fs_wk = state["fair_share_wk"][pname]
-        fs_we = state["fair_share_we"][pname]
+        fs_wk = state.fair_share_wk[pname]
+        fs_we = state.fair_share_we[pname]
 
-        site_dist = dict(state["prov_site_counts"][pname])
-        esites = state["provider_eligible_sites"].get(pname, [])
+        site_dist = state.site_distribution(p)
+        esites = state.provider_eligible_sites.get(pname, [])
 
         # Compute max consecutive stretch
-        max_consec = _compute_max_consecutive(state, pname)
+        max_consec = _compute_max_consecutive(state, p)
 
         provider_summary[pname] = {
             "shift_type": pdata["shift_type"],
@@ -1073,12 +1762,13 @@ def phase5_output(state):
             "site_distribution": site_dist,
             "eligible_sites": esites,
             "max_consecutive_days": max_consec,
-            "assignments": [(pidx, s) for pidx, s in state["prov_assignments"].get(pname, [])],
+            "assignments": [(pidx, site_names[s]) for pidx, s in state.assignments(p)],
         }
 
     # ── Site coverage summary ─────────────────────────────────────────
     site_coverage = {}
     for site in all_sites:
+        s = state.sid[site]
         weekday_gaps = 0
         weekend_gaps = 0
         weekday_total = 0
@@ -1087,8 +1777,7 @@ def phase5_output(state):
         for idx, period in enumerate(periods):
             dtype = "weekday" if period["type"] == "week" else "weekend"
             demand = sites_demand.get((site, dtype), 0)
-            filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-            shortfall = max(0, demand - filled)
+            shortfall = max(0, state.site_shortfall(idx, s))
 
             if dtype == "weekday":
                 weekday_total += demand
@@ -1114,10 +1803,10 @@ def phase5_output(state):
     gaps_without = sum(1 for g in gap_report if not g["candidates"])
 
     stats = {
-        "seed": state["seed"],
+        "seed": state.seed,
         "total_eligible": len(eligible),
-        "total_weeks_assigned": sum(state["prov_week_count"].values()),
-        "total_weekends_assigned": sum(state["prov_we_count"].values()),
+        "total_weeks_assigned": state.total_weeks(),
+        "total_weekends_assigned": state.total_weekends(),
         "total_gaps": total_gaps,
         "zero_gap_violations": zgv,
         "gaps_with_candidates": gaps_with_candidates,
@@ -1130,11 +1819,11 @@ def phase5_output(state):
 
     # Coverage percentages
     total_weekday_demand = sum(
-        sites_demand.get((s, "weekday"), 0) * state["n_weeks"]
+        sites_demand.get((s, "weekday"), 0) * state.n_weeks
         for s in all_sites
     )
     total_weekend_demand = sum(
-        sites_demand.get((s, "weekend"), 0) * sum(1 for p in periods if p["type"] == "weekend")
+        sites_demand.get((s, "weekend"), 0) * state.n_weekends
         for s in all_sites
     )
     total_weekday_filled = stats["total_weeks_assigned"]
@@ -1165,16 +1854,16 @@ def phase5_output(state):
         "provider_summary": provider_summary,
         "site_coverage": site_coverage,
         "periods": periods,
-        "block_start": state["block_start"].strftime("%Y-%m-%d"),
-        "block_end": state["block_end"].strftime("%Y-%m-%d"),
-        "excluded_reasons": state["excluded_reasons"],
-        "conflict_pairs": state["conflict_pairs"],
+        "block_start": state.block_start.strftime("%Y-%m-%d"),
+        "block_end": state.block_end.strftime("%Y-%m-%d"),
+        "excluded_reasons": state.excluded_reasons,
+        "conflict_pairs": state.conflict_pairs,
     }
 
     return results
 
 
-def _build_gap_candidates(state, period_idx, site, period_type):
+def _build_gap_candidates(state, period_idx, s, period_type):
     """Build candidate list for an unfilled gap slot.
 
     Each candidate includes what constraint they'd need to bend:
@@ -1184,69 +1873,62 @@ def _build_gap_candidates(state, period_idx, site, period_type):
       - None: clean assignment (only blocked by being assigned elsewhere this period)
     """
     candidates = []
-    period = state["periods"][period_idx]
-    dates = period["dates"]
-    week_num = period["num"]
 
-    for pname in state["site_provider_pool"].get(site, []):
-        pdata = state["eligible"].get(pname)
-        if pdata is None:
-            continue
+    for p in state.pool[s]:
+        pdata = state.prov_data[p]
 
         # Already assigned this period
-        if any(n == pname for n, _ in state["period_assignments"][period_idx]):
+        if p in state.roster[period_idx]:
             continue
 
         # Check individual constraints
         constraints_to_bend = []
 
         # Availability (absolute — skip if unavailable)
-        if not _is_provider_available(state, pname, dates):
+        if not _is_provider_available(state, p, period_idx):
             continue
 
         # Site eligibility (absolute)
-        if site not in state["provider_eligible_sites"].get(pname, []):
+        if s not in state.prov_site_set[p]:
             continue
 
         # Conflict pairs (absolute)
-        if _check_conflict_pairs(state, pname, period_idx):
+        if _check_conflict_pairs(state, p, period_idx):
             continue
 
         # Hard capacity
         if period_type == "week":
-            cap = math.floor(pdata["weeks_remaining"])
-            used = state["prov_week_count"][pname]
+            cap = state.wk_cap[p]
+            used = state.week_count[p]
             if cap <= 0 or used >= cap:
                 continue
-            if used >= state["fair_share_wk"][pname]:
+            if used >= state.fs_wk[p]:
                 constraints_to_bend.append("over_fair_share")
         else:
-            cap = math.floor(pdata["weekends_remaining"])
-            used = state["prov_we_count"][pname]
+            cap = state.we_cap[p]
+            used = state.weekend_count[p]
             if cap <= 0 or used >= cap:
                 continue
-            if used >= state["fair_share_we"][pname]:
+            if used >= state.fs_we[p]:
                 constraints_to_bend.append("over_fair_share")
 
         # Consecutive check
-        if _would_exceed_consecutive(state, pname, period_idx):
+        if _would_exceed_consecutive(state, p, period_idx):
             # Would create >12 days — absolute constraint
             continue
 
         # Extended stretch check (>7 days)
-        existing = _get_assigned_dates(state, pname)
-        new_dates = set(period["dates"])
-        would_be_streak = _max_consecutive_with_dates(existing, new_dates)
+        would_be_streak, _ = state.streak_if_added(p, period_idx)
         if would_be_streak > 7:
             constraints_to_bend.append(f"extended_stretch_{would_be_streak}_days")
 
         candidates.append({
-            "provider": pname,
+            "provider": state.names[p],
             "constraints_to_bend": constraints_to_bend if constraints_to_bend else None,
             "remaining_weeks": pdata["weeks_remaining"],
             "remaining_weekends": pdata["weekends_remaining"],
-            "weeks_assigned": state["prov_week_count"][pname],
-            "weekends_assigned": state["prov_we_count"][pname],
+            "weeks_assigned": state.week_count[p],
+            "weekends_assigned": state.weekend_count[p],
         })
 
     # Sort: clean candidates first, then by fewest constraints to bend
@@ -1257,100 +1939,67 @@ def _build_gap_candidates(state, period_idx, site, period_type):
     return candidates
 
 
-def _compute_max_consecutive(state, pname):
+def _compute_max_consecutive(state, p):
     """Compute the maximum consecutive days this provider is scheduled."""
-    assignments = state["prov_assignments"].get(pname, [])
-    if not assignments:
-        return 0
-
-    all_dates = set()
-    for period_idx, _ in assignments:
-        for d_str in state["periods"][period_idx]["dates"]:
-            all_dates.add(d_str)
-
-    if not all_dates:
-        return 0
-
-    sorted_dates = sorted(all_dates)
-    max_streak = 1
-    current_streak = 1
-
-    for i in range(1, len(sorted_dates)):
-        d1 = datetime.strptime(sorted_dates[i - 1], "%Y-%m-%d").date()
-        d2 = datetime.strptime(sorted_dates[i], "%Y-%m-%d").date()
-        if (d2 - d1).days == 1:
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 1
-
-    return max_streak
+    return state.max_streak[p]
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # HELPER FUNCTIONS
 # ═════════════════════════════════════════════════════════════════════════════
 
-def _fill_one_slot(state, period_idx, site, period_type, use_cap=True,
+def _fill_one_slot(state, period_idx, s, period_type, use_cap=True,
                    use_lookahead=True):
     """Try to fill one slot at a site in a period."""
-    candidates = []
+    pids = []
+    lookahead = use_lookahead and state.gap_tol[s] > 0
 
-    for pname in state["site_provider_pool"].get(site, []):
-        ok, reason = _can_assign(state, pname, period_idx, site, use_cap=use_cap)
+    for p in state.pool[s]:
+        ok, reason = _can_assign(state, p, period_idx, s, use_cap=use_cap)
         if not ok:
             continue
 
         # Look-ahead: skip if this would starve a critical slot
-        if use_lookahead and _gap_tolerance(site) > 0:
-            starves, _ = _would_starve_critical_slot(state, pname, period_idx,
+        if lookahead:
+            starves, _ = _would_starve_critical_slot(state, p, period_idx,
                                                       use_cap=use_cap)
             if starves:
                 continue
 
-        score = _score_candidate(state, pname, period_idx, site, period_type)
-        candidates.append((pname, score))
+        pids.append(p)
 
+    candidates = list(zip(pids, _score_candidates(state, pids, period_idx,
+                                                  s, period_type)))
     if not candidates:
         return False
 
     candidates.sort(key=lambda x: -x[1])
-    pname = candidates[0][0]
-    _place_provider(state, pname, period_idx, site)
+    _place_provider(state, candidates[0][0], period_idx, s)
     return True
 
 
 def _count_site_gaps(state, zero_gap_only=False):
     """Count total unfilled slots."""
+    if not zero_gap_only:
+        return sum(need for need in state.shortfall if need > 0)
+    n_sites = state.n_sites
+    zero_gap = [s for s in range(n_sites) if state.gap_tol[s] == 0]
     gaps = 0
-    for idx, period in enumerate(state["periods"]):
-        dtype = "weekday" if period["type"] == "week" else "weekend"
-        for (site, dt), demand in state["sites_demand"].items():
-            if dt != dtype:
-                continue
-            if zero_gap_only and _gap_tolerance(site) != 0:
-                continue
-            filled = sum(1 for _, s in state["period_assignments"][idx] if s == site)
-            gaps += max(0, demand - filled)
+    for base in range(0, state.n_periods * n_sites, n_sites):
+        for s in zero_gap:
+            need = state.shortfall[base + s]
+            if need > 0:
+                gaps += need
     return gaps
 
 
 def _compute_week_difficulty(state):
     """Pre-compute staffing difficulty score for each week number."""
-    periods = state["periods"]
-    eligible = state["eligible"]
-
-    week_dates = {}
-    for period in periods:
-        wn = period["num"]
-        if wn not in week_dates and period["type"] == "week":
-            week_dates[wn] = period["dates"]
-
     difficulty = {}
-    for wk_num, dates in week_dates.items():
+    for wk_num, idx in state.week_idx_of_num.items():
         avail_count = 0
-        for pname in eligible:
-            if _is_provider_available(state, pname, dates):
+        for p in range(state.n_providers):
+            if _is_provider_available(state, p, idx):
                 avail_count += 1
         difficulty[wk_num] = -avail_count
     return difficulty
@@ -1360,8 +2009,8 @@ def _log_phase_stats(state, phase_name):
     """Log stats after a phase."""
     total_gaps = _count_site_gaps(state)
     zgv = _count_site_gaps(state, zero_gap_only=True)
-    wk = sum(state["prov_week_count"].values())
-    we = sum(state["prov_we_count"].values())
+    wk = state.total_weeks()
+    we = state.total_weekends()
     print(f"  After {phase_name}: {wk} weeks, {we} weekends assigned")
     print(f"  Gaps: {total_gaps} total, {zgv} zero-gap violations")
 
@@ -1371,22 +2020,71 @@ def _log_phase_stats(state, phase_name):
 # ═════════════════════════════════════════════════════════════════════════════
 
 def run_engine(excel_path, pre_schedule_path, availability_dir,
-               block_start, block_end, seed=42):
+               block_start, block_end, seed=42,
+               use_cache=False, rebuild_cache=False, search_seconds=0,
+               mode="greedy", gap_floor=None):
     """Run the full V3 scheduling engine.
 
+    mode picks the Phase 2-3 fill strategy (see ENGINE_MODES). With
+    search_seconds > 0, Phase 4b local search runs for that long after
+    the swap phase, or until it reaches gap_floor (see bounds.gap_floor).
+
     Returns:
         dict — draft schedule + gap report + summaries
     """
     state = phase0_load(excel_path, pre_schedule_path, availability_dir,
-                        block_start, block_end, seed=seed)
+                        block_start, block_end, seed=seed,
+                        use_cache=use_cache, rebuild_cache=rebuild_cache)
+    return _run_phases(state, search_seconds=search_seconds, mode=mode,
+                       gap_floor=gap_floor)
+
+
+def run_engine_with_inputs(inputs, block_start, block_end, seed=42, search_seconds=0,
+                           mode="greedy", gap_floor=None):
+    """Run the V3 engine for one seed on inputs already read by load_inputs().
+
+    Lets a multi-seed sweep read the workbook and availability once.
+
+    Returns:
+        dict — draft schedule + gap report + summaries
+    """
+    state = build_state(inputs, block_start, block_end, seed=seed)
+    return _run_phases(state, search_seconds=search_seconds, mode=mode,
+                       gap_floor=gap_floor)
+
+
+def _fill_phases(state, search_seconds=0, mode="greedy", gap_floor=None):
+    """Run phases 1-4 (and 4b if budgeted) on a state.
+
+    Returns:
+        Phase 4b summary dict, or None if local search did not run
+    """
+    if mode not in ENGINE_MODES:
+        raise ValueError(f"Unknown engine mode {mode!r} (expected one of {ENGINE_MODES})")
     phase1_reserve_critical(state)
-    phase2_general_assignment(state)
-    phase3_behind_pace(state)
+    if mode == "flow":
+        phase2_flow_assignment(state)
+    else:
+        phase2_general_assignment(state)
+        phase3_behind_pace(state)
     phase4_swap_evaluation(state)
+    if search_seconds > 0:
+        return phase4b_local_search(state, search_seconds, gap_floor=gap_floor)
+    return None
+
+
+def _run_phases(state, search_seconds=0, mode="greedy", gap_floor=None):
+    """Run phases 1-5 (and 4b if budgeted) on a freshly built state."""
+    seed = state.seed
+    search = _fill_phases(state, search_seconds=search_seconds, mode=mode,
+                          gap_floor=gap_floor)
     results = phase5_output(state)
+    results["stats"]["mode"] = mode
+    if search is not None:
+        results["local_search"] = search
 
     print(f"\n{'=' * 70}")
-    print(f"Engine v3 complete (seed={seed})")
+    print(f"Engine v3 complete (seed={seed}, mode={mode})")
     print(f"{'=' * 70}\n")
 
     return results
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Array-backed assignment state for Block Schedule Engine v3.
+
+EngineState holds everything the engine phases read and mutate while
+building one seed's schedule. Providers, sites and periods are integer IDs
+(pid, sid, period idx); names only come back in phase5_output(). The
+assignment itself lives in flat arrays:
+
+  site_code[pid * n_periods + idx]    site the provider holds that period, or -1
+  placed_seq[pid * n_periods + idx]   placement stamp (keeps output ordering)
+  week_count[pid], weekend_count[pid]
+  site_count[pid * n_sites + sid]
+  fill[idx * n_sites + sid]           providers at the site that period
+  shortfall[idx * n_sites + sid]      demand - fill (negative when over-filled)
+
+plus per-period rosters (pid -> sid in placement order) and per-provider
+consecutive-day run lists. The arrays support the buffer protocol, so the
+batched scorer reads them through zero-copy NumPy views.
+
+While a savepoint is open every place()/remove() is recorded in an undo
+journal. Rolling back to a savepoint reverts just the journaled changes,
+newest first — including placement order and first-placement stamps — so
+a trial move costs time proportional to its size, not a state copy.
+
+Usage:
+    state = EngineState(...)            # see engine.build_state()
+    state.place(pid, idx, sid)
+    sid = state.remove(pid, idx)
+
+    savepoint = state.checkpoint()
+    ...                                 # trial placements / removals
+    for entry in state.unwind(savepoint):
+        state.revert(entry)             # or state.release(savepoint) to keep
+"""
+
+import bisect
+import math
+from array import array
+
+
+class EngineState:
+    """Mutable assignment state for one engine run, keyed by integer IDs."""
+
+    __slots__ = (
+        # Inputs and period layout
+        "providers", "tags_data", "sites_demand", "unavailable_dates", "name_map",
+        "difficulty_records", "holiday_records",
+        "periods", "period_spans", "period_masks", "period_is_week",
+        "week_periods", "week_idx_of_num", "n_weeks", "n_weekends",
+        "memorial_week_num", "seed", "block_start", "block_end",
+        # Name-keyed views kept for output and logging
+        "eligible", "excluded_reasons", "fair_share_wk", "fair_share_we",
+        "provider_eligible_sites", "site_list_weekday", "site_list_weekend",
+        "conflict_pairs", "site_provider_pool",
+        # Integer IDs
+        "names", "pid", "sites", "sid", "n_providers", "n_sites", "n_periods",
+        # Per-ID static data
+        "prov_data", "unavail_mask", "wk_cap", "we_cap", "fs_wk", "fs_we",
+        "prov_sites", "prov_site_set", "pool", "gap_tol", "demand", "partners",
+        # Assignment storage
+        "site_code", "placed_seq", "site_first", "week_count", "weekend_count",
+        "site_count", "fill", "shortfall", "roster", "runs", "max_streak", "_seq",
+        # Undo journal
+        "journal", "_open_savepoints",
+        # Engine indexes (candidate look-ahead, batched scoring)
+        "slot_candidates", "slot_candidate_count", "prov_index_sites",
+        "prov_open_periods", "period_starts", "lookahead_periods", "score_views",
+    )
+
+    def __init__(self, *, providers, tags_data, sites_demand, unavailable_dates,
+                 name_map, difficulty_records, holiday_records, periods,
+                 period_spans, period_masks, prov_unavail_mask, eligible,
+                 excluded_reasons, fair_share_wk, fair_share_we,
+                 provider_eligible_sites, site_list_weekday, site_list_weekend,
+                 conflict_pairs, site_provider_pool, memorial_week_num, seed,
+                 block_start, block_end, gap_tolerance):
+        """Assign integer IDs and allocate empty assignment storage.
+
+        Args mirror what build_state() computes; gap_tolerance is the
+        site -> tier function. Provider IDs follow eligible's order, so
+        per-site pools keep the order of site_provider_pool.
+        """
+        self.providers = providers
+        self.tags_data = tags_data
+        self.sites_demand = sites_demand
+        self.unavailable_dates = unavailable_dates
+        self.name_map = name_map
+        self.difficulty_records = difficulty_records
+        self.holiday_records = holiday_records
+        self.periods = periods
+        self.period_spans = period_spans
+        self.period_masks = period_masks
+        self.memorial_week_num = memorial_week_num
+        self.seed = seed
+        self.block_start = block_start
+        self.block_end = block_end
+        self.eligible = eligible
+        self.excluded_reasons = excluded_reasons
+        self.fair_share_wk = fair_share_wk
+        self.fair_share_we = fair_share_we
+        self.provider_eligible_sites = provider_eligible_sites
+        self.site_list_weekday = site_list_weekday
+        self.site_list_weekend = site_list_weekend
+        self.conflict_pairs = conflict_pairs
+        self.site_provider_pool = site_provider_pool
+
+        # ── Periods ───────────────────────────────────────────────────
+        self.n_periods = len(periods)
+        self.period_is_week = [p["type"] == "week" for p in periods]
+        self.n_weeks = sum(self.period_is_week)
+        self.n_weekends = self.n_periods - self.n_weeks
+        week_periods = {}
+        self.week_idx_of_num = {}
+        for idx, p in enumerate(periods):
+            week_periods.setdefault(p["num"], []).append(idx)
+            if p["type"] == "week":
+                self.week_idx_of_num[p["num"]] = idx
+        self.week_periods = week_periods
+
+        # ── IDs ───────────────────────────────────────────────────────
+        self.names = list(eligible)
+        self.pid = {pname: i for i, pname in enumerate(self.names)}
+        self.n_providers = len(self.names)
+        site_names = {s for s, _ in sites_demand}
+        for psites in provider_eligible_sites.values():
+            site_names.update(psites)
+        self.sites = sorted(site_names)
+        self.sid = {site: i for i, site in enumerate(self.sites)}
+        self.n_sites = len(self.sites)
+
+        # ── Per-ID static data ────────────────────────────────────────
+        self.prov_data = [eligible[n] for n in self.names]
+        self.unavail_mask = [prov_unavail_mask.get(n, 0) for n in self.names]
+        self.wk_cap = [math.floor(d["weeks_remaining"]) for d in self.prov_data]
+        self.we_cap = [math.floor(d["weekends_remaining"]) for d in self.prov_data]
+        self.fs_wk = [fair_share_wk[n] for n in self.names]
+        self.fs_we = [fair_share_we[n] for n in self.names]
+        self.prov_sites = [[self.sid[s] for s in provider_eligible_sites.get(n, [])]
+                           for n in self.names]
+        self.prov_site_set = [frozenset(s) for s in self.prov_sites]
+        self.pool = [[self.pid[n] for n in site_provider_pool.get(site, [])]
+                     for site in self.sites]
+        self.gap_tol = [gap_tolerance(site) for site in self.sites]
+
+        self.demand = array("i", bytes(4 * self.n_periods * self.n_sites))
+        for idx, p in enumerate(periods):
+            dtype = "weekday" if p["type"] == "week" else "weekend"
+            for (site, dt), needed in sites_demand.items():
+                if dt == dtype:
+                    self.demand[idx * self.n_sites + self.sid[site]] = needed
+
+        self.partners = [[] for _ in self.names]
+        for a, b in conflict_pairs:
+            self.partners[self.pid[a]].append(self.pid[b])
+            self.partners[self.pid[b]].append(self.pid[a])
+
+        # ── Assignment storage ────────────────────────────────────────
+        cells = self.n_providers * self.n_periods
+        self.site_code = array("h", [-1]) * cells
+        self.placed_seq = array("i", bytes(4 * cells))
+        self.site_first = array("i", [-1]) * (self.n_providers * self.n_sites)
+        self.site_count = array("i", bytes(4 * self.n_providers * self.n_sites))
+        self.week_count = array("i", bytes(4 * self.n_providers))
+        self.weekend_count = array("i", bytes(4 * self.n_providers))
+        self.max_streak = array("i", bytes(4 * self.n_providers))
+        self.fill = array("i", bytes(4 * self.n_periods * self.n_sites))
+        self.shortfall = array("i", self.demand)
+        self.roster = [{} for _ in periods]    # idx -> {pid: sid}, placement order
+        self.runs = [[] for _ in self.names]    # pid -> sorted [(first_ord, last_ord), ...]
+        self._seq = 0
+        self.journal = []           # undo entries while a savepoint is open
+        self._open_savepoints = 0
+
+        self.slot_candidates = None
+        self.slot_candidate_count = None
+        self.prov_index_sites = None
+        self.prov_open_periods = None
+        self.period_starts = None
+        self.lookahead_periods = None
+        self.score_views = None
+
+    # ─────────────────────────────────────────────────────────────────
+    # Mutations
+    # ─────────────────────────────────────────────────────────────────
+
+    def place(self, p, idx, s):
+        """Record provider p at site s in period idx."""
+        if self._open_savepoints:
+            self.journal.append(("place", p, idx, s, self._seq,
+                                 self.site_first[p * self.n_sites + s],
+                                 self.placed_seq[p * self.n_periods + idx]))
+        self._seq += 1
+        self._place(p, idx, s, self._seq)
+
+    def remove(self, p, idx):
+        """Take provider p out of period idx.
+
+        Returns the site ID they held, or -1 if they held none. As with the
+        original dict state, the week/weekend count is decremented either way.
+        """
+        if self._open_savepoints:
+            cell = p * self.n_periods + idx
+            self.journal.append(("remove", p, idx, self.site_code[cell],
+                                 self.placed_seq[cell]))
+        return self._remove(p, idx)
+
+    def _place(self, p, idx, s, seq):
+        cell = p * self.n_periods + idx
+        self.site_code[cell] = s
+        self.placed_seq[cell] = seq
+        self.roster[idx][p] = s
+
+        slot = idx * self.n_sites + s
+        self.fill[slot] += 1
+        self.shortfall[slot] -= 1
+
+        ps = p * self.n_sites + s
+        self.site_count[ps] += 1
+        if self.site_first[ps] < 0:
+            self.site_first[ps] = seq
+
+        self._runs_add(p, idx)
+        if self.period_is_week[idx]:
+            self.week_count[p] += 1
+        else:
+            self.weekend_count[p] += 1
+
+    def _remove(self, p, idx):
+        cell = p * self.n_periods + idx
+        s = self.site_code[cell]
+        if s >= 0:
+            self.site_code[cell] = -1
+            del self.roster[idx][p]
+            slot = idx * self.n_sites + s
+            self.fill[slot] -= 1
+            self.shortfall[slot] += 1
+            self.site_count[p * self.n_sites + s] -= 1
+            self._runs_remove(p, idx)
+
+        if self.period_is_week[idx]:
+            self.week_count[p] -= 1
+        else:
+            self.weekend_count[p] -= 1
+        return s
+
+    # ─────────────────────────────────────────────────────────────────
+    # Savepoints
+    # ─────────────────────────────────────────────────────────────────
+
+    def checkpoint(self):
+        """Open a savepoint; mutations are journaled until it is closed.
+
+        Savepoints nest. Close each one with release() (keep the changes)
+        or unwind() + revert() (undo them).
+
+        Returns:
+            savepoint token (journal position)
+        """
+        self._open_savepoints += 1
+        return len(self.journal)
+
+    def release(self, savepoint):
+        """Close a savepoint, keeping every change made since it opened."""
+        self._close_savepoint()
+
+    def unwind(self, savepoint):
+        """Close a savepoint and hand back its journal entries, newest first.
+
+        Each entry must then be passed to revert() in the order given.
+        """
+        entries = self.journal[savepoint:]
+        del self.journal[savepoint:]
+        entries.reverse()
+        self._close_savepoint()
+        return entries
+
+    def revert(self, entry):
+        """Undo one journaled place() or remove() without journaling it.
+
+        Returns:
+            (p, idx) of the reverted change
+        """
+        op, p, idx, s, seq = entry[:5]
+        if op == "place":
+            self._remove(p, idx)
+            self.site_first[p * self.n_sites + s] = entry[5]
+            self.placed_seq[p * self.n_periods + idx] = entry[6]
+            self._seq = seq
+        elif s >= 0:
+            self._place(p, idx, s, seq)
+            # Back into its original place in the roster's placement order
+            roster = self.roster[idx]
+            stamp = self.placed_seq
+            T = self.n_periods
+            if any(stamp[q * T + idx] > seq for q in roster):
+                self.roster[idx] = dict(sorted(
+                    roster.items(), key=lambda kv: stamp[kv[0] * T + idx]))
+        elif self.period_is_week[idx]:
+            self.week_count[p] += 1
+        else:
+            self.weekend_count[p] += 1
+        return p, idx
+
+    def _close_savepoint(self):
+        self._open_savepoints -= 1
+        if not self._open_savepoints:
+            self.journal.clear()
+
+    # ─────────────────────────────────────────────────────────────────
+    # Queries
+    # ─────────────────────────────────────────────────────────────────
+
+    def site_at(self, p, idx):
+        """Site ID provider p holds in period idx, or -1."""
+        return self.site_code[p * self.n_periods + idx]
+
+    def holds(self, p, idx):
+        """True if provider p is assigned anywhere in period idx."""
+        return p in self.roster[idx]
+
+    def week_site(self, p, week_num):
+        """Site ID of p's weekday assignment in a week, or -1."""
+        idx = self.week_idx_of_num.get(week_num)
+        if idx is None:
+            return -1
+        return self.site_code[p * self.n_periods + idx]
+
+    def count(self, p, is_week):
+        """Weeks (is_week) or weekends assigned to provider p."""
+        return self.week_count[p] if is_week else self.weekend_count[p]
+
+    def sites_filled(self, idx, s):
+        """Providers placed at site s in period idx."""
+        return self.fill[idx * self.n_sites + s]
+
+    def site_shortfall(self, idx, s):
+        """Demand minus fill for site s in period idx."""
+        return self.shortfall[idx * self.n_sites + s]
+
+    def site_demand(self, idx, s):
+        """Demand for site s in period idx (by the period's day type)."""
+        return self.demand[idx * self.n_sites + s]
+
+    def assignments(self, p):
+        """[(idx, sid), ...] for provider p in placement order."""
+        base = p * self.n_periods
+        held = [(self.placed_seq[base + idx], idx, self.site_code[base + idx])
+                for idx in range(self.n_periods) if self.site_code[base + idx] >= 0]
+        held.sort()
+        return [(idx, s) for _, idx, s in held]
+
+    def last_assigned(self, p):
+        """Latest period index provider p holds, or -1."""
+        base = p * self.n_periods
+        for idx in range(self.n_periods - 1, -1, -1):
+            if self.site_code[base + idx] >= 0:
+                return idx
+        return -1
+
+    def site_distribution(self, p):
+        """{site name: count} for every site p was ever placed at, in first-placement order."""
+        base = p * self.n_sites
+        touched = sorted((self.site_first[base + s], s) for s in range(self.n_sites)
+                         if self.site_first[base + s] >= 0)
+        return {self.sites[s]: self.site_count[base + s] for _, s in touched}
+
+    def total_weeks(self):
+        return sum(self.week_count)
+
+    def total_weekends(self):
+        return sum(self.weekend_count)
+
+    # ─────────────────────────────────────────────────────────────────
+    # Consecutive-day runs
+    # ─────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _adjacent_runs(runs, first, last):
+        """Find the runs that touch [first, last] on either side.
+
+        Returns (insert_pos, left_run_or_None, right_run_or_None). Runs never
+        overlap the span because a provider holds at most one slot per period.
+        """
+        pos = bisect.bisect_left(runs, (first,))
+        left = runs[pos - 1] if pos > 0 and runs[pos - 1][1] == first - 1 else None
+        right = runs[pos] if pos < len(runs) and runs[pos][0] == last + 1 else None
+        return pos, left, right
+
+    def streak_if_added(self, p, idx):
+        """Longest consecutive-day run if period idx were added for p.
+
+        O(log n) in the provider's number of runs.
+
+        Returns (would_be_streak, current_streak).
+        """
+        first, last = self.period_spans[idx]
+        current = self.max_streak[p]
+        runs = self.runs[p]
+        if not runs:
+            return max(current, last - first + 1), current
+
+        _, left, right = self._adjacent_runs(runs, first, last)
+        merged = last - first + 1
+        if left:
+            merged += left[1] - left[0] + 1
+        if right:
+            merged += right[1] - right[0] + 1
+        return max(current, merged), current
+
+    def run_extent(self, p, idx):
+        """Day-ordinal (first, last) of the run containing an assigned period."""
+        first = self.period_spans[idx][0]
+        runs = self.runs[p]
+        return runs[bisect.bisect_right(runs, (first, math.inf)) - 1]
+
+    def _runs_add(self, p, idx):
+        first, last = self.period_spans[idx]
+        runs = self.runs[p]
+        pos, left, right = self._adjacent_runs(runs, first, last)
+        if right:
+            last = right[1]
+            runs.pop(pos)
+        if left:
+            first = left[0]
+            runs.pop(pos - 1)
+            pos -= 1
+        runs.insert(pos, (first, last))
+        self.max_streak[p] = max(self.max_streak[p], last - first + 1)
+
+    def _runs_remove(self, p, idx):
+        first, last = self.period_spans[idx]
+        runs = self.runs[p]
+        pos = bisect.bisect_right(runs, (first, math.inf)) - 1
+        run_first, run_last = runs.pop(pos)
+        if last < run_last:
+            runs.insert(pos, (last + 1, run_last))
+        if run_first < first:
+            runs.insert(pos, (run_first, first - 1))
+        if run_last - run_first + 1 == self.max_streak[p]:
+            self.max_streak[p] = max((b - a + 1 for a, b in runs), default=0)
@@ -20,9 +20,10 @@ _PROJECT_ROOT = os.path.dirname(_BLOCK_DIR)
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from parse_schedule import parse_schedule, merge_schedules
-from name_match import to_canonical, match_provider, clean_html_provider
-from block.engines.v3.prior_actuals_eval import classify_service, parse_date
+from name_match import to_canonical, match_provider
+import availability_store
+import schedule_corpus
+from block.engines.v3.prior_actuals_eval import classify_service
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -114,57 +115,22 @@ def scan_holiday_workers(schedules_dir):
     Returns:
         dict: holiday_name -> set of canonical provider names
     """
-    all_months = []
-    for fname in PRIOR_FILES:
-        fpath = os.path.join(schedules_dir, fname)
-        if not os.path.exists(fpath):
-            continue
-        month_data = parse_schedule(fpath)
-        all_months.append(month_data)
-
-    if not all_months:
-        return {name: set() for name in PRIOR_HOLIDAYS}
-
-    merged = merge_schedules(all_months)
-
-    # Pre-classify all services
-    service_classes = {}
-    for s in merged.get("services", []):
-        service_classes[s["name"]] = classify_service(s["name"], s["hours"])
-
     holiday_workers = {name: set() for name in PRIOR_HOLIDAYS}
 
-    for day_entry in merged["schedule"]:
-        d = parse_date(day_entry["date"])
-        if d is None:
-            continue
+    # Rows come pre-classified, with canonical provider names
+    rows = schedule_corpus.assignment_rows(schedules_dir, PRIOR_FILES, classify_service)
+    holiday_by_date = {HOLIDAYS[name]: name for name in reversed(PRIOR_HOLIDAYS)}
 
-        # Check if this date is a holiday
-        matched_holiday = None
-        for hol_name in PRIOR_HOLIDAYS:
-            if d == HOLIDAYS[hol_name]:
-                matched_holiday = hol_name
-                break
+    for row in rows:
+        matched_holiday = holiday_by_date.get(row["date"])
         if matched_holiday is None:
             continue
+        if row["moonlighting"]:
+            continue
+        if row["service_class"] == "exclude":
+            continue
 
-        for assignment in day_entry["assignments"]:
-            provider = clean_html_provider(assignment["provider"])
-            if not provider:
-                continue
-            if assignment.get("moonlighting", False):
-                continue
-
-            svc_class = service_classes.get(
-                assignment["service"],
-                classify_service(assignment["service"],
-                                 assignment.get("hours", ""))
-            )
-            if svc_class == "exclude":
-                continue
-
-            canonical = to_canonical(provider)
-            holiday_workers[matched_holiday].add(canonical)
+        holiday_workers[matched_holiday].add(row["canonical"])
 
     return holiday_workers
 
@@ -182,6 +148,9 @@ def _load_availability(availability_dir):
     availability = {}
     if not os.path.isdir(availability_dir):
         return availability
+    if availability_store.store_is_current(availability_dir):
+        return availability_store.load_unavailable_dates(
+            availability_store.store_path(availability_dir))
 
     for fname in os.listdir(availability_dir):
         if not fname.endswith(".json"):
@@ -0,0 +1,103 @@
+"""
+Parsed-input snapshot cache for the V3 engine.
+
+load_inputs() opens the Excel workbook, reads ~1,000 availability JSONs and
+runs name matching on every run, although the inputs rarely change between
+runs. This module stores the fully built load_inputs() result as a pickle,
+keyed by a hash of everything it was built from:
+
+  - Excel workbook: path + content hash
+  - Pre-scheduler JSON: path + content hash (or absent)
+  - Availability directory: manifest of *.json names, sizes and mtimes,
+    plus the consolidated store file when present
+
+Any change to those inputs produces a new key, so a stale snapshot is never
+served. Bump SNAPSHOT_VERSION when load_inputs() changes what it returns.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+
+_V3_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.abspath(os.path.join(_V3_DIR, "..", "..", ".."))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from availability_store import STORE_FILENAME
+
+CACHE_DIR = os.path.join(_V3_DIR, ".cache")
+SNAPSHOT_FILE = "inputs_snapshot.pkl"
+SNAPSHOT_VERSION = 1
+
+
+def _file_digest(path):
+    """SHA-256 of a file's contents, or None if it does not exist."""
+    if not path or not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _dir_manifest(directory):
+    """Sorted (name, size, mtime_ns) for each availability JSON and the store."""
+    if not directory or not os.path.isdir(directory):
+        return []
+    manifest = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # Dotfiles are the fetcher's own bookkeeping, not availability
+            if entry.name.startswith("."):
+                continue
+            if (entry.name.endswith(".json") or entry.name == STORE_FILENAME) \
+                    and entry.is_file():
+                st = entry.stat()
+                manifest.append((entry.name, st.st_size, st.st_mtime_ns))
+    manifest.sort()
+    return manifest
+
+
+def snapshot_key(excel_path, pre_schedule_path, availability_dir):
+    """Content key for the inputs load_inputs() would read."""
+    h = hashlib.sha256()
+    parts = [
+        f"v{SNAPSHOT_VERSION}",
+        os.path.abspath(excel_path),
+        _file_digest(excel_path),
+        os.path.abspath(pre_schedule_path) if pre_schedule_path else None,
+        _file_digest(pre_schedule_path),
+        os.path.abspath(availability_dir) if availability_dir else None,
+    ]
+    for part in parts:
+        h.update(repr(part).encode("utf-8"))
+    for entry in _dir_manifest(availability_dir):
+        h.update(repr(entry).encode("utf-8"))
+    return h.hexdigest()
+
+
+def read_snapshot(key, cache_dir=CACHE_DIR):
+    """Return the cached inputs for key, or None on a miss or unreadable file."""
+    path = os.path.join(cache_dir, SNAPSHOT_FILE)
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("key") != key:
+        return None
+    return snapshot["inputs"]
+
+
+def write_snapshot(key, inputs, cache_dir=CACHE_DIR):
+    """Store inputs under key, replacing any previous snapshot atomically."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, SNAPSHOT_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"key": key, "inputs": inputs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Rolling repair for Block Schedule Engine v3.
+
+When availability changes mid-planning, re-running the engine produces a
+completely different schedule. Repair keeps the existing one instead:
+
+  - the saved schedule (schedule_seed*.json) is replayed onto a state built
+    from the current inputs, in period order, with the hard-constraint
+    check (fair-share cap lifted, as in Phase 3)
+  - only the assignments that now fail it are removed — unavailable,
+    no longer eligible, over capacity, streak or conflict pair
+  - the slots they leave open are refilled with the engine's scoring and
+    look-ahead (capped, then uncapped, then a one-step swap with a
+    replacement for the donor slot); every other slot is left as it was,
+    apart from the donor slots of those swaps
+
+The result has the usual phase5_output() shape plus a "repair" summary
+with the removed and added assignments.
+
+Usage:
+    python -m block.engines.v3.repair output/v3/schedule_seed42.json
+    python -m block.engines.v3.repair output/v3/schedule_seed42.json \\
+        --unavailable "Smith, Jane" 2026-04-06:2026-04-12 2026-05-01
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from block.engines.v3 import engine
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# AVAILABILITY CHANGES
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _expand_dates(specs):
+    """YYYY-MM-DD and YYYY-MM-DD:YYYY-MM-DD (inclusive) specs -> date strings."""
+    dates = set()
+    for spec in specs:
+        first, _, last = spec.partition(":")
+        d = date.fromisoformat(first)
+        end = date.fromisoformat(last) if last else d
+        while d <= end:
+            dates.add(d.isoformat())
+            d += timedelta(days=1)
+    return dates
+
+
+def apply_unavailability(inputs, changes):
+    """Copy of load_inputs() output with extra unavailable dates.
+
+    Args:
+        inputs: load_inputs() output (not mutated)
+        changes: dict provider name -> iterable of date specs (see _expand_dates)
+
+    Returns:
+        dict — inputs with the dates added to each provider's availability
+    """
+    unavailable = dict(inputs["unavailable_dates"])
+    name_map = dict(inputs["name_map"])
+    for name, specs in changes.items():
+        if name not in inputs["providers"]:
+            raise ValueError(f"Unknown provider {name!r}")
+        json_name = name_map.get(name) or name.upper()
+        name_map[name] = json_name
+        unavailable[json_name] = set(unavailable.get(json_name, ())) | _expand_dates(specs)
+    return dict(inputs, unavailable_dates=unavailable, name_map=name_map)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# REPAIR
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _replay(state, schedule):
+    """Place the saved assignments that still pass the hard constraints.
+
+    Returns:
+        list of removed (period_idx, provider, site, reason)
+    """
+    removed = []
+    for period in schedule["draft_schedule"]:
+        idx = period["period_idx"]
+        for a in period["assignments"]:
+            name, site = a["provider"], a["site"]
+            p, s = state.pid.get(name), state.sid.get(site)
+            if p is None:
+                removed.append((idx, name, site, "not_eligible"))
+                continue
+            if s is None or state.site_shortfall(idx, s) <= 0:
+                removed.append((idx, name, site, "over_demand"))
+                continue
+            ok, reason = engine._can_assign(state, p, idx, s, use_cap=False)
+            if not ok:
+                removed.append((idx, name, site, reason))
+                continue
+            engine._place_provider(state, p, idx, s)
+    return removed
+
+
+def _swap_fill(state, period_idx, s, period_type):
+    """Fill one slot by moving a provider over from another site this period.
+
+    Only done when someone else can take the donor slot, so no new gap opens
+    (the Phase 4 swap without its gap-tolerant donors).
+    """
+    for assigned, assigned_site in list(state.roster[period_idx].items()):
+        if assigned_site == s or s not in state.prov_site_set[assigned]:
+            continue
+        replacement = engine._find_replacement(state, period_idx, assigned_site,
+                                               period_type, exclude={assigned})
+        if replacement is None:
+            continue
+        engine._remove_provider(state, assigned, period_idx)
+        engine._place_provider(state, assigned, period_idx, s)
+        engine._place_provider(state, replacement, period_idx, assigned_site)
+        return True
+    return False
+
+
+def _refill(state, slots):
+    """Refill the given (period_idx, s) slots, hardest sites first."""
+    for idx, s in sorted(slots, key=lambda slot: (state.gap_tol[slot[1]], slot[0], slot[1])):
+        period_type = state.periods[idx]["type"]
+        while state.site_shortfall(idx, s) > 0:
+            if not (engine._fill_one_slot(state, idx, s, period_type, use_cap=True)
+                    or engine._fill_one_slot(state, idx, s, period_type, use_cap=False)
+                    or _swap_fill(state, idx, s, period_type)):
+                break
+
+
+def _assignment_set(draft_schedule):
+    return {(period["period_idx"], a["provider"], a["site"])
+            for period in draft_schedule for a in period["assignments"]}
+
+
+def repair_schedule(inputs, schedule, block_start, block_end):
+    """Repair a saved v3 schedule against the current inputs.
+
+    Args:
+        inputs: load_inputs() output reflecting the changed availability
+            (see apply_unavailability())
+        schedule: a schedule_seed*.json result
+        block_start, block_end: the block the schedule was built for
+
+    Returns:
+        dict — phase5_output() result plus a "repair" summary: removed and
+        added assignments, moved (assignments no longer in place), open
+        (open positions in the affected slots after the removals) and
+        unfilled (those still open after the refill)
+    """
+    t0 = time.perf_counter()
+    stats = schedule["stats"]
+    state = engine.build_state(inputs, block_start, block_end, seed=stats["seed"])
+    labels = [p["label"] for p in schedule["draft_schedule"]]
+    if labels != [p["label"] for p in state.periods]:
+        raise ValueError("Schedule periods do not match the block "
+                         f"{block_start:%Y-%m-%d} to {block_end:%Y-%m-%d}")
+
+    print(f"\n[Repair] Replaying {sum(len(p['assignments']) for p in schedule['draft_schedule'])} "
+          f"assignments...")
+    removed = _replay(state, schedule)
+    slots = {(idx, state.sid[site]) for idx, _, site, _ in removed if site in state.sid}
+    open_before = sum(max(0, state.site_shortfall(idx, s)) for idx, s in slots)
+    print(f"  Removed: {len(removed)}")
+    for idx, name, site, reason in removed:
+        print(f"    {state.periods[idx]['label']:<36} {site:<20} {name} ({reason})")
+
+    _refill(state, slots)
+    seconds = time.perf_counter() - t0
+
+    results = engine.phase5_output(state)
+    results["stats"]["mode"] = stats.get("mode", "greedy")
+    before = _assignment_set(schedule["draft_schedule"])
+    after = _assignment_set(results["draft_schedule"])
+    unfilled = sum(max(0, state.site_shortfall(idx, s)) for idx, s in slots)
+    results["repair"] = {
+        "removed": [{"period_idx": idx, "provider": name, "site": site, "reason": reason}
+                    for idx, name, site, reason in removed],
+        "added": [{"period_idx": idx, "provider": name, "site": site}
+                  for idx, name, site in sorted(after - before)],
+        "moved": len(before - after),
+        "open": open_before,
+        "unfilled": unfilled,
+        "seconds": round(seconds, 3),
+    }
+
+    print(f"\n[Repair] {len(before - after)} assignment(s) moved, "
+          f"{len(after - before)} placed, {open_before - unfilled}/{open_before} "
+          f"open position(s) refilled ({seconds:.2f}s)")
+    return results
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════════════════
+
+def main():
+    from block.engines.v3.run import (
+        BLOCK_START, BLOCK_END, DEFAULT_EXCEL, DEFAULT_PRE_SCHEDULE,
+        DEFAULT_AVAILABILITY_DIR,
+    )
+
+    parser = argparse.ArgumentParser(description="Repair a v3 schedule after availability changes")
+    parser.add_argument("schedule", help="schedule_seed*.json to repair")
+    parser.add_argument("--unavailable", nargs="+", action="append", default=[],
+                        metavar=("PROVIDER", "DATE"),
+                        help="Mark a provider unavailable: name, then dates "
+                             "(YYYY-MM-DD or YYYY-MM-DD:YYYY-MM-DD); repeatable")
+    parser.add_argument("--excel", type=str, default=DEFAULT_EXCEL,
+                        help="Path to hospitalist_scheduler.xlsx")
+    parser.add_argument("--pre-schedule", type=str, default=DEFAULT_PRE_SCHEDULE,
+                        help="Path to pre_schedule_output.json")
+    parser.add_argument("--no-pre-schedule", action="store_true",
+                        help="Skip loading pre-scheduler data")
+    parser.add_argument("--availability-dir", type=str, default=DEFAULT_AVAILABILITY_DIR,
+                        help="Directory with individual availability JSONs")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Where to write the repaired schedule "
+                             "(default: <schedule>_repaired.json)")
+    args = parser.parse_args()
+
+    with open(args.schedule) as f:
+        schedule = json.load(f)
+
+    pre_schedule_path = None if args.no_pre_schedule else args.pre_schedule
+    inputs = engine.load_inputs(args.excel, pre_schedule_path, args.availability_dir,
+                                use_cache=True)
+    changes = {}
+    for name, *specs in args.unavailable:
+        changes.setdefault(name, []).extend(specs)
+    if changes:
+        inputs = apply_unavailability(inputs, changes)
+
+    results = repair_schedule(inputs, schedule, BLOCK_START, BLOCK_END)
+
+    output = args.output or f"{os.path.splitext(args.schedule)[0]}_repaired.json"
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"  Saved: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,6 +33,7 @@ from block.engines.v3.excel_io import (
     load_providers_from_excel, load_tags_from_excel, load_sites_from_excel,
 )
 from name_match import match_provider
+import availability_store
 
 try:
     from openpyxl import load_workbook as _load_workbook
@@ -78,6 +79,8 @@ def _load_full_availability():
     avail_all = {}
     if not os.path.isdir(SCHEDULES_DIR):
         return avail_all
+    if availability_store.store_is_current(SCHEDULES_DIR):
+        return availability_store.load_status_map(availability_store.store_path(SCHEDULES_DIR))
     for fname in os.listdir(SCHEDULES_DIR):
         if not fname.endswith(".json"):
             continue
@@ -25,9 +25,9 @@ _PROJECT_ROOT = os.path.dirname(_BLOCK_DIR)
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from parse_schedule import parse_schedule, merge_schedules
-from name_match import to_canonical, match_provider, clean_html_provider
-from block.engines.v3.prior_actuals_eval import classify_service, parse_date
+from name_match import to_canonical, match_provider
+from block.engines.v3.prior_actuals_eval import classify_service
+import schedule_corpus
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -64,62 +64,42 @@ def compute_block3_actuals(schedules_dir):
             worked_memorial_week (bool)
         }
     """
-    all_months = []
-    files_parsed = 0
-    for fname in BLOCK_3_FILES:
-        fpath = os.path.join(schedules_dir, fname)
-        if not os.path.exists(fpath):
-            continue
-        month_data = parse_schedule(fpath)
-        all_months.append(month_data)
-        files_parsed += 1
-
-    if not all_months:
+    files_parsed = len(schedule_corpus.load_months(schedules_dir, BLOCK_3_FILES))
+    if not files_parsed:
         return {}, 0
 
-    merged = merge_schedules(all_months)
-
-    # Pre-classify all services
-    service_classes = {}
-    for s in merged.get("services", []):
-        service_classes[s["name"]] = classify_service(s["name"], s["hours"])
+    # Rows come pre-classified, with cleaned HTML provider names
+    rows = schedule_corpus.assignment_rows(schedules_dir, BLOCK_3_FILES, classify_service)
 
     # Count shifts per provider, deduplicated per day
     provider_day_shifts = defaultdict(dict)
+    priority = {"night": 3, "swing": 2, "weekday": 1, "weekend": 1}
 
-    for day_entry in merged["schedule"]:
-        dow = day_entry["day_of_week"]
-        is_weekend = dow in ("Sat", "Sun")
-        date_str = day_entry["date"]
-
-        d = parse_date(date_str)
+    for row in rows:
+        d = row["date"]
         if not _in_block3(d):
             continue
+        if row["moonlighting"]:
+            continue
 
-        for assignment in day_entry["assignments"]:
-            provider = clean_html_provider(assignment["provider"])
-            if not provider:
-                continue
-            if assignment.get("moonlighting", False):
-                continue
-
-            svc_class = service_classes.get(assignment["service"], "day")
-            if svc_class == "exclude":
-                continue
-
-            if svc_class == "night":
-                shift_type = "night"
-            elif svc_class == "swing":
-                shift_type = "swing"
-            elif is_weekend:
-                shift_type = "weekend"
-            else:
-                shift_type = "weekday"
+        svc_class = row["service_class"]
+        if svc_class == "exclude":
+            continue
+
+        if svc_class == "night":
+            shift_type = "night"
+        elif svc_class == "swing":
+            shift_type = "swing"
+        elif row["is_weekend"]:
+            shift_type = "weekend"
+        else:
+            shift_type = "weekday"
 
-            existing = provider_day_shifts[provider].get(date_str)
-            priority = {"night": 3, "swing": 2, "weekday": 1, "weekend": 1}
-            if existing is None or priority.get(shift_type, 0) > priority.get(existing[0], 0):
-                provider_day_shifts[provider][date_str] = (shift_type, d)
+        provider = row["provider"]
+        date_str = row["date_str"]
+        existing = provider_day_shifts[provider].get(date_str)
+        if existing is None or priority.get(shift_type, 0) > priority.get(existing[0], 0):
+            provider_day_shifts[provider][date_str] = (shift_type, d)
 
     # Aggregate
     provider_counts = defaultdict(lambda: {
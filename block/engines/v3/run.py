@@ -9,19 +9,29 @@ Usage:
     python -m block.engines.v3.run                    # single default seed
     python -m block.engines.v3.run --seeds 42 7 123   # multiple seeds
     python -m block.engines.v3.run --no-pre-schedule  # skip pre-scheduler data
+    python -m block.engines.v3.run --seeds $(seq 1 200) --jobs 8  # parallel sweep
+    python -m block.engines.v3.run --rebuild-inputs   # ignore parsed-input snapshot
+    python -m block.engines.v3.run --search-seconds 10  # local search after phase 4
+    python -m block.engines.v3.run --mode flow        # min-cost-flow period fill
+    python -m block.engines.v3.run --seeds $(seq 1 200) --stop-at-bound  # stop at proven optimum
+    python -m block.engines.v3.run --decompose --jobs 4  # site clusters in parallel
 """
 
 import argparse
+import contextlib
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 _PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from block.engines.v3.engine import run_engine
+from block.engines.v3.engine import (
+    ENGINE_MODES, run_engine, load_inputs, run_engine_with_inputs,
+)
 from block.engines.v3.report import generate_report, generate_multi_seed_report
 
 # ─── Block 3 Configuration ──────────────────────────────────────────────────
@@ -37,6 +47,110 @@ DEFAULT_AVAILABILITY_DIR = os.path.join(_PROJECT_ROOT, "input", "individualSched
 DEFAULT_OUTPUT_DIR = os.path.join(_PROJECT_ROOT, "output", "v3")
 
 
+# ─── Parallel sweep ─────────────────────────────────────────────────────────
+# Inputs are handed to each worker once via the pool initializer rather than
+# pickled with every seed.
+
+_worker_inputs = None
+_worker_options = {}
+
+
+def _init_worker(inputs, options=None):
+    global _worker_inputs, _worker_options
+    _worker_inputs = inputs
+    _worker_options = options or {}
+
+
+def _run_seed_quiet(seed):
+    """Worker: run one seed on the shared inputs with engine logging muted."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return run_engine_with_inputs(_worker_inputs, BLOCK_START, BLOCK_END, seed=seed,
+                                      **_worker_options)
+
+
+def _save_seed_outputs(results, output_dir):
+    """Write the per-seed schedule JSON and gap report."""
+    seed = results["stats"]["seed"]
+
+    # Save per-seed JSON
+    json_path = os.path.join(output_dir, f"schedule_seed{seed}.json")
+    with open(json_path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"  Saved: {json_path}")
+
+    # Save gap report separately for easy review
+    gap_path = os.path.join(output_dir, f"gap_report_seed{seed}.json")
+    with open(gap_path, "w") as f:
+        json.dump({
+            "stats": results["stats"],
+            "gap_report": results["gap_report"],
+            "site_coverage": results["site_coverage"],
+        }, f, indent=2, default=str)
+    print(f"  Saved: {gap_path}")
+
+
+def _print_bound(bound):
+    print(f"\n  Coverage bound: at least {bound['min_gaps']} gaps, "
+          f"{bound['min_zero_gap_violations']} zero-gap violations "
+          f"(python -m block.engines.v3.bounds for the certificates)")
+
+
+def _print_reached(seed):
+    print(f"\n  Seed {seed} reached the coverage bound — no seed can do better, "
+          f"stopping the sweep")
+
+
+def run_seeds_parallel(seeds, excel_path, pre_schedule_path, availability_dir,
+                       output_dir, jobs, use_cache=False, rebuild_cache=False,
+                       search_seconds=0, mode="greedy", stop_at_bound=False):
+    """Load inputs once, run seeds across a process pool, save as each finishes.
+
+    With stop_at_bound, seeds still queued are cancelled as soon as one seed
+    reaches the coverage bound (see bounds.py).
+
+    Returns:
+        list of results in the order of seeds (not completion order); with
+        stop_at_bound, only the seeds that finished
+    """
+    print(f"{'=' * 70}")
+    print(f"BLOCK SCHEDULE ENGINE v3 — {len(seeds)} seeds, {jobs} workers")
+    print(f"{'=' * 70}")
+    print("\n[Phase 0] Loading data (shared by all seeds)...")
+    inputs = load_inputs(excel_path, pre_schedule_path, availability_dir,
+                         use_cache=use_cache, rebuild_cache=rebuild_cache)
+
+    options = {"search_seconds": search_seconds, "mode": mode}
+    bound = None
+    if stop_at_bound:
+        # bounds needs networkx; a plain sweep should not
+        from block.engines.v3 import bounds
+        bound = bounds.bound_for_inputs(inputs, BLOCK_START, BLOCK_END, certificates=False)
+        options["gap_floor"] = bounds.gap_floor(bound)
+        _print_bound(bound)
+
+    by_seed = {}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(inputs, options)) as pool:
+        futures = {pool.submit(_run_seed_quiet, seed): seed for seed in seeds}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            results = future.result()
+            s = results["stats"]
+            by_seed[futures[future]] = results
+            print(f"\n  [{len(by_seed)}/{len(seeds)}] seed={s['seed']}: "
+                  f"{s['total_gaps']} gaps, {s['zero_gap_violations']} zero-gap violations")
+            _save_seed_outputs(results, output_dir)
+            if bound is not None and bounds.reached_bound(s, bound):
+                _print_reached(s["seed"])
+                # Seeds already running finish (and are collected below)
+                for pending in futures:
+                    pending.cancel()
+                bound = None
+
+    return [by_seed[seed] for seed in seeds if seed in by_seed]
+
+
 def main():
     parser = argparse.ArgumentParser(description="Block Schedule Engine v3")
     parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS,
@@ -53,40 +167,92 @@ def main():
                         help=f"Output directory (default: {DEFAULT_OUTPUT_DIR})")
     parser.add_argument("--no-report", action="store_true",
                         help="Skip HTML report generation")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for multi-seed runs (or for the site "
+                             "clusters with --decompose); inputs are loaded once "
+                             "and shared (default: 1, sequential)")
+    parser.add_argument("--rebuild-inputs", action="store_true",
+                        help="Re-read the workbook and availability JSONs and "
+                             "refresh the parsed-input snapshot")
+    parser.add_argument("--no-input-cache", action="store_true",
+                        help="Neither read nor write the parsed-input snapshot")
+    parser.add_argument("--mode", choices=ENGINE_MODES, default="greedy",
+                        help="Phase 2-3 fill strategy: greedy slot-by-slot or "
+                             "min-cost flow per period (default: greedy)")
+    parser.add_argument("--search-seconds", type=float, default=0,
+                        help="Wall-clock budget per seed for Phase 4b local search "
+                             "(default: 0, off)")
+    parser.add_argument("--stop-at-bound", action="store_true",
+                        help="Compute the max-flow coverage bound first; end the "
+                             "sweep (and Phase 4b) once a seed reaches it")
+    parser.add_argument("--decompose", action="store_true",
+                        help="Schedule each site cluster separately and merge "
+                             "(see decompose.py); --jobs then runs clusters in parallel")
     args = parser.parse_args()
 
     os.makedirs(args.output_dir, exist_ok=True)
 
     pre_schedule_path = None if args.no_pre_schedule else args.pre_schedule
 
+    # Duplicate seeds would produce identical output files
+    seeds = list(dict.fromkeys(args.seeds))
+
     # ── Run engine for each seed ─────────────────────────────────────
-    all_results = []
-    for seed in args.seeds:
-        results = run_engine(
-            excel_path=args.excel,
-            pre_schedule_path=pre_schedule_path,
-            availability_dir=args.availability_dir,
-            block_start=BLOCK_START,
-            block_end=BLOCK_END,
-            seed=seed,
+    if args.jobs > 1 and len(seeds) > 1 and not args.decompose:
+        all_results = run_seeds_parallel(
+            seeds, args.excel, pre_schedule_path, args.availability_dir,
+            args.output_dir, min(args.jobs, len(seeds)),
+            use_cache=not args.no_input_cache, rebuild_cache=args.rebuild_inputs,
+            search_seconds=args.search_seconds, mode=args.mode,
+            stop_at_bound=args.stop_at_bound,
         )
-        all_results.append(results)
-
-        # Save per-seed JSON
-        json_path = os.path.join(args.output_dir, f"schedule_seed{seed}.json")
-        with open(json_path, "w") as f:
-            json.dump(results, f, indent=2, default=str)
-        print(f"  Saved: {json_path}")
-
-        # Save gap report separately for easy review
-        gap_path = os.path.join(args.output_dir, f"gap_report_seed{seed}.json")
-        with open(gap_path, "w") as f:
-            json.dump({
-                "stats": results["stats"],
-                "gap_report": results["gap_report"],
-                "site_coverage": results["site_coverage"],
-            }, f, indent=2, default=str)
-        print(f"  Saved: {gap_path}")
+    else:
+        inputs = bound = floor = None
+        if args.stop_at_bound or args.decompose:
+            inputs = load_inputs(args.excel, pre_schedule_path, args.availability_dir,
+                                 use_cache=not args.no_input_cache,
+                                 rebuild_cache=args.rebuild_inputs)
+        if args.stop_at_bound:
+            from block.engines.v3 import bounds
+            bound = bounds.bound_for_inputs(inputs, BLOCK_START, BLOCK_END,
+                                            certificates=False)
+            floor = bounds.gap_floor(bound)
+            _print_bound(bound)
+
+        all_results = []
+        for i, seed in enumerate(seeds):
+            if args.decompose:
+                from block.engines.v3.decompose import run_engine_decomposed
+                results = run_engine_decomposed(
+                    inputs, BLOCK_START, BLOCK_END, seed=seed, jobs=args.jobs,
+                    search_seconds=args.search_seconds, mode=args.mode,
+                    gap_floor=floor,
+                )
+            elif inputs is not None:
+                results = run_engine_with_inputs(
+                    inputs, BLOCK_START, BLOCK_END, seed=seed,
+                    search_seconds=args.search_seconds, mode=args.mode,
+                    gap_floor=floor,
+                )
+            else:
+                results = run_engine(
+                    excel_path=args.excel,
+                    pre_schedule_path=pre_schedule_path,
+                    availability_dir=args.availability_dir,
+                    block_start=BLOCK_START,
+                    block_end=BLOCK_END,
+                    seed=seed,
+                    use_cache=not args.no_input_cache,
+                    # Rebuild at most once; later seeds reuse the fresh snapshot
+                    rebuild_cache=args.rebuild_inputs and i == 0,
+                    search_seconds=args.search_seconds,
+                    mode=args.mode,
+                )
+            all_results.append(results)
+            _save_seed_outputs(results, args.output_dir)
+            if bound is not None and bounds.reached_bound(results["stats"], bound):
+                _print_reached(seed)
+                break
 
     # ── Generate HTML reports ──────────────────────────────────────────
     if not args.no_report:
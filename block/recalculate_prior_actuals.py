@@ -30,8 +30,8 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 sys.path.insert(0, PROJECT_ROOT)
 
-from parse_schedule import parse_schedule, merge_schedules
-from name_match import to_canonical, normalize_name, match_provider, clean_html_provider
+from name_match import to_canonical, normalize_name, match_provider
+import schedule_corpus
 
 INPUT_DIR = os.path.join(PROJECT_ROOT, "input")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
@@ -230,23 +230,19 @@ def main():
     print(f"Block 2: {BLOCK_2_START} to {BLOCK_2_END}")
     print("=" * 70)
 
-    # Parse all prior month HTML files
-    all_month_data = []
+    # Parse all prior month HTML files (cached in the schedule corpus)
     for fname in PRIOR_FILES:
         fpath = os.path.join(INPUT_DIR, fname)
         if not os.path.exists(fpath):
             print(f"  WARNING: Missing file: {fname}")
             continue
         print(f"  Parsing: {fname}")
-        month_data = parse_schedule(fpath)
-        all_month_data.append(month_data)
 
-    if not all_month_data:
+    # Merge all months
+    merged = schedule_corpus.merged_schedule(INPUT_DIR, PRIOR_FILES)
+    if merged is None:
         print("ERROR: No schedule files found!")
         sys.exit(1)
-
-    # Merge all months
-    merged = merge_schedules(all_month_data)
     print(f"\nParsed {len(merged['schedule'])} days, "
           f"{len(merged.get('by_provider', {}))} unique providers")
 
@@ -274,52 +270,44 @@ def main():
     # Count shifts per provider, DEDUPLICATED per day
     # Priority: night(3) > swing(2) > weekday/weekend(1)
     provider_day_shifts = defaultdict(dict)  # provider -> {date_str: shift_type}
-    dates_outside_range = 0
+    priority = {"night": 3, "swing": 2, "weekday": 1, "weekend": 1}
     moonlighting_excluded = 0
 
-    for day_entry in merged["schedule"]:
-        dow = day_entry["day_of_week"]
-        is_weekend = dow in ("Sat", "Sun")
-        date_str = day_entry["date"]
+    # Date filtering: only count shifts within Block 1 & 2 boundaries
+    dates_outside_range = sum(1 for day_entry in merged["schedule"]
+                              if not in_block_range(parse_date(day_entry["date"])))
 
-        # Date filtering: only count shifts within Block 1 & 2 boundaries
-        d = parse_date(date_str)
-        if not in_block_range(d):
-            dates_outside_range += 1
+    # Rows come classified and with cleaned provider names
+    for row in schedule_corpus.assignment_rows(INPUT_DIR, PRIOR_FILES, classify_service):
+        if not in_block_range(row["date"]):
             continue
 
-        for assignment in day_entry["assignments"]:
-            # Clean provider name
-            provider = clean_html_provider(assignment["provider"])
-            if not provider:
-                continue
-
-            # Exclude moonlighting shifts
-            if assignment.get("moonlighting", False):
-                moonlighting_excluded += 1
-                continue
-
-            service_name = assignment["service"]
-            svc_class = service_classes.get(service_name, "day")
-
-            if svc_class == "exclude":
-                continue
-
-            # Determine shift type for this day
-            if svc_class == "night":
-                shift_type = "night"
-            elif svc_class == "swing":
-                shift_type = "swing" if is_weekend else "swing"
-            elif is_weekend:
-                shift_type = "weekend"
-            else:
-                shift_type = "weekday"
+        # Exclude moonlighting shifts
+        if row["moonlighting"]:
+            moonlighting_excluded += 1
+            continue
 
-            # Keep highest-priority shift type for this provider+date
-            existing = provider_day_shifts[provider].get(date_str)
-            priority = {"night": 3, "swing": 2, "weekday": 1, "weekend": 1}
-            if existing is None or priority.get(shift_type, 0) > priority.get(existing, 0):
-                provider_day_shifts[provider][date_str] = shift_type
+        svc_class = row["service_class"]
+
+        if svc_class == "exclude":
+            continue
+
+        # Determine shift type for this day
+        if svc_class == "night":
+            shift_type = "night"
+        elif svc_class == "swing":
+            shift_type = "swing"
+        elif row["is_weekend"]:
+            shift_type = "weekend"
+        else:
+            shift_type = "weekday"
+
+        # Keep highest-priority shift type for this provider+date
+        provider = row["provider"]
+        date_str = row["date_str"]
+        existing = provider_day_shifts[provider].get(date_str)
+        if existing is None or priority.get(shift_type, 0) > priority.get(existing, 0):
+            provider_day_shifts[provider][date_str] = shift_type
 
     print(f"\nDate filtering: {dates_outside_range} days outside Block 1 & 2 range skipped")
     print(f"Moonlighting shifts excluded: {moonlighting_excluded}")
@@ -5,6 +5,8 @@ Fetch provider availability from Amion and save as JSON files.
 Connects to Amion's individual schedule pages, parses the calendar grid
 for availability indicators (checkmark = available, X = unavailable,
 blank = no submission), and writes one JSON file per provider per month.
+Each fetched month is also written into the consolidated availability store
+(availability_store.py) in the output directory unless --no-store is given.
 
 Usage:
   # Fetch specific providers for specific months
@@ -24,6 +26,41 @@ Usage:
   # Overwrite existing files
   python fetch_availability.py --providers "Shah, Hely" --months 3 --year 2026 --force
 
+  # Full roster refresh: 6 concurrent connections, at most 4 requests/second
+  python fetch_availability.py --provider-file roster.txt --months 3 4 5 6 \\
+                               --year 2026 --force --jobs 6 --rate 4
+
+  # Point at a local stand-in server (python -m analysis.amion_standin)
+  python fetch_availability.py --providers "Shah, Hely" --months 3 --year 2026 \\
+                               --base-url http://127.0.0.1:8000/cgi-bin/ocs
+
+  # Pick up schedule changes: re-check every page, rewrite only changed months
+  python fetch_availability.py --provider-file roster.txt --months 3 4 5 6 \\
+                               --year 2026 --refresh --jobs 6
+
+Refreshes are differential. Per-page validators (ETag, Last-Modified and a
+content hash) are kept in .fetch_state.json in the output directory; pages
+are requested conditionally and a provider-month's JSON and store rows are
+rewritten only when its parsed days actually changed (--force rewrites
+every fetched month regardless). Every non-dry run
+writes a change manifest (.fetch_changes.json, or --manifest PATH) listing
+the provider-months and dates that changed, so downstream caches can
+invalidate just the affected providers. Each job's validators and change
+record are journaled as the job completes and the state file and manifest
+are built from the journal, so changes written by an interrupted run reach
+the manifest of the run that follows it.
+
+Pages are fetched over keep-alive connections that honour the http_proxy /
+https_proxy / no_proxy environment and follow redirects, as urlopen() does.
+
+Interrupted runs resume: every provider-month whose JSON and store rows are
+written is appended to a job journal (.fetch_journal.jsonl in the output
+directory), and a rerun with the same job list and arguments skips jobs the
+journal marks done. The journal starts with a hash of the job list and
+arguments; a run with a different hash, and every --refresh run, starts a
+fresh journal instead. The journal is removed once a run finishes with no
+errors.
+
 Output format (matches existing individualSchedules JSONs):
   {"name": "Last, First", "month": 3, "year": 2026,
    "days": [{"date": "2026-03-01", "status": "available"}, ...]}
@@ -35,16 +72,24 @@ Configuration is read from config.json (amion_file_id, amion_ps, amion_ui_prefix
 """
 
 import argparse
+import base64
+import hashlib
+import http.client
 import json
 import os
+import random
 import re
 import sys
+import threading
 import time
-import urllib.request
 import urllib.parse
-from datetime import date
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
 from html.parser import HTMLParser
 
+import availability_store
+
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -65,6 +110,18 @@ DEFAULT_AMION = {
 # Rate limit: seconds between requests to be polite to Amion
 REQUEST_DELAY = 0.5
 
+# Retries for transient failures (connection errors, HTTP 429/5xx)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0  # seconds; doubled on each retry
+
+# Redirects followed per request, as urllib.request.urlopen() would
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+JOURNAL_FILENAME = ".fetch_journal.jsonl"
+STATE_FILENAME = ".fetch_state.json"
+MANIFEST_FILENAME = ".fetch_changes.json"
+
 
 def load_amion_config():
     """Load Amion connection settings from config.json, with defaults."""
@@ -311,13 +368,379 @@ def build_url(amion_cfg, provider_name, month, year):
     return f"{amion_cfg['base_url']}?{urllib.parse.urlencode(params)}"
 
 
-def fetch_page(url):
-    """Fetch a URL and return the HTML content as a string."""
-    req = urllib.request.Request(url, headers={
-        "User-Agent": "HospitalistScheduler/1.0 (availability fetch)"
-    })
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        return resp.read().decode("utf-8", errors="replace")
+class TransientFetchError(Exception):
+    """A fetch failure worth retrying (connection problem, HTTP 429/5xx)."""
+
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter.
+
+    Allows bursts of up to `burst` requests, refilling at `rate` tokens per
+    second. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AmionClient:
+    """HTTP client that keeps one keep-alive connection per worker thread.
+
+    Like urllib.request.urlopen(), it honours the http_proxy / https_proxy /
+    no_proxy environment (https is tunnelled through the proxy with CONNECT)
+    and follows redirects.
+    """
+
+    def __init__(self, timeout=30, proxies=None):
+        self.timeout = timeout
+        self.proxies = urllib.request.getproxies() if proxies is None else proxies
+        self.local = threading.local()
+
+    def _proxy_for(self, parts):
+        """Split proxy URL for a target URL, or None to connect directly."""
+        proxy = self.proxies.get(parts.scheme)
+        if not proxy or urllib.request.proxy_bypass(parts.hostname or ""):
+            return None
+        if "://" not in proxy:
+            proxy = f"http://{proxy}"
+        return urllib.parse.urlsplit(proxy)
+
+    @staticmethod
+    def _proxy_auth(proxy):
+        """Proxy-Authorization header for credentials in the proxy URL."""
+        if not proxy.username:
+            return {}
+        creds = (f"{urllib.parse.unquote(proxy.username)}:"
+                 f"{urllib.parse.unquote(proxy.password or '')}")
+        return {"Proxy-Authorization":
+                "Basic " + base64.b64encode(creds.encode("utf-8")).decode("ascii")}
+
+    def _connection(self, parts):
+        """The thread's connection for a target, plus extra request headers.
+
+        Returns:
+            (key, conn, absolute, headers): absolute is True when requests
+            go to a plain HTTP proxy and must carry the full URL
+        """
+        conns = getattr(self.local, "conns", None)
+        if conns is None:
+            conns = self.local.conns = {}
+        key = (parts.scheme, parts.netloc)
+        if key not in conns:
+            proxy = self._proxy_for(parts)
+            if proxy is None:
+                cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+                conns[key] = (cls(parts.netloc, timeout=self.timeout), False, {})
+            else:
+                proxy_port = proxy.port or (443 if proxy.scheme == "https" else 80)
+                if parts.scheme == "https":
+                    conn = http.client.HTTPSConnection(proxy.hostname, proxy_port,
+                                                       timeout=self.timeout)
+                    conn.set_tunnel(parts.hostname, parts.port or 443,
+                                    headers=self._proxy_auth(proxy))
+                    conns[key] = (conn, False, {})
+                else:
+                    cls = http.client.HTTPSConnection if proxy.scheme == "https" else http.client.HTTPConnection
+                    conns[key] = (cls(proxy.hostname, proxy_port, timeout=self.timeout),
+                                  True, self._proxy_auth(proxy))
+        return (key, *conns[key])
+
+    def _drop(self, key):
+        entry = self.local.conns.pop(key, None)
+        if entry is not None:
+            entry[0].close()
+
+    def _request(self, url, headers):
+        """One GET over the pooled connection: (response, body bytes)."""
+        parts = urllib.parse.urlsplit(url)
+        key, conn, absolute, proxy_headers = self._connection(parts)
+        if absolute:
+            target = urllib.parse.urlunsplit(parts._replace(fragment=""))
+        else:
+            target = parts.path or "/"
+            if parts.query:
+                target += "?" + parts.query
+        try:
+            conn.request("GET", target, headers={**headers, **proxy_headers})
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError) as e:
+            self._drop(key)
+            raise TransientFetchError(f"{type(e).__name__}: {e}") from e
+        if resp.will_close:
+            self._drop(key)
+        return resp, body
+
+    def get(self, url, headers=None):
+        """GET url over the thread's pooled connection, following redirects.
+
+        Args:
+            headers: extra request headers (e.g. If-None-Match)
+
+        Returns:
+            (status, body_text, response_headers) where status is 200, or
+            304 for a conditional request the server answered Not Modified.
+        """
+        req_headers = {
+            "User-Agent": "HospitalistScheduler/1.0 (availability fetch)",
+            "Connection": "keep-alive",
+        }
+        req_headers.update(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            resp, body = self._request(url, req_headers)
+            location = resp.getheader("Location")
+            if resp.status not in REDIRECT_STATUSES or not location:
+                break
+            url = urllib.parse.urljoin(url, location)
+        else:
+            raise ValueError(f"More than {MAX_REDIRECTS} redirects")
+
+        if resp.status == 429 or resp.status >= 500:
+            raise TransientFetchError(f"HTTP {resp.status}")
+        if resp.status not in (200, 304):
+            raise ValueError(f"HTTP {resp.status} {resp.reason}")
+        return resp.status, body.decode("utf-8", errors="replace"), dict(resp.getheaders())
+
+
+def fetch_with_retry(client, limiter, url, retries=MAX_RETRIES, backoff=RETRY_BACKOFF,
+                     headers=None):
+    """Fetch url through the rate limiter, retrying transient failures.
+
+    Waits backoff * 2**attempt seconds (with jitter) between attempts.
+    Returns client.get()'s (status, body_text, response_headers).
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            return client.get(url, headers=headers)
+        except TransientFetchError:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.8, 1.2))
+
+
+# ---------------------------------------------------------------------------
+# Job journal
+# ---------------------------------------------------------------------------
+
+def job_key(provider, month, year):
+    return f"{provider}|{year}-{month:02d}"
+
+
+def journal_run_id(job_keys, settings):
+    """Identity of a run: hash of its job list and outcome-shaping arguments.
+
+    Args:
+        job_keys: job_key() of every provider-month in the run
+        settings: dict of the arguments that change what a job writes
+    """
+    return content_hash(json.dumps({"jobs": sorted(job_keys), "settings": settings},
+                                   sort_keys=True))[:16]
+
+
+def load_journal(path, run_id):
+    """Read the job journal.
+
+    Done jobs only count for a journal written by a run with run_id; one
+    without a header, or for a different job list or arguments, yields no
+    done jobs. Unsaved records are returned whatever the run: they hold
+    fetch state and changes that never reached .fetch_state.json or the
+    manifest.
+
+    Returns:
+        (done, unsaved): set of done job keys, and the records with a
+        "state" or "change" appended since the journal was last saved
+    """
+    done = set()
+    unsaved = []
+    if not os.path.isfile(path):
+        return done, unsaved
+    with open(path) as f:
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError:
+            header = {}
+        same_run = header.get("run") == run_id
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn final line from an interrupted write
+            if rec.get("status") == "saved":
+                unsaved = []
+            elif rec.get("status") == "done":
+                if same_run:
+                    done.add(rec["job"])
+                if "state" in rec or "change" in rec:
+                    unsaved.append(rec)
+    return done, unsaved
+
+
+def _write_journal_lines(f, records):
+    for rec in records:
+        f.write(json.dumps(rec) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def start_journal(path, run_id, unsaved=()):
+    """Replace the journal with one for run_id, keeping unsaved records."""
+    with open(path, "w") as f:
+        _write_journal_lines(f, [{"run": run_id}, *unsaved])
+
+
+def append_journal(path, job, status, detail="", state=None, change=None):
+    """Append one job outcome to the journal and flush it to disk.
+
+    Args:
+        state: the job's fetch-state entry (validators and hashes)
+        change: the job's change-manifest record, if its days changed
+    """
+    rec = {"job": job, "status": status, "detail": detail}
+    if state is not None:
+        rec["state"] = state
+    if change is not None:
+        rec["change"] = change
+    with open(path, "a") as f:
+        _write_journal_lines(f, [rec])
+
+
+def mark_journal_saved(path):
+    """Record that every entry so far is in .fetch_state.json and a manifest."""
+    with open(path, "a") as f:
+        _write_journal_lines(f, [{"status": "saved"}])
+
+
+# ---------------------------------------------------------------------------
+# Refresh state and change manifest
+# ---------------------------------------------------------------------------
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def days_hash(days):
+    """Hash of a parsed days list, independent of JSON formatting."""
+    return content_hash(json.dumps([[d["date"], d["status"]] for d in days]))
+
+
+def load_fetch_state(path):
+    """Per-page validators from earlier runs: job key -> {etag, last_modified,
+    page_hash, days_hash}."""
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def save_fetch_state(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def conditional_headers(page_state):
+    """If-None-Match / If-Modified-Since headers for a previously seen page."""
+    headers = {}
+    if page_state.get("etag"):
+        headers["If-None-Match"] = page_state["etag"]
+    if page_state.get("last_modified"):
+        headers["If-Modified-Since"] = page_state["last_modified"]
+    return headers
+
+
+def read_existing_days(filepath):
+    """Days list of an existing availability JSON, or None."""
+    if not os.path.isfile(filepath):
+        return None
+    try:
+        with open(filepath) as f:
+            return json.load(f).get("days")
+    except (json.JSONDecodeError, IOError):
+        return None
+
+
+def diff_days(old_days, new_days):
+    """Dates whose status differs between two days lists.
+
+    Returns:
+        [{"date", "old", "new"}] sorted by date; "old" is None for new dates.
+    """
+    old_map = {d["date"]: d["status"] for d in (old_days or [])}
+    changes = []
+    for d in new_days:
+        before = old_map.get(d["date"])
+        if before != d["status"]:
+            changes.append({"date": d["date"], "old": before, "new": d["status"]})
+    return changes
+
+
+def merge_changes(records):
+    """Collapse change records to one per file, oldest status to newest.
+
+    A file rewritten by an interrupted run and again by its rerun gets one
+    record whose dates run from the status before the first rewrite to the
+    status after the last.
+    """
+    merged = {}
+    for change in records:
+        prev = merged.get(change["file"])
+        if prev is None:
+            merged[change["file"]] = change
+            continue
+        dates = {d["date"]: dict(d) for d in prev["dates"]}
+        for d in change["dates"]:
+            if d["date"] in dates:
+                dates[d["date"]]["new"] = d["new"]
+            else:
+                dates[d["date"]] = dict(d)
+        merged[change["file"]] = {
+            **change,
+            "new_file": prev["new_file"],
+            "dates": [d for _, d in sorted(dates.items()) if d["old"] != d["new"]],
+        }
+    return sorted(merged.values(), key=lambda c: c["file"])
+
+
+def write_manifest(path, changes, counts):
+    """Write the change manifest for this run.
+
+    Args:
+        changes: [{"name", "month", "year", "file", "new_file", "dates"}]
+        counts: dict of outcome -> number of provider-months
+    """
+    manifest = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "providers_changed": sorted({c["name"] for c in changes}),
+        "counts": counts,
+        "changes": changes,
+    }
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return path
 
 
 # ---------------------------------------------------------------------------
@@ -393,12 +816,48 @@ Examples:
     )
     parser.add_argument(
         "--force", action="store_true",
-        help="Overwrite existing files (default: skip)",
+        help="Overwrite existing files and their store rows, even when the "
+             "days are unchanged (default: skip). Takes precedence over --refresh",
     )
     parser.add_argument(
         "--delay", type=float, default=REQUEST_DELAY,
         help=f"Seconds between requests (default: {REQUEST_DELAY})",
     )
+    parser.add_argument(
+        "--no-store", action="store_true",
+        help="Write JSON files only, not the consolidated availability store",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="Concurrent fetch connections (default: 1)",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=None,
+        help="Max requests per second across all connections "
+             "(default: 1/--delay)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=MAX_RETRIES,
+        help=f"Retries per page for transient errors (default: {MAX_RETRIES})",
+    )
+    parser.add_argument(
+        "--base-url", default=None,
+        help="Override the Amion base URL (e.g. a local stand-in server)",
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true",
+        help="Re-fetch jobs an interrupted run's journal marks done "
+             "(its unsaved changes still reach the manifest)",
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="Re-check existing files with conditional requests and rewrite "
+             "only provider-months whose days changed",
+    )
+    parser.add_argument(
+        "--manifest", default=None,
+        help=f"Change manifest path (default: <output-dir>/{MANIFEST_FILENAME})",
+    )
 
     args = parser.parse_args()
 
@@ -418,9 +877,40 @@ Examples:
 
     # Load Amion config
     amion_cfg = load_amion_config()
+    if args.base_url:
+        amion_cfg["base_url"] = args.base_url
 
     # Ensure output directory exists
     os.makedirs(args.output_dir, exist_ok=True)
+    store = None
+    if not args.dry_run and not args.no_store:
+        store = availability_store.open_store(
+            availability_store.store_path(args.output_dir))
+
+    journal_path = os.path.join(args.output_dir, JOURNAL_FILENAME)
+    run_id = journal_run_id(
+        [job_key(p, m, args.year) for p in providers for m in args.months], {
+            "force": args.force,
+            "refresh": args.refresh,
+            "store": not args.no_store,
+            "base_url": amion_cfg["base_url"],
+        })
+    journal_done = set()
+    unsaved = []
+    if not args.dry_run:
+        journal_done, unsaved = load_journal(journal_path, run_id)
+        # A refresh re-checks every page, so it never skips journaled jobs
+        if args.refresh or args.no_resume:
+            journal_done = set()
+        if not journal_done:
+            start_journal(journal_path, run_id, unsaved)
+    state_path = os.path.join(args.output_dir, STATE_FILENAME)
+    fetch_state = load_fetch_state(state_path)
+    # Validators an interrupted run journaled but never saved
+    for rec in unsaved:
+        if "state" in rec:
+            fetch_state[rec["job"]] = rec["state"]
+    manifest_path = args.manifest or os.path.join(args.output_dir, MANIFEST_FILENAME)
 
     # Summary
     total = len(providers) * len(args.months)
@@ -429,25 +919,34 @@ Examples:
     print(f"Year:       {args.year}")
     print(f"Output:     {args.output_dir}")
     print(f"Total jobs: {total}")
+    if journal_done:
+        print(f"Resuming:   {len(journal_done)} jobs already done per {JOURNAL_FILENAME}")
     if args.dry_run:
         print("MODE:       DRY RUN (no files will be written)\n")
     else:
         print()
 
-    # Process each provider × month
+    # Build the job list: provider × month
     success = 0
     skipped = 0
+    unchanged = 0
     errors = []
+    jobs = []
 
     for provider in providers:
-        print(f"  {provider}:")
         for month in sorted(args.months):
             filename = make_filename(provider, month, args.year)
             filepath = os.path.join(args.output_dir, filename)
-            label = f"    {month:02d}/{args.year}"
+            label = f"  {provider} {month:02d}/{args.year}"
 
-            # Skip if file exists and not forcing
-            if os.path.isfile(filepath) and not args.force:
+            # Skip if already fetched by an interrupted run of this job list
+            if job_key(provider, month, args.year) in journal_done:
+                print(f"{label}: SKIP (journal) — {filename}")
+                skipped += 1
+                continue
+
+            # Skip if file exists and not forcing or refreshing
+            if os.path.isfile(filepath) and not (args.force or args.refresh):
                 print(f"{label}: SKIP (exists) — {filename}")
                 skipped += 1
                 continue
@@ -459,41 +958,143 @@ Examples:
                 print(f"{label}: WOULD FETCH — {url}")
                 continue
 
-            # Fetch and parse
-            try:
-                html = fetch_page(url)
-                name, parsed_month, parsed_year, days = parse_availability(html)
-
-                # Sanity check
-                if parsed_month != month or parsed_year != args.year:
-                    raise ValueError(
-                        f"Page returned month={parsed_month}, year={parsed_year} "
-                        f"but expected month={month}, year={args.year}"
+            # Only a refresh of an existing file may be answered Not Modified;
+            # --force always rewrites, so it never asks
+            headers = {}
+            if args.refresh and not args.force and os.path.isfile(filepath):
+                headers = conditional_headers(
+                    fetch_state.get(job_key(provider, month, args.year), {}))
+
+            jobs.append((provider, month, filename, label, url, headers))
+
+    # Fetch and parse concurrently; write results from this thread only
+    rate = args.rate if args.rate is not None else (1.0 / args.delay if args.delay > 0 else 0)
+    limiter = TokenBucket(rate, burst=args.jobs)
+    client = AmionClient()
+
+    def fetch_job(job):
+        provider, month, _, _, url, headers = job
+        status, html, resp_headers = fetch_with_retry(
+            client, limiter, url, retries=args.retries, headers=headers)
+        page = {
+            "etag": resp_headers.get("ETag"),
+            "last_modified": resp_headers.get("Last-Modified"),
+        }
+        if status == 304:
+            return None, None, page
+
+        page["page_hash"] = content_hash(html)
+        name, parsed_month, parsed_year, days = parse_availability(html)
+
+        # Sanity check
+        if parsed_month != month or parsed_year != args.year:
+            raise ValueError(
+                f"Page returned month={parsed_month}, year={parsed_year} "
+                f"but expected month={month}, year={args.year}"
+            )
+        page["days_hash"] = days_hash(days)
+        return name, days, page
+
+    if jobs:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futures = {pool.submit(fetch_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                provider, month, filename, label, _, _ = futures[future]
+                key = job_key(provider, month, args.year)
+                try:
+                    name, days, page = future.result()
+
+                    if days is None:
+                        # 304 Not Modified: keep the stored hashes
+                        fetch_state[key] = {**fetch_state.get(key, {}), **{
+                            k: v for k, v in page.items() if v}}
+                        append_journal(journal_path, key, "done",
+                                       state=fetch_state[key])
+                        print(f"{label}: NOT MODIFIED — {filename}")
+                        unchanged += 1
+                        continue
+
+                    filepath = os.path.join(args.output_dir,
+                                            make_filename(name, month, args.year))
+                    old_days = read_existing_days(filepath)
+                    fetch_state[key] = page
+
+                    same_days = (old_days is not None
+                                 and days_hash(old_days) == page["days_hash"])
+                    # Only a refresh skips identical months; --force rewrites
+                    # the JSON and store rows regardless
+                    if same_days and args.refresh and not args.force:
+                        append_journal(journal_path, key, "done", state=page)
+                        print(f"{label}: UNCHANGED — {filename}")
+                        unchanged += 1
+                        continue
+
+                    # Write JSON
+                    written = write_availability_json(
+                        name, month, args.year, days, args.output_dir
                     )
-
-                # Write JSON
-                written = write_availability_json(
-                    name, month, args.year, days, args.output_dir
-                )
-                # Count statuses
-                avail = sum(1 for d in days if d["status"] == "available")
-                unavail = sum(1 for d in days if d["status"] == "unavailable")
-                blank = sum(1 for d in days if d["status"] == "blank")
-                print(f"{label}: OK ({avail}a/{unavail}u/{blank}b) — {filename}")
-                success += 1
-
-            except Exception as e:
-                print(f"{label}: ERROR — {e}")
-                errors.append((provider, month, str(e)))
-
-            # Rate limit
-            time.sleep(args.delay)
-
-        print()
+                    if store is not None:
+                        availability_store.upsert_month(
+                            store, name, month, args.year, days,
+                            source=os.path.basename(written)
+                        )
+                    # Done only once the JSON and store rows are both on disk;
+                    # a rewrite with identical days is not a change
+                    change = None
+                    if not same_days:
+                        change = {
+                            "name": name,
+                            "month": month,
+                            "year": args.year,
+                            "file": os.path.basename(filepath),
+                            "new_file": old_days is None,
+                            "dates": diff_days(old_days, days),
+                        }
+                    append_journal(journal_path, key, "done", state=page, change=change)
+
+                    # Count statuses
+                    avail = sum(1 for d in days if d["status"] == "available")
+                    unavail = sum(1 for d in days if d["status"] == "unavailable")
+                    blank = sum(1 for d in days if d["status"] == "blank")
+                    print(f"{label}: OK ({avail}a/{unavail}u/{blank}b) — {filename}")
+                    success += 1
+
+                except Exception as e:
+                    print(f"{label}: ERROR — {e}")
+                    append_journal(journal_path, key, "error", str(e))
+                    errors.append((provider, month, str(e)))
+
+    if store is not None:
+        store.close()
+
+    changes = []
+    if not args.dry_run:
+        # State and manifest come from the journal, which also holds the
+        # unsaved records of any interrupted run before this one
+        _, unsaved = load_journal(journal_path, run_id)
+        for rec in unsaved:
+            if "state" in rec:
+                fetch_state[rec["job"]] = rec["state"]
+        changes = merge_changes(rec["change"] for rec in unsaved if "change" in rec)
+        save_fetch_state(state_path, fetch_state)
+        write_manifest(manifest_path, changes, {
+            "written": success,
+            "unchanged": unchanged,
+            "skipped": skipped,
+            "errors": len(errors),
+        })
+        # A clean finish leaves nothing to resume
+        if not errors:
+            os.remove(journal_path)
+        else:
+            mark_journal_saved(journal_path)
 
     # Summary
     print(f"{'='*50}")
-    print(f"Done. Success: {success}, Skipped: {skipped}, Errors: {len(errors)}")
+    print(f"Done. Success: {success}, Unchanged: {unchanged}, "
+          f"Skipped: {skipped}, Errors: {len(errors)}")
+    if not args.dry_run:
+        print(f"Changes:  {len(changes)} provider-months -> {manifest_path}")
     if errors:
         print(f"\nErrors:")
         for provider, month, msg in errors:
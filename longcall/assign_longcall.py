@@ -5,13 +5,15 @@ Reads parsed schedule data and assigns long call shifts according to rules
 defined in longcall_rules.md.
 """
 
-import copy
 import hashlib
 import json
+import multiprocessing
 import os
 import random
+import sys
 import uuid
-import networkx as nx
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from collections import defaultdict
 
@@ -22,6 +24,9 @@ from collections import defaultdict
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 CONFIG_FILE = os.path.join(PROJECT_ROOT, "config.json")
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from schedule_store import load_schedule_file
 
 # Load config from config.json (contains PII like excluded provider names)
 def _load_config():
@@ -56,8 +61,12 @@ DIRECT_CARE_SERVICES = _lc_config.get("direct_care_services", [
 
 ALL_SOURCE_SERVICES = TEACHING_SERVICES + DIRECT_CARE_SERVICES
 
+# Worker processes for the Phase 3 retry attempts (1 = run them in turn)
+PHASE3_JOBS = _lc_config.get("phase3_jobs", 1)
+
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
 INPUT_FILE = os.path.join(OUTPUT_DIR, "all_months_schedule.json")
+STORE_FILE = os.path.join(OUTPUT_DIR, "all_months_schedule.bin")
 
 # Seed for reproducibility
 random.seed(42)
@@ -68,7 +77,15 @@ random.seed(42)
 # ============================================================
 
 def load_schedule():
-    """Load the parsed schedule JSON."""
+    """Load the parsed schedule.
+
+    Reads only the block's days from the compact row store written by
+    parse_schedule.py, unless the JSON is newer (or the store is missing).
+    """
+    if os.path.exists(STORE_FILE) and (
+            not os.path.exists(INPUT_FILE)
+            or os.path.getmtime(STORE_FILE) >= os.path.getmtime(INPUT_FILE)):
+        return load_schedule_file(STORE_FILE, BLOCK_START.date(), BLOCK_END.date())
     with open(INPUT_FILE, 'r') as f:
         return json.load(f)
 
@@ -127,10 +144,45 @@ def tiebreak_hash(provider, context=""):
 # STEP 1: BUILD DAILY PROVIDER DATA
 # ============================================================
 
+class DailyData(dict):
+    """
+    date -> list of {provider, service, category, moonlighting}, as returned
+    by build_daily_data(), plus per-provider lookups built once from it:
+
+      records:         (provider, date) -> the provider's first record that day
+      moonlighting:    set of (provider, date) with a moonlighting record
+      weekends:        provider -> Saturdays of the weekends worked
+      worked_weekends: same, leaving out moonlighting days
+      stretches:       identify_stretches() result (a StretchMap)
+
+    The lookups are not kept in sync, so treat it as read-only.
+    """
+
+    def __init__(self, daily):
+        super().__init__(daily)
+        self.records = {}
+        self.moonlighting = set()
+        self.weekends = {}
+        self.worked_weekends = {}
+        for dt, providers in self.items():
+            saturday = dt - timedelta(days=dt.weekday() - 5) if is_weekend(dt) else None
+            for p in providers:
+                key = (p["provider"], dt)
+                self.records.setdefault(key, p)
+                if p["moonlighting"]:
+                    self.moonlighting.add(key)
+                if saturday is not None:
+                    self.weekends.setdefault(p["provider"], set()).add(saturday)
+                    if not p["moonlighting"]:
+                        self.worked_weekends.setdefault(p["provider"], set()).add(saturday)
+        self.stretches = StretchMap(_find_stretches(self), self)
+
+
 def build_daily_data(schedule_data):
     """
     Build a dict: date -> list of {provider, service, category, moonlighting}
     Only includes providers on source services within the block.
+    Returns a DailyData, so the per-provider lookups come with it.
     """
     daily = {}
 
@@ -165,7 +217,7 @@ def build_daily_data(schedule_data):
 
         daily[dt] = providers_today
 
-    return daily
+    return DailyData(daily)
 
 
 def build_all_daily_data(schedule_data):
@@ -216,14 +268,70 @@ def build_all_daily_data(schedule_data):
 # STEP 2: IDENTIFY WORK STRETCHES
 # ============================================================
 
+class StretchMap(dict):
+    """
+    provider -> list of stretches, as returned by identify_stretches(), plus:
+
+      stretch_ids: (provider, date) -> index of the stretch holding that date
+      info:        provider -> per-stretch metadata, parallel to the stretches:
+                   {standalone, mixed, moonlighting, category, holidays,
+                    real_weeks, weeks: [{dates, moonlighting, category}]}
+                   where weeks is split_stretch_into_weeks() of the stretch,
+                   category is the provider's category on the first day,
+                   holidays the set of holiday dates, and real_weeks the
+                   number of weeks that are neither moonlighting nor a
+                   weekend of 2 days or less
+    """
+
+    def __init__(self, stretches, daily_data):
+        super().__init__(stretches)
+        self.stretch_ids = {}
+        self.info = {}
+        for provider, pstretches in self.items():
+            infos = []
+            for i, stretch in enumerate(pstretches):
+                for dt in stretch:
+                    self.stretch_ids[(provider, dt)] = i
+                weeks = [{
+                    "dates": week,
+                    "moonlighting": is_moonlighting_in_stretch(provider, week, daily_data),
+                    "category": get_provider_category(provider, week[0], daily_data),
+                } for week in split_stretch_into_weeks(stretch)]
+                infos.append({
+                    "standalone": is_standalone_weekend(stretch),
+                    "mixed": stretch_has_weekday_and_weekend(stretch),
+                    "moonlighting": is_moonlighting_in_stretch(provider, stretch, daily_data),
+                    "category": get_provider_category(provider, stretch[0], daily_data),
+                    "holidays": {d for d in stretch if is_holiday(d)},
+                    "real_weeks": sum(
+                        1 for w in weeks
+                        if not w["moonlighting"]
+                        and not (all(is_weekend_or_holiday(d) for d in w["dates"])
+                                 and len(w["dates"]) <= 2)),
+                    "weeks": weeks,
+                })
+            self.info[provider] = infos
+
+    def stretch_info(self, provider, stretch):
+        """Metadata dict for one of the provider's stretches."""
+        return self.info[provider][self.stretch_ids[(provider, stretch[0])]]
+
+
 def identify_stretches(daily_data):
     """
     For each provider, identify their consecutive work stretches on
     SOURCE services only. Non-source services are invisible.
 
-    Returns: dict of provider -> list of stretches
+    Returns: dict of provider -> list of stretches (a StretchMap)
     Each stretch is a list of dates (sorted).
     """
+    if isinstance(daily_data, DailyData):
+        return daily_data.stretches
+    return StretchMap(_find_stretches(daily_data), daily_data)
+
+
+def _find_stretches(daily_data):
+    """provider -> list of consecutive source-service date lists."""
     # Collect all dates each provider works on source services
     provider_dates = defaultdict(set)
     for dt, providers in daily_data.items():
@@ -326,6 +434,8 @@ def split_stretch_into_weeks(stretch):
 
 def is_moonlighting_in_stretch(provider, stretch, daily_data):
     """Check if a provider is moonlighting on any day in their stretch."""
+    if isinstance(daily_data, DailyData):
+        return any((provider, dt) in daily_data.moonlighting for dt in stretch)
     for dt in stretch:
         if dt in daily_data:
             for p in daily_data[dt]:
@@ -342,6 +452,9 @@ def count_weekends_in_block(provider, daily_data, exclude_moonlighting=True):
     """Count total weekends (Sat-Sun pairs) a provider works in the block.
     A weekend counts as 1 if the provider works on Saturday, Sunday, or both
     of the same weekend. Excludes weekends where the provider is moonlighting."""
+    if isinstance(daily_data, DailyData):
+        weekends = daily_data.worked_weekends if exclude_moonlighting else daily_data.weekends
+        return len(weekends.get(provider, ()))
     weekend_saturdays = set()
     for dt, providers in daily_data.items():
         if not is_weekend(dt):
@@ -364,6 +477,9 @@ def count_weekends_in_block(provider, daily_data, exclude_moonlighting=True):
 
 def get_provider_category(provider, dt, daily_data):
     """Get whether provider is on teaching or direct_care on a given day."""
+    if isinstance(daily_data, DailyData):
+        record = daily_data.records.get((provider, dt))
+        return record["category"] if record else None
     if dt in daily_data:
         for p in daily_data[dt]:
             if p["provider"] == provider:
@@ -380,6 +496,9 @@ def find_provider_stretch_for_date(provider, dt, all_stretches):
     Find the stretch (list of dates) that contains dt for a given provider.
     Returns the stretch (list of dates) or None.
     """
+    if isinstance(all_stretches, StretchMap):
+        i = all_stretches.stretch_ids.get((provider, dt))
+        return all_stretches[provider][i] if i is not None else None
     stretches = all_stretches.get(provider, [])
     for stretch in stretches:
         if dt in stretch:
@@ -387,6 +506,34 @@ def find_provider_stretch_for_date(provider, dt, all_stretches):
     return None
 
 
+def index_lc_dates(assignments, all_stretches):
+    """
+    Index long calls by stretch: (provider, stretch id) -> {date: number of
+    LC slots the provider holds that day}, for an identify_stretches() result.
+    Only dates inside one of the provider's stretches are indexed.
+    """
+    lc_dates = {}
+    for dt, slots in assignments.items():
+        for provider in slots.values():
+            _index_slot(lc_dates, all_stretches, provider, dt, 1)
+    return lc_dates
+
+
+def _index_slot(lc_dates, all_stretches, provider, dt, delta):
+    """Add delta LC slots on dt to the provider's entry in lc_dates."""
+    if provider is None:
+        return
+    sid = all_stretches.stretch_ids.get((provider, dt))
+    if sid is None:
+        return
+    held = lc_dates.setdefault((provider, sid), {})
+    count = held.get(dt, 0) + delta
+    if count:
+        held[dt] = count
+    else:
+        del held[dt]
+
+
 def stretch_has_weekday_and_weekend(stretch):
     """
     Check if a stretch contains both weekday and weekend/holiday days.
@@ -398,6 +545,90 @@ def stretch_has_weekday_and_weekend(stretch):
     return has_weekday and has_weekend
 
 
+# ============================================================
+# WEEKEND MATCHING
+# ============================================================
+
+def min_cost_matching(cost):
+    """
+    Minimum-cost matching on a dense cost matrix (np.inf = pair not allowed),
+    with any number of rows and columns.
+
+    When every row or every column (whichever side is smaller) can be
+    matched, returns the cheapest such matching, the same optimum as
+    scipy.optimize.linear_sum_assignment. Otherwise returns a maximum
+    matching, the cheapest among the maximum ones.
+
+    Returns: list of (row, col) pairs
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.shape[0] > cost.shape[1]:
+        return [(r, c) for c, r in min_cost_matching(cost.T)]
+    if cost.size == 0:
+        return []
+    col4row = _shortest_augmenting_paths(cost)
+    if col4row is not None:
+        return list(enumerate(col4row))
+    # No full matching: give the missing pairs a cost above any set of real
+    # ones, so as few as possible get used, and drop them afterwards
+    allowed = np.isfinite(cost)
+    big = np.abs(cost[allowed]).sum() + 1 if allowed.any() else 1.0
+    col4row = _shortest_augmenting_paths(np.where(allowed, cost, big))
+    return [(r, c) for r, c in enumerate(col4row) if allowed[r, c]]
+
+
+def _shortest_augmenting_paths(cost):
+    """
+    Rectangular assignment (rows <= columns) by successive shortest
+    augmenting paths with row/column potentials (Jonker-Volgenant style).
+
+    Returns: list of the column matched to each row, or None when some row
+    cannot be matched
+    """
+    n, m = cost.shape
+    u = np.zeros(n)
+    v = np.zeros(m)
+    col4row = np.full(n, -1)
+    row4col = np.full(m, -1)
+    for cur_row in range(n):
+        shortest = np.full(m, np.inf)
+        path = np.full(m, -1)
+        in_tree_rows = np.zeros(n, dtype=bool)
+        in_tree_cols = np.zeros(m, dtype=bool)
+        min_val = 0.0
+        i = cur_row
+        sink = -1
+        while sink < 0:
+            in_tree_rows[i] = True
+            reduced = min_val + cost[i] - u[i] - v
+            better = ~in_tree_cols & (reduced < shortest)
+            path[better] = i
+            shortest[better] = reduced[better]
+            j = int(np.argmin(np.where(in_tree_cols, np.inf, shortest)))
+            if in_tree_cols[j] or not np.isfinite(shortest[j]):
+                return None
+            min_val = shortest[j]
+            in_tree_cols[j] = True
+            if row4col[j] < 0:
+                sink = j
+            else:
+                i = row4col[j]
+        # Update the potentials, then flip the path
+        u[cur_row] += min_val
+        tree = in_tree_rows.copy()
+        tree[cur_row] = False
+        u[tree] += min_val - shortest[col4row[tree]]
+        v[in_tree_cols] -= min_val - shortest[in_tree_cols]
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur_row:
+                break
+    return [int(c) for c in col4row]
+
+
 # ============================================================
 # SCORING FUNCTIONS
 # ============================================================
@@ -459,7 +690,7 @@ def find_best_assignment(provider, eligible_dates, daily_data, assignments,
 
 def find_double_filler(dt, slot, daily_data, assignments, daily_slots,
                        pstate, weekends_worked, all_stretches,
-                       provider_wknd_lc_stretches):
+                       provider_wknd_lc_stretches, lc_dates=None):
     """
     Find a provider to take a double long call to fill an empty slot.
 
@@ -474,9 +705,14 @@ def find_double_filler(dt, slot, daily_data, assignments, daily_slots,
     1. has_empty_week: prefer providers who have at least one week with no LC
     2. split_tier: prefer weekday+weekend splits (0) over no-split (1) over same-type (2)
     3. score: fairness score (missed priority, double penalty, total LCs)
+
+    all_stretches is the identify_stretches() result; lc_dates the matching
+    index_lc_dates() index of assignments (built here when not given).
     """
     if dt not in daily_data:
         return None
+    if lc_dates is None:
+        lc_dates = index_lc_dates(assignments, all_stretches)
 
     is_wknd = is_weekend_or_holiday(dt)
 
@@ -501,25 +737,20 @@ def find_double_filler(dt, slot, daily_data, assignments, daily_slots,
             continue
 
         # Provider must be in a stretch
-        stretch = find_provider_stretch_for_date(provider, dt, all_stretches)
-        if stretch is None:
+        sid = all_stretches.stretch_ids.get((provider, dt))
+        if sid is None:
             continue
+        provider_infos = all_stretches.info[provider]
+        info = provider_infos[sid]
 
-        is_mixed_stretch = stretch_has_weekday_and_weekend(stretch)
+        is_mixed_stretch = info["mixed"]
 
-        # Check existing LCs in this same stretch
-        existing_lc_dates = []
-        for s_dt in stretch:
-            for s_slot in ["teaching", "dc1", "dc2"]:
-                if assignments.get(s_dt, {}).get(s_slot) == provider:
-                    existing_lc_dates.append(s_dt)
+        # Check existing LCs in this same stretch (one entry per slot held)
+        held = lc_dates.get((provider, sid), {})
+        existing_lc_dates = [d for d in sorted(held) for _ in range(held[d])]
 
         # For multi-week stretches, don't give more LCs than weeks
-        stretch_weeks = split_stretch_into_weeks(stretch)
-        real_weeks = [w for w in stretch_weeks
-                      if not is_moonlighting_in_stretch(provider, w, daily_data)
-                      and not (all(is_weekend_or_holiday(d) for d in w) and len(w) <= 2)]
-        num_weeks = len(real_weeks)
+        num_weeks = info["real_weeks"]
         if num_weeks >= 2 and len(existing_lc_dates) >= num_weeks:
             continue
         # Never exceed 2 LCs total per stretch
@@ -527,7 +758,7 @@ def find_double_filler(dt, slot, daily_data, assignments, daily_slots,
             continue
 
         # RULE: No double if stretch already has a holiday LC
-        if any(is_holiday(d) for d in existing_lc_dates):
+        if any(d in info["holidays"] for d in existing_lc_dates):
             continue
         if is_holiday(dt) and existing_lc_dates:
             continue
@@ -569,9 +800,8 @@ def find_double_filler(dt, slot, daily_data, assignments, daily_slots,
             continue
 
         # Count eligible stretches (non-standalone-weekend)
-        provider_stretches = all_stretches.get(provider, [])
-        eligible_stretches = [st for st in provider_stretches
-                              if not is_standalone_weekend(st)]
+        eligible_stretches = [(i, st) for i, st in enumerate(provider_infos)
+                              if not st["standalone"]]
 
         # RULE: doubles should be offset by a no-LC stretch.
         # After adding this double the provider's total LCs should leave
@@ -581,17 +811,11 @@ def find_double_filler(dt, slot, daily_data, assignments, daily_slots,
         can_offset = 0 if total_after_double <= len(eligible_stretches) - 1 else 1
 
         # Check whether provider currently has an empty-stretch week
-        all_lc_dates = set()
-        for st in provider_stretches:
-            for st_dt in st:
-                for st_slot in ["teaching", "dc1", "dc2"]:
-                    if assignments.get(st_dt, {}).get(st_slot) == provider:
-                        all_lc_dates.add(st_dt)
         found_empty_week = False
-        for st in eligible_stretches:
-            weeks = split_stretch_into_weeks(st)
-            for week in weeks:
-                if not any(wd in all_lc_dates for wd in week):
+        for i, st in eligible_stretches:
+            st_held = lc_dates.get((provider, i), {})
+            for week in st["weeks"]:
+                if not any(wd in st_held for wd in week["dates"]):
                     found_empty_week = True
                     break
             if found_empty_week:
@@ -621,11 +845,65 @@ def find_double_filler(dt, slot, daily_data, assignments, daily_slots,
     return candidates[0][5]
 
 
+# ============================================================
+# PARALLEL PHASE 3 ATTEMPTS
+# ============================================================
+
+_phase3_attempt_fn = None  # set while forked Phase 3 workers run
+
+
+def can_fork_workers():
+    """Whether Phase 3 attempts can run in forked worker processes."""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _phase3_worker(attempt):
+    return _phase3_attempt_fn(attempt)
+
+
+def run_attempts_parallel(run_attempt, attempts, jobs):
+    """
+    Run Phase 3 retry attempts in a pool of forked worker processes.
+
+    The workers are forked from the calling process, so they start from its
+    pre-Phase-3 state as a shared read-only snapshot and run_attempt (a
+    closure over that state, returning {"violations": ...}) needn't be
+    picklable. Once an attempt has zero violations, the attempts after it
+    that haven't started are cancelled.
+
+    Returns: dict attempt -> result, for every attempt up to the first one
+    with zero violations (all of them if none has)
+    """
+    global _phase3_attempt_fn
+    _phase3_attempt_fn = run_attempt
+    results = {}
+    first_zero = None
+    try:
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 mp_context=multiprocessing.get_context("fork")) as pool:
+            futures = {pool.submit(_phase3_worker, a): a for a in attempts}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                attempt = futures[future]
+                results[attempt] = future.result()
+                if results[attempt]["violations"] == 0 and (
+                        first_zero is None or attempt < first_zero):
+                    first_zero = attempt
+                    # Attempts already running finish (and are dropped below)
+                    for pending, a in futures.items():
+                        if a > attempt:
+                            pending.cancel()
+    finally:
+        _phase3_attempt_fn = None
+    return {a: r for a, r in results.items() if first_zero is None or a <= first_zero}
+
+
 # ============================================================
 # MAIN ASSIGNMENT ENGINE
 # ============================================================
 
-def assign_long_calls(daily_data, all_daily_data=None):
+def assign_long_calls(daily_data, all_daily_data=None, jobs=None):
     """
     Main assignment engine. Returns:
     - assignments: dict date -> {teaching: provider, dc1: provider, dc2: provider}
@@ -634,12 +912,19 @@ def assign_long_calls(daily_data, all_daily_data=None):
 
     all_daily_data: kept for compatibility (used by report for display only).
     Stretches are always based on source-service days only.
+
+    jobs: worker processes for the Phase 3 retry attempts (default
+    PHASE3_JOBS). The result is the same as running them in turn.
     """
+    if jobs is None:
+        jobs = PHASE3_JOBS
 
     # --------------------------------------------------------
     # PHASE 0: Data Preparation
     # --------------------------------------------------------
 
+    if not isinstance(daily_data, DailyData):
+        daily_data = DailyData(daily_data)
     all_stretches = identify_stretches(daily_data)
 
     # Build assignment needs: one per provider per weekday-work-week
@@ -647,38 +932,37 @@ def assign_long_calls(daily_data, all_daily_data=None):
     for provider, stretches in all_stretches.items():
         if provider in EXCLUDED_PROVIDERS:
             continue
-        for stretch in stretches:
-            standalone_wknd = is_standalone_weekend(stretch)
-            if standalone_wknd:
-                if is_moonlighting_in_stretch(provider, stretch, daily_data):
+        for stretch, info in zip(stretches, all_stretches.info[provider]):
+            if info["standalone"]:
+                if info["moonlighting"]:
                     continue
                 assignment_needs.append({
                     "provider": provider,
                     "week_dates": stretch,
                     "standalone_weekend": True,
+                    "category": info["category"],
                 })
             else:
-                weeks = split_stretch_into_weeks(stretch)
-                for week in weeks:
-                    if is_moonlighting_in_stretch(provider, week, daily_data):
+                for week in info["weeks"]:
+                    if week["moonlighting"]:
                         continue
                     assignment_needs.append({
                         "provider": provider,
-                        "week_dates": week,
+                        "week_dates": week["dates"],
                         "standalone_weekend": False,
+                        "category": week["category"],
                     })
 
     # Total non-moonlighting weeks per provider (standalone weekends don't count)
     provider_total_weeks = defaultdict(int)
-    for provider, stretches in all_stretches.items():
+    for provider, infos in all_stretches.info.items():
         if provider in EXCLUDED_PROVIDERS:
             continue
-        for stretch in stretches:
-            if is_standalone_weekend(stretch):
+        for info in infos:
+            if info["standalone"]:
                 continue
-            weeks = split_stretch_into_weeks(stretch)
-            for week in weeks:
-                if not is_moonlighting_in_stretch(provider, week, daily_data):
+            for week in info["weeks"]:
+                if not week["moonlighting"]:
                     provider_total_weeks[provider] += 1
 
     # Initialize assignments
@@ -687,6 +971,21 @@ def assign_long_calls(daily_data, all_daily_data=None):
     for dt in all_dates:
         assignments[dt] = {"teaching": None, "dc1": None, "dc2": None}
 
+    # Live LC index by stretch (see index_lc_dates); every write to
+    # assignments goes through _set_slot() so it stays in step.
+    lc_dates = {}
+    # (dt, slot, old, new) writes of the running Phase 3 attempt, if any
+    journal = None
+
+    def _set_slot(dt, slot, provider):
+        """Set assignments[dt][slot] and update lc_dates (and the journal)."""
+        old = assignments[dt][slot]
+        if journal is not None:
+            journal.append((dt, slot, old, provider))
+        _index_slot(lc_dates, all_stretches, old, dt, -1)
+        assignments[dt][slot] = provider
+        _index_slot(lc_dates, all_stretches, provider, dt, 1)
+
     # Consolidated provider state
     pstate = defaultdict(lambda: {
         "lc_count": 0,
@@ -701,6 +1000,11 @@ def assign_long_calls(daily_data, all_daily_data=None):
         "wknd_lc_stretches": set(),
     })
 
+    def _copy_pstate(ps):
+        """Copy of one provider's pstate entry."""
+        return dict(ps, day_of_week=list(ps["day_of_week"]),
+                    wknd_lc_stretches=set(ps["wknd_lc_stretches"]))
+
     flags = []
 
     # Pre-compute weekends worked
@@ -740,10 +1044,8 @@ def assign_long_calls(daily_data, all_daily_data=None):
         if provider in EXCLUDED_PROVIDERS:
             continue
         needed_wknd_dates = set()
-        for stretch in pstretches:
-            if is_standalone_weekend(stretch):
-                continue
-            if is_moonlighting_in_stretch(provider, stretch, daily_data):
+        for stretch, info in zip(pstretches, all_stretches.info[provider]):
+            if info["standalone"] or info["moonlighting"]:
                 continue
             has_weekday = any(not is_weekend_or_holiday(d) for d in stretch)
             has_weekend = any(is_weekend_or_holiday(d) for d in stretch)
@@ -766,17 +1068,17 @@ def assign_long_calls(daily_data, all_daily_data=None):
                     old = provider_need_urgency.get((provider, d), 0)
                     provider_need_urgency[(provider, d)] = max(old, weekday_count)
 
-    def build_weighted_weekend_graph(min_weekends):
-        """Build weighted bipartite graph for weekend matching."""
-        G = nx.Graph()
-        s_nodes = set()
-        for dt in weekend_dates:
-            for slot in daily_slots[dt]:
-                slot_id = f"slot_{dt.strftime('%Y%m%d')}_{slot}"
-                s_nodes.add(slot_id)
-                G.add_node(slot_id, bipartite=0)
-
-        p_nodes = set()
+    def build_weekend_costs():
+        """
+        Dense cost matrix for the weekend matching: a row per weekend slot,
+        a column per provider with a weekend worked (np.inf where the
+        provider can't take the slot).
+        Returns (cost, slot_rows, providers), slot_rows as (date, slot).
+        """
+        slot_rows = [(dt, slot) for dt in weekend_dates for slot in daily_slots[dt]]
+        row_of = {key: r for r, key in enumerate(slot_rows)}
+        col_of = {}
+        entries = []
         for dt in weekend_dates:
             if dt not in daily_data:
                 continue
@@ -784,12 +1086,9 @@ def assign_long_calls(daily_data, all_daily_data=None):
                 provider = p["provider"]
                 if provider in EXCLUDED_PROVIDERS or p["moonlighting"]:
                     continue
-                if weekends_worked.get(provider, 0) < min_weekends:
+                if weekends_worked.get(provider, 0) < 1:
                     continue
-                pnode = f"prov_{provider}"
-                if pnode not in p_nodes:
-                    G.add_node(pnode, bipartite=1)
-                    p_nodes.add(pnode)
+                col = col_of.setdefault(provider, len(col_of))
 
                 needs_slot = provider in provider_needs_weekend_slot
                 needs_this_date = needs_slot and dt in provider_needs_weekend_slot[provider]
@@ -797,7 +1096,6 @@ def assign_long_calls(daily_data, all_daily_data=None):
                 for slot in daily_slots[dt]:
                     if slot == "teaching" and p["category"] == "direct_care":
                         continue
-                    slot_id = f"slot_{dt.strftime('%Y%m%d')}_{slot}"
 
                     cat_match = (
                         (slot == "teaching" and p["category"] == "teaching") or
@@ -813,47 +1111,31 @@ def assign_long_calls(daily_data, all_daily_data=None):
                         weight = 50 if cat_match else 60
 
                     weight += tiebreak_hash(provider, f"wknd_{dt.strftime('%Y%m%d')}_{slot}") * 0.9
-                    G.add_edge(pnode, slot_id, weight=weight)
-        return G, s_nodes
+                    entries.append((row_of[(dt, slot)], col, weight))
 
-    # Run weighted matching
-    G, slot_nodes = build_weighted_weekend_graph(MIN_WEEKENDS_FOR_WKND_LC)
-    try:
-        raw_matching = nx.bipartite.minimum_weight_full_matching(G, top_nodes=slot_nodes)
-    except (ValueError, nx.NetworkXError):
-        raw_matching = nx.bipartite.maximum_matching(G, top_nodes=slot_nodes)
+        cost = np.full((len(slot_rows), len(col_of)), np.inf)
+        for r, c, weight in entries:
+            cost[r, c] = weight  # a later record the same day wins
+        return cost, slot_rows, list(col_of)
+
+    # Run weighted matching, among providers with enough weekends first
+    weekend_cost, weekend_slot_rows, weekend_providers = build_weekend_costs()
+    regular_cols = [c for c, provider in enumerate(weekend_providers)
+                    if weekends_worked.get(provider, 0) >= MIN_WEEKENDS_FOR_WKND_LC]
     matched_slots = {}
-    for k, v in raw_matching.items():
-        if k in slot_nodes:
-            matched_slots[k] = v
-
-    # Check coverage and fall back if needed
-    all_slot_nodes = set()
-    for dt in weekend_dates:
-        for slot in daily_slots[dt]:
-            all_slot_nodes.add(f"slot_{dt.strftime('%Y%m%d')}_{slot}")
-
-    if len(matched_slots) < len(all_slot_nodes):
-        G_full, slot_nodes_full = build_weighted_weekend_graph(1)
-        try:
-            raw_matching_full = nx.bipartite.minimum_weight_full_matching(
-                G_full, top_nodes=slot_nodes_full)
-        except (ValueError, nx.NetworkXError):
-            raw_matching_full = nx.bipartite.maximum_matching(
-                G_full, top_nodes=slot_nodes_full)
-        for k, v in raw_matching_full.items():
-            if k in slot_nodes_full and k not in matched_slots:
-                matched_slots[k] = v
+    for r, c in min_cost_matching(weekend_cost[:, regular_cols]):
+        matched_slots[r] = weekend_providers[regular_cols[c]]
+
+    # Check coverage and fall back if needed: same matrix, every provider
+    if len(matched_slots) < len(weekend_slot_rows):
+        for r, c in min_cost_matching(weekend_cost):
+            if r not in matched_slots:
+                matched_slots[r] = weekend_providers[c]
 
     # Convert to advisory suggestions
     weekend_suggestions = {}
-    for slot_id, prov_id in matched_slots.items():
-        parts = slot_id.split("_")
-        date_str = parts[1]
-        slot = parts[2]
-        provider = prov_id.replace("prov_", "")
-        dt = datetime.strptime(date_str, "%Y%m%d")
-        weekend_suggestions[(dt, slot)] = provider
+    for r, provider in matched_slots.items():
+        weekend_suggestions[weekend_slot_rows[r]] = provider
 
     # --------------------------------------------------------
     # PHASE 2: Sliding Window Loop (W1 + WE + W2)
@@ -949,12 +1231,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
                 need_id = (prov, need["week_dates"][0])
                 if need_id in fulfilled_needs:
                     continue
-                cat = None
-                for d in need["week_dates"]:
-                    cat = get_provider_category(prov, d, daily_data)
-                    if cat:
-                        break
-                if cat == "teaching":
+                if need["category"] == "teaching":
                     w1_teaching_available.add(prov)
 
         teaching_consumed_by_weekend = set()
@@ -1027,7 +1304,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
                 if best_provider in w1_teaching_available:
                     teaching_consumed_by_weekend.add(best_provider)
 
-                assignments[we_dt][slot] = best_provider
+                _set_slot(we_dt, slot, best_provider)
                 _assign_slot(best_provider, we_dt, slot)
                 weekend_pre_assigned.add((we_dt, slot))
 
@@ -1062,12 +1339,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
                     continue
                 if provider in served_this_window or provider in served_from_prev_window:
                     continue
-                cat = None
-                for dt in need["week_dates"]:
-                    cat = get_provider_category(provider, dt, daily_data)
-                    if cat:
-                        break
-                if cat == "teaching":
+                if need["category"] == "teaching":
                     w1_teaching_needs.append(need)
 
             week_ctx = f"{w1_week_key[0]}-W{w1_week_key[1]}"
@@ -1092,7 +1364,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
 
                 if best:
                     dt, slot_assigned = best
-                    assignments[dt][slot_assigned] = provider
+                    _set_slot(dt, slot_assigned, provider)
                     _assign_slot(provider, dt, slot_assigned)
                     served_this_window.add(provider)
                     need_id = (provider, need["week_dates"][0])
@@ -1111,12 +1383,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
                     continue
                 if provider in served_this_window or provider in served_from_prev_window:
                     continue
-                cat = None
-                for dt in need["week_dates"]:
-                    cat = get_provider_category(provider, dt, daily_data)
-                    if cat:
-                        break
-                if cat != "teaching":
+                if need["category"] != "teaching":
                     w1_dc_needs.append(need)
 
             # Also add teaching providers who weren't assigned in Step B
@@ -1129,12 +1396,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
                     continue
                 if provider in served_this_window or provider in served_from_prev_window:
                     continue
-                cat = None
-                for dt in need["week_dates"]:
-                    cat = get_provider_category(provider, dt, daily_data)
-                    if cat:
-                        break
-                if cat == "teaching" and need not in w1_dc_needs:
+                if need["category"] == "teaching" and need not in w1_dc_needs:
                     w1_dc_needs.append(need)
 
             w1_dc_needs.sort(key=sort_key_fn)
@@ -1158,7 +1420,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
 
                 if best:
                     dt, slot_assigned = best
-                    assignments[dt][slot_assigned] = provider
+                    _set_slot(dt, slot_assigned, provider)
                     _assign_slot(provider, dt, slot_assigned)
                     served_this_window.add(provider)
                     fulfilled_needs.add(need_id)
@@ -1218,17 +1480,14 @@ def assign_long_calls(daily_data, all_daily_data=None):
         )
         if best:
             dt, slot = best
-            assignments[dt][slot] = provider
+            _set_slot(dt, slot, provider)
             _assign_slot(provider, dt, slot)
             continue
 
         # Second try: swap out the provider with the most long calls
         best_swap = None
         for dt in eligible_dates:
-            if dt not in daily_data:
-                continue
-            working_today = any(p["provider"] == provider for p in daily_data[dt])
-            if not working_today:
+            if (provider, dt) not in daily_data.records:
                 continue
             provider_cat = get_provider_category(provider, dt, daily_data)
             for slot in daily_slots.get(dt, []):
@@ -1250,7 +1509,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
             _unassign_slot(displaced, dt, slot)
             pstate[displaced]["missed"] += 1
 
-            assignments[dt][slot] = provider
+            _set_slot(dt, slot, provider)
             _assign_slot(provider, dt, slot)
 
             flags.append({
@@ -1264,47 +1523,60 @@ def assign_long_calls(daily_data, all_daily_data=None):
     # PHASE 3 + 3.5 with RETRY LOOP
     # --------------------------------------------------------
 
-    def _count_two_weekday_violations(asn):
+    def _count_two_weekday_violations():
         """Count two-weekday double violations in mixed stretches."""
         count = 0
-        for provider, pstretches in all_stretches.items():
-            for stretch in pstretches:
-                if is_standalone_weekend(stretch):
-                    continue
-                if not stretch_has_weekday_and_weekend(stretch):
-                    continue
-                lc_dates = []
-                for sdt in stretch:
-                    for sslot in ["teaching", "dc1", "dc2"]:
-                        if asn.get(sdt, {}).get(sslot) == provider:
-                            lc_dates.append(sdt)
-                if len(lc_dates) >= 2:
-                    weekday_lcs = [d for d in lc_dates if not is_weekend_or_holiday(d)]
-                    if len(weekday_lcs) >= 2:
-                        count += 1
+        for (provider, sid), held in lc_dates.items():
+            info = all_stretches.info[provider][sid]
+            if info["standalone"] or not info["mixed"]:
+                continue
+            if sum(held.values()) >= 2:
+                weekday_lcs = sum(n for d, n in held.items() if not is_weekend_or_holiday(d))
+                if weekday_lcs >= 2:
+                    count += 1
         return count
 
-    # Save state before Phase 3 for retry loop
-    _save_assignments = copy.deepcopy(assignments)
-    _save_pstate = copy.deepcopy(dict(pstate))
-    _save_flags = list(flags)
-
-    best_attempt = None
-    MAX_PHASE3_ATTEMPTS = 50
-
-    for _attempt in range(MAX_PHASE3_ATTEMPTS):
-        # Restore state to pre-Phase-3
-        if _attempt > 0:
-            assignments = copy.deepcopy(_save_assignments)
-            pstate = defaultdict(lambda: {
-                "lc_count": 0, "weekend_lc": 0, "dc1_count": 0, "dc2_count": 0,
-                "day_of_week": [], "missed": 0, "no_lc_weeks": 0, "doubles": 0,
-                "consecutive_no_lc": 0, "wknd_lc_stretches": set(),
-            })
-            for k, v in copy.deepcopy(_save_pstate).items():
-                pstate[k] = v
-            flags = list(_save_flags)
-
+    # Save state before Phase 3 for retry loop. An attempt is undone through
+    # its journal: the writes are reverted, and the providers they involve
+    # (the only ones Phase 3/3.5 change pstate for) get their saved entry back.
+    _save_pstate = {k: _copy_pstate(v) for k, v in pstate.items()}
+    _save_flag_count = len(flags)
+
+    def _journal_providers(entries):
+        """Providers assigned or unassigned by the journaled writes."""
+        providers = set()
+        for _, _, old, new in entries:
+            providers.update((old, new))
+        providers.discard(None)
+        return providers
+
+    def _rollback(entries):
+        """Restore the pre-Phase-3 state from an attempt's journal."""
+        for dt, slot, old, _ in reversed(entries):
+            _set_slot(dt, slot, old)
+        for provider in _journal_providers(entries):
+            if provider in _save_pstate:
+                pstate[provider] = _copy_pstate(_save_pstate[provider])
+            else:
+                pstate.pop(provider, None)
+        del flags[_save_flag_count:]
+
+    def _replay(result):
+        """Apply an attempt's result to the pre-Phase-3 state."""
+        for dt, slot, _, new in result["journal"]:
+            _set_slot(dt, slot, new)
+        for k, v in result["pstate"].items():
+            pstate[k] = v
+        flags.extend(result["flags"])
+
+    def _phase3_attempt(_attempt):
+        """
+        Run Phase 3 + 3.5 once on the pre-Phase-3 state, journaling the writes.
+        Returns the violations, the journal and copies of the pstate entries
+        and flags the attempt changed (enough to roll it back or replay it).
+        """
+        nonlocal journal
+        journal = []
         provider_double_dates = defaultdict(list)
 
         # Collect empty slots
@@ -1332,10 +1604,11 @@ def assign_long_calls(daily_data, all_daily_data=None):
             filler = find_double_filler(
                 dt, slot, daily_data, assignments, daily_slots,
                 pstate, weekends_worked, all_stretches,
-                pstate  # provider_wknd_lc_stretches lives inside pstate
+                pstate,  # provider_wknd_lc_stretches lives inside pstate
+                lc_dates,
             )
             if filler:
-                assignments[dt][slot] = filler
+                _set_slot(dt, slot, filler)
                 pstate[filler]["lc_count"] += 1
                 pstate[filler]["doubles"] += 1
                 pstate[filler]["day_of_week"].append(dt.weekday())
@@ -1368,13 +1641,13 @@ def assign_long_calls(daily_data, all_daily_data=None):
             for provider, pstretches in all_stretches.items():
                 if provider in EXCLUDED_PROVIDERS:
                     continue
-                for stretch in pstretches:
-                    if is_standalone_weekend(stretch):
+                for sid, stretch in enumerate(pstretches):
+                    if all_stretches.info[provider][sid]["standalone"]:
                         continue
                     lc_entries = []
-                    for sdt in stretch:
+                    for sdt in sorted(lc_dates.get((provider, sid), ())):
                         for sslot in ["teaching", "dc1", "dc2"]:
-                            if assignments.get(sdt, {}).get(sslot) == provider:
+                            if assignments[sdt][sslot] == provider:
                                 lc_entries.append((sdt, sslot))
                     if len(lc_entries) < 2:
                         continue
@@ -1456,8 +1729,8 @@ def assign_long_calls(daily_data, all_daily_data=None):
                     if swap_candidates:
                         _, _, wdt, wslot, occupant, wkdy_dt, wkdy_slot = swap_candidates[0]
                         if pstate[provider]["weekend_lc"] < 2:
-                            assignments[wkdy_dt][wkdy_slot] = occupant
-                            assignments[wdt][wslot] = provider
+                            _set_slot(wkdy_dt, wkdy_slot, occupant)
+                            _set_slot(wdt, wslot, provider)
                             pstate[provider]["weekend_lc"] += 1
                             pstate[occupant]["weekend_lc"] = max(0, pstate[occupant]["weekend_lc"] - 1)
                             fixed = True
@@ -1504,12 +1777,12 @@ def assign_long_calls(daily_data, all_daily_data=None):
 
                     reshuffle_options.sort()
                     for _, _, wdt, wslot, occupant, wkdy_dt, wkdy_slot in reshuffle_options:
-                        assignments[wkdy_dt][wkdy_slot] = None
+                        _set_slot(wkdy_dt, wkdy_slot, None)
                         pstate[provider]["lc_count"] -= 1
                         pstate[provider]["doubles"] = max(0, pstate[provider]["doubles"] - 1)
 
                         old_occupant = assignments[wdt][wslot]
-                        assignments[wdt][wslot] = provider
+                        _set_slot(wdt, wslot, provider)
                         pstate[provider]["weekend_lc"] += 1
                         pstate[provider]["lc_count"] += 1
 
@@ -1523,11 +1796,12 @@ def assign_long_calls(daily_data, all_daily_data=None):
 
                         new_filler = find_double_filler(
                             wkdy_dt, wkdy_slot, daily_data, assignments, daily_slots,
-                            pstate, weekends_worked, all_stretches, pstate
+                            pstate, weekends_worked, all_stretches, pstate,
+                            lc_dates,
                         )
 
                         if new_filler and new_filler != provider:
-                            assignments[wkdy_dt][wkdy_slot] = new_filler
+                            _set_slot(wkdy_dt, wkdy_slot, new_filler)
                             pstate[new_filler]["lc_count"] += 1
                             pstate[new_filler]["doubles"] += 1
                             if wkdy_slot == "dc1":
@@ -1540,11 +1814,11 @@ def assign_long_calls(daily_data, all_daily_data=None):
                             break
                         else:
                             # Revert
-                            assignments[wkdy_dt][wkdy_slot] = provider
+                            _set_slot(wkdy_dt, wkdy_slot, provider)
                             pstate[provider]["lc_count"] += 1
                             pstate[provider]["doubles"] += 1
 
-                            assignments[wdt][wslot] = old_occupant
+                            _set_slot(wdt, wslot, old_occupant)
                             pstate[provider]["weekend_lc"] -= 1
                             pstate[provider]["lc_count"] -= 1
 
@@ -1561,31 +1835,50 @@ def assign_long_calls(daily_data, all_daily_data=None):
                 break
 
         # Count violations for this attempt
-        violations = _count_two_weekday_violations(assignments)
-        if violations == 0:
-            best_attempt = None  # signal: use current state directly
-            break
-
-        attempt_state = {
+        violations = _count_two_weekday_violations()
+        attempt_journal, journal = journal, None
+        return {
             "violations": violations,
-            "assignments": copy.deepcopy(assignments),
-            "pstate": copy.deepcopy(dict(pstate)),
-            "flags": list(flags),
+            "journal": attempt_journal,
+            "pstate": {k: _copy_pstate(pstate[k]) for k in _journal_providers(attempt_journal)},
+            "flags": flags[_save_flag_count:],
         }
-        if best_attempt is None or violations < best_attempt["violations"]:
-            best_attempt = attempt_state
-
-    # Restore best attempt if no perfect solution
-    if best_attempt is not None:
-        assignments = best_attempt["assignments"]
-        pstate = defaultdict(lambda: {
-            "lc_count": 0, "weekend_lc": 0, "dc1_count": 0, "dc2_count": 0,
-            "day_of_week": [], "missed": 0, "no_lc_weeks": 0, "doubles": 0,
-            "consecutive_no_lc": 0, "wknd_lc_stretches": set(),
-        })
-        for k, v in best_attempt["pstate"].items():
-            pstate[k] = v
-        flags = best_attempt["flags"]
+
+    def _isolated_attempt(_attempt):
+        """_phase3_attempt() in a worker, rolled back so the next one starts clean."""
+        result = _phase3_attempt(_attempt)
+        _rollback(result["journal"])
+        return result
+
+    MAX_PHASE3_ATTEMPTS = 50
+
+    attempt = _phase3_attempt(0)
+    best_attempt = attempt
+    if attempt["violations"] and jobs > 1 and can_fork_workers():
+        # Retries side by side in forked workers; keep the serial choice:
+        # fewest violations, earliest attempt, none after the first with 0
+        _rollback(attempt["journal"])
+        attempt = None
+        results = run_attempts_parallel(
+            _isolated_attempt, range(1, MAX_PHASE3_ATTEMPTS), jobs)
+        for _attempt in sorted(results):
+            if results[_attempt]["violations"] < best_attempt["violations"]:
+                best_attempt = results[_attempt]
+    else:
+        for _attempt in range(1, MAX_PHASE3_ATTEMPTS):
+            if best_attempt["violations"] == 0:
+                break
+            # Restore state to pre-Phase-3
+            _rollback(attempt["journal"])
+            attempt = _phase3_attempt(_attempt)
+            if attempt["violations"] < best_attempt["violations"]:
+                best_attempt = attempt
+
+    # Restore best attempt if it is not the one in place
+    if best_attempt is not attempt:
+        if attempt is not None:
+            _rollback(attempt["journal"])
+        _replay(best_attempt)
 
     # --------------------------------------------------------
     # PHASE 4: Enforce max 1 missed week per provider
@@ -1593,21 +1886,17 @@ def assign_long_calls(daily_data, all_daily_data=None):
 
     def compute_missed_weeks(provider):
         """Count non-moonlighting real-stretch weeks with no LC for a provider."""
-        stretches = all_stretches.get(provider, [])
         missed_week_list = []
-        for stretch in stretches:
-            if is_standalone_weekend(stretch):
+        for sid, info in enumerate(all_stretches.info.get(provider, [])):
+            if info["standalone"]:
                 continue
-            weeks = split_stretch_into_weeks(stretch)
-            for week in weeks:
-                if is_moonlighting_in_stretch(provider, week, daily_data):
+            held = lc_dates.get((provider, sid), ())
+            for week in info["weeks"]:
+                if week["moonlighting"]:
                     continue
-                has_lc = any(
-                    assignments.get(dt, {}).get(slot) == provider
-                    for dt in week for slot in ["teaching", "dc1", "dc2"]
-                )
+                has_lc = any(dt in held for dt in week["dates"])
                 if not has_lc:
-                    missed_week_list.append(week)
+                    missed_week_list.append(week["dates"])
         return missed_week_list
 
     for _round in range(10):
@@ -1631,10 +1920,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
                 best_swap_score = None
 
                 for dt in week:
-                    if dt not in daily_data:
-                        continue
-                    working = any(p["provider"] == provider for p in daily_data[dt])
-                    if not working:
+                    if (provider, dt) not in daily_data.records:
                         continue
 
                     if is_weekend_or_holiday(dt) and pstate[provider]["weekend_lc"] >= 1:
@@ -1696,7 +1982,7 @@ def assign_long_calls(daily_data, all_daily_data=None):
 
                     _unassign_slot(displaced, dt, slot)
 
-                    assignments[dt][slot] = provider
+                    _set_slot(dt, slot, provider)
                     _assign_slot(provider, dt, slot)
 
                     flags.append({
@@ -1722,11 +2008,6 @@ def assign_long_calls(daily_data, all_daily_data=None):
             if a[slot]:
                 lc_assigned.add((dt, a[slot]))
 
-    source_days_set = set()
-    for dt, providers in daily_data.items():
-        for p in providers:
-            source_days_set.add((p["provider"], dt))
-
     weeks_worked = {}
     standalone_weekends_count = {}
     stretches_count = {}
@@ -1734,24 +2015,22 @@ def assign_long_calls(daily_data, all_daily_data=None):
     for provider in all_providers:
         if provider in EXCLUDED_PROVIDERS:
             continue
-        stretches = all_stretches.get(provider, [])
         total_weeks = 0
         total_standalone = 0
         total_stretches = 0
         total_no_lc = 0
-        for stretch in stretches:
-            if is_standalone_weekend(stretch):
-                if not is_moonlighting_in_stretch(provider, stretch, daily_data):
+        for info in all_stretches.info.get(provider, []):
+            if info["standalone"]:
+                if not info["moonlighting"]:
                     total_standalone += 1
             else:
                 total_stretches += 1
-                weeks = split_stretch_into_weeks(stretch)
-                for week in weeks:
-                    if is_moonlighting_in_stretch(provider, week, daily_data):
+                for week in info["weeks"]:
+                    if week["moonlighting"]:
                         continue
                     total_weeks += 1
-                    has_lc = any((dt, provider) in lc_assigned for dt in week)
-                    has_source = any((provider, dt) in source_days_set for dt in week)
+                    has_lc = any((dt, provider) in lc_assigned for dt in week["dates"])
+                    has_source = any((provider, dt) in daily_data.records for dt in week["dates"])
                     if not has_lc and has_source:
                         total_no_lc += 1
         weeks_worked[provider] = total_weeks
@@ -3,6 +3,12 @@
 Parse Amion HTML schedule(s) into structured data.
 Extracts provider assignments by date and service, including moonlighting flags.
 Supports multiple input files (one per month) and consolidates output.
+
+Two backends drive the same AmionScheduleParser state machine:
+  - "fast": a single-regex tokenizer specialised to Amion's markup
+  - "htmlparser": the standard library HTMLParser
+parse_schedule() uses the fast path and falls back to HTMLParser for any
+page containing markup the tokenizer does not handle.
 """
 
 import re
@@ -11,9 +17,14 @@ import csv
 import sys
 import os
 import glob
+from html import unescape
 from html.parser import HTMLParser
 from collections import defaultdict
 
+_DATE_CELL_RE = re.compile(r'(Sun|Mon|Tue|Wed|Thu|Fri|Sat)\s+(\d+/\d+)')
+_TRAILING_FOOTNOTE_RE = re.compile(r'\s*\d+\s*$')
+_WHITESPACE_RE = re.compile(r'\s+')
+
 
 class AmionScheduleParser(HTMLParser):
     def __init__(self):
@@ -39,6 +50,7 @@ class AmionScheduleParser(HTMLParser):
         self.header_row_index = None
         self.schedule_table_found = False
         self.year = None  # extracted from title
+        self.provider_names = {}  # cell text -> cleaned provider name
 
     def handle_starttag(self, tag, attrs):
         attrs_dict = dict(attrs)
@@ -147,7 +159,7 @@ class AmionScheduleParser(HTMLParser):
                 self._parse_header(cells)
                 return
 
-        date_match = re.match(r'(Sun|Mon|Tue|Wed|Thu|Fri|Sat)\s+(\d+/\d+)', first_cell)
+        date_match = _DATE_CELL_RE.match(first_cell)
         if date_match and self.services:
             self._parse_data_row(cells, date_match)
 
@@ -187,11 +199,14 @@ class AmionScheduleParser(HTMLParser):
 
             if provider_text == "-" or provider_text == "":
                 provider = ""
+            elif provider_text in self.provider_names:
+                provider = self.provider_names[provider_text]
             else:
                 # Remove trailing footnote numbers
-                provider = re.sub(r'\s*\d+\s*$', '', provider_text).strip()
+                provider = _TRAILING_FOOTNOTE_RE.sub('', provider_text).strip()
                 # Also clean up double spaces
-                provider = re.sub(r'\s+', ' ', provider)
+                provider = _WHITESPACE_RE.sub(' ', provider)
+                self.provider_names[provider_text] = provider
 
             assignment = {
                 "service": service["name"],
@@ -212,6 +227,183 @@ class AmionScheduleParser(HTMLParser):
         })
 
 
+# ---------------------------------------------------------------------------
+# Fast tokenizer backend
+# ---------------------------------------------------------------------------
+
+class FastPathUnsupported(Exception):
+    """The page has markup the fast tokenizer does not reproduce exactly."""
+
+
+# Tags AmionScheduleParser reacts to (plus raw-text elements and comments);
+# every other tag only separates text runs.
+_FAST_TOKEN_RE = re.compile(
+    r'<(?:!--.*?-->'
+    r'|(/?)(table|tr|td|font|img|br|script|style)(?=[\s/>])'
+    r'((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>)',
+    re.I | re.S,
+)
+_OTHER_MARKUP_RE = re.compile(
+    r'<(?:!--.*?-->|[!?][^>]*>'
+    r'|/?[a-zA-Z][^\t\n\r\f />\x00]*(?:[^>"\']|"[^"]*"|\'[^\']*\')*>)',
+    re.S,
+)
+# "<td a=b/>": HTMLParser may read the "/" as part of the attribute value
+_UNQUOTED_SLASH_RE = re.compile(r'=\s*[^\s\'"=>]*/$')
+_ATTR_RE = re.compile(
+    r'([^\s/>][^\s/=>]*)(?:\s*=+\s*(\'[^\']*\'|"[^"]*"|(?![\'"])[^>\s]*))?')
+
+
+def _parse_attrs(text):
+    attrs = {}
+    for name, value in _ATTR_RE.findall(text):
+        if value[:1] in ("'", '"') and value[:1] == value[-1:]:
+            value = value[1:-1]
+        if "&" in value:
+            value = unescape(value)
+        attrs.setdefault(name.lower(), value)
+    return attrs
+
+
+def _split_markup(text):
+    """Split a run of raw HTML on the tags the tokenizer skips over.
+
+    Raises FastPathUnsupported if a "<" is left that HTMLParser would read
+    as the start of a (possibly bogus) tag rather than as text.
+    """
+    if "<" not in text:
+        return (text,)
+    pieces = _OTHER_MARKUP_RE.split(text)
+    if any("<" in piece for piece in pieces):
+        raise FastPathUnsupported("stray '<' in text")
+    return pieces
+
+
+def _cell_text(text):
+    """Text HTMLParser would hand to handle_data for a run of raw HTML."""
+    return "".join(unescape(p) if "&" in p else p for p in _split_markup(text))
+
+
+def fast_parse(parser, html):
+    """Drive an AmionScheduleParser over html without HTMLParser.
+
+    A specialised tokenizer for Amion's border="1" schedule table: one regex
+    pass visits only the tags the state machine reacts to and reproduces
+    its callbacks inline. Rows go through the parser's own _process_row(),
+    so headers and assignments are built by the same code as the
+    HTMLParser backend.
+
+    Raises:
+        FastPathUnsupported: markup whose HTMLParser handling the tokenizer
+            does not reproduce (stray "<" in text, unterminated
+            script/style, "/>" after an unquoted attribute value) — use
+            the HTMLParser backend instead.
+    """
+    in_table = False
+    in_row = False
+    in_cell = False
+    footnote = False
+    cells = []
+    text_parts = []
+    flags = None
+    pos = 0
+    tokens = _FAST_TOKEN_RE.finditer(html)
+
+    while True:
+        m = next(tokens, None)
+        end = len(html) if m is None else m.start()
+        if end > pos:
+            text = html[pos:end]
+            if in_cell and in_table and not footnote:
+                if "<" in text or "&" in text:
+                    text = _cell_text(text)
+                text_parts.append(text)
+            elif "<" in text:
+                _split_markup(text)
+        if m is None:
+            break
+        pos = m.end()
+
+        closing, tag, rest = m.groups()
+        if tag is None:
+            continue  # comment
+        tag = tag.lower()
+
+        if not closing:
+            # ── start tag ──
+            if tag == "table":
+                parser.table_count += 1
+                if _parse_attrs(rest).get("border") == "1":
+                    in_table = parser.in_table = True
+                    parser.schedule_table_found = True
+                    parser.row_count = 0
+            elif not in_table:
+                pass
+            elif tag == "tr":
+                in_row = True
+                cells = []
+            elif tag == "td":
+                in_cell = True
+                text_parts = []
+                flags = {"moonlighting": False, "note": "", "telehealth": False}
+            elif not in_cell:
+                pass
+            elif tag == "font":
+                style = _parse_attrs(rest).get("style") or ""
+                footnote = "font-size" in style and ("8px" in style or "7px" in style
+                                                     or "6px" in style)
+            elif tag == "img":
+                attrs = _parse_attrs(rest)
+                src = attrs.get("src") or ""
+                if "xpay_dull" in src:
+                    flags["moonlighting"] = True
+                elif "pnote2" in src or "pnohu4" in src:
+                    flags["note"] = attrs.get("title") or ""
+                elif "telehealth" in src:
+                    flags["telehealth"] = True
+            elif tag == "br":
+                text_parts.append("\n")
+
+            # Raw-text elements: their content is text, not markup
+            if tag in ("script", "style") and not rest.endswith("/"):
+                close = re.compile(r'</%s\s*>' % tag, re.I).search(html, pos)
+                if close is None:
+                    raise FastPathUnsupported(f"unterminated <{tag}>")
+                if in_cell and in_table and not footnote:
+                    text_parts.append(html[pos:close.start()])
+                pos = close.end()
+                tokens = _FAST_TOKEN_RE.finditer(html, pos)
+
+            # A self-closing tag gets HTMLParser's start and end callbacks
+            if not rest.endswith("/"):
+                continue
+            if _UNQUOTED_SLASH_RE.search(rest):
+                raise FastPathUnsupported(f"ambiguous self-closing <{tag}>")
+
+        # ── end tag ──
+        if not in_table:
+            continue
+        if tag == "font":
+            if in_cell:
+                footnote = False
+        elif tag == "td":
+            if in_cell:
+                in_cell = False
+                cells.append({
+                    "text": "".join(text_parts).strip().replace("\xa0", " ").strip(),
+                    "flags": flags,
+                })
+        elif tag == "tr":
+            if in_row:
+                in_row = False
+                parser.row_count += 1
+                parser._process_row(cells)
+        elif tag == "table":
+            in_table = False
+
+    parser.in_table = in_table
+
+
 def extract_year_from_html(html):
     """Try to extract the year from the schedule title."""
     match = re.search(r'(\d+/\d+)\s+to\s+\d+/\d+,\s+(\d{4})', html)
@@ -220,16 +412,39 @@ def extract_year_from_html(html):
     return None
 
 
-def parse_schedule(html_file):
-    """Parse a single HTML file and return structured schedule data."""
-    with open(html_file, 'r', encoding='utf-8', errors='replace') as f:
-        html = f.read()
+BACKENDS = ("fast", "htmlparser")
+
+
+def parse_html(html, backend="fast"):
+    """Run AmionScheduleParser over html with the given backend.
 
+    The "fast" backend falls back to HTMLParser when the page has markup
+    it does not handle. Returns the finished parser.
+    """
     year = extract_year_from_html(html)
 
     parser = AmionScheduleParser()
     parser.year = year
+    if backend == "fast":
+        try:
+            fast_parse(parser, html)
+            return parser
+        except FastPathUnsupported:
+            parser = AmionScheduleParser()
+            parser.year = year
+    elif backend != "htmlparser":
+        raise ValueError(f"Unknown parser backend: {backend}")
     parser.feed(html)
+    return parser
+
+
+def parse_schedule(html_file, backend="fast"):
+    """Parse a single HTML file and return structured schedule data."""
+    with open(html_file, 'r', encoding='utf-8', errors='replace') as f:
+        html = f.read()
+
+    parser = parse_html(html, backend)
+    year = parser.year
 
     return {
         "source_file": os.path.basename(html_file),
@@ -398,12 +613,15 @@ if __name__ == "__main__":
         print("No input files found in", input_dir)
         sys.exit(1)
 
-    all_month_data = []
+    # Months stream into the compact row store; only one parsed month is
+    # held at a time
+    from schedule_store import ScheduleStore
+    store = ScheduleStore()
 
     for f in input_files:
         print(f"\nParsing: {os.path.basename(f)}")
         month_data = parse_schedule(f)
-        all_month_data.append(month_data)
+        store.append_month(month_data)
 
         # Write per-month output
         base = os.path.splitext(os.path.basename(f))[0]
@@ -411,12 +629,17 @@ if __name__ == "__main__":
         write_csv(month_data, os.path.join(output_dir, f"{base}.csv"))
 
     # Merge all months
-    merged = merge_schedules(all_month_data)
+    merged = store.to_merged()
 
     # Write consolidated outputs
     write_json(merged, os.path.join(output_dir, "all_months_schedule.json"))
     write_csv(merged, os.path.join(output_dir, "all_months_schedule.csv"))
     write_provider_csv(merged, os.path.join(output_dir, "all_months_by_provider.csv"))
 
+    # Written last: readers prefer the store only when it is not older than the JSON
+    store_file = os.path.join(output_dir, "all_months_schedule.bin")
+    store.save(store_file)
+    print(f"  Wrote store: {store_file}")
+
     # Print summary
     print_summary(merged)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Parse-once corpus of monthly Amion schedule HTML files.
+
+Several tools read the same monthly schedules: the V3 pre-scheduler (prior
+actuals, holiday workers, Block 3 retrospective), analysis/validate_block3.py
+and block/recalculate_prior_actuals.py. Each used to run parse_schedule() and
+merge_schedules() on every file itself. This module parses each file once:
+
+  - parse_month() caches the parse_schedule() result on disk, keyed by the
+    SHA-256 of the file contents, and in memory for the rest of the process.
+  - merged_schedule() memoizes merge_schedules() over a set of months.
+  - assignment_rows() serves flat, pre-classified assignment rows with the
+    HTML provider name already cleaned and resolved to its canonical form.
+
+Returned structures are shared between callers — treat them as read-only.
+Bump PARSER_VERSION when parse_schedule() changes what it returns.
+
+Usage:
+    from schedule_corpus import load_months, merged_schedule, assignment_rows
+
+    rows = assignment_rows(schedules_dir, PRIOR_FILES, classify_service)
+
+    # Pre-warm or inspect the on-disk cache
+    python schedule_corpus.py input/2025-06.html input/2025-07.html
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import time
+from datetime import date
+
+from parse_schedule import parse_schedule, merge_schedules
+from name_match import to_canonical, clean_html_provider
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".cache", "schedule_corpus")
+PARSER_VERSION = 1
+
+# In-process memos
+_digests = {}   # abspath -> ((size, mtime_ns), sha256)
+_months = {}    # sha256 -> parsed month
+_merged = {}    # tuple of sha256 -> merged schedule
+_rows = {}      # (tuple of sha256, classifier, by_hours) -> rows
+
+
+# ---------------------------------------------------------------------------
+# Per-file parse cache
+# ---------------------------------------------------------------------------
+
+def file_digest(path):
+    """SHA-256 of a file, re-hashed only when its size or mtime changes."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _digests.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _digests[path] = (stamp, digest)
+    return digest
+
+
+def _cache_path(digest, cache_dir):
+    return os.path.join(cache_dir, f"v{PARSER_VERSION}_{digest}.pkl")
+
+
+def parse_month(path, cache_dir=CACHE_DIR):
+    """parse_schedule(path), served from the memory or disk cache when possible.
+
+    Args:
+        path: monthly Amion HTML file
+        cache_dir: on-disk cache directory, or None to skip the disk cache
+    """
+    digest = file_digest(path)
+    month_data = _months.get(digest)
+    if month_data is not None:
+        # Identical content under another name keeps its own source_file
+        return dict(month_data, source_file=os.path.basename(path))
+
+    if cache_dir:
+        try:
+            with open(_cache_path(digest, cache_dir), "rb") as f:
+                month_data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            month_data = None
+
+    if month_data is None:
+        month_data = parse_schedule(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_path = _cache_path(digest, cache_dir)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(month_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+
+    _months[digest] = month_data
+    return dict(month_data, source_file=os.path.basename(path))
+
+
+def load_months(schedules_dir, filenames, cache_dir=CACHE_DIR):
+    """Parse the files in filenames that exist in schedules_dir, in order.
+
+    Returns:
+        list of (filename, month_data); missing files are left out
+    """
+    months = []
+    for fname in filenames:
+        fpath = os.path.join(schedules_dir, fname)
+        if os.path.exists(fpath):
+            months.append((fname, parse_month(fpath, cache_dir)))
+    return months
+
+
+def _corpus_key(schedules_dir, filenames):
+    return tuple(file_digest(os.path.join(schedules_dir, f)) for f in filenames
+                 if os.path.exists(os.path.join(schedules_dir, f)))
+
+
+# ---------------------------------------------------------------------------
+# Merged views
+# ---------------------------------------------------------------------------
+
+def merged_schedule(schedules_dir, filenames, cache_dir=CACHE_DIR):
+    """merge_schedules() over the existing files, memoized per file set.
+
+    Returns:
+        merged dict as from merge_schedules(), or None if no file exists
+    """
+    key = _corpus_key(schedules_dir, filenames)
+    if not key:
+        return None
+    if key not in _merged:
+        _merged[key] = merge_schedules(
+            [m for _, m in load_months(schedules_dir, filenames, cache_dir)])
+    return _merged[key]
+
+
+def _parse_date(date_str):
+    """Parse the M/D/YYYY date strings parse_schedule() produces."""
+    try:
+        parts = date_str.split("/")
+        if len(parts) == 3:
+            return date(int(parts[2]), int(parts[0]), int(parts[1]))
+    except (ValueError, IndexError):
+        pass
+    return None
+
+
+def assignment_rows(schedules_dir, filenames, classify, by_hours=False,
+                    cache_dir=CACHE_DIR):
+    """Flat assignment rows for every named provider in the schedules.
+
+    Rows whose HTML name cleans to nothing (OPEN SHIFT, residents, blanks)
+    are dropped; moonlighting and excluded shifts are kept and flagged so
+    each caller applies its own filters.
+
+    Args:
+        schedules_dir: directory with the monthly HTML files
+        filenames: monthly files to include, in order
+        classify: classify_service(service_name, hours) function
+        by_hours: classify each row by its own hours instead of the hours of
+            the service's first appearance in the merged schedule
+
+    Returns:
+        list of dicts: date_str, date (date or None), day_of_week,
+        is_weekend, service, hours, service_class, html_provider,
+        provider (cleaned), canonical, moonlighting, telehealth, note
+    """
+    merged = merged_schedule(schedules_dir, filenames, cache_dir)
+    if merged is None:
+        return []
+    key = (_corpus_key(schedules_dir, filenames), classify, by_hours)
+    if key in _rows:
+        return _rows[key]
+
+    service_classes = {s["name"]: classify(s["name"], s["hours"])
+                       for s in merged["services"]}
+    hour_classes = {}
+    names = {}
+
+    rows = []
+    for day in merged["schedule"]:
+        date_str = day["date"]
+        d = _parse_date(date_str)
+        dow = day["day_of_week"]
+        for a in day["assignments"]:
+            raw = a["provider"]
+            if not raw:
+                continue
+            if raw not in names:
+                cleaned = clean_html_provider(raw)
+                names[raw] = (cleaned, to_canonical(cleaned) if cleaned else "")
+            cleaned, canonical = names[raw]
+            if not cleaned:
+                continue
+
+            service = a["service"]
+            if by_hours:
+                hk = (service, a["hours"])
+                if hk not in hour_classes:
+                    hour_classes[hk] = classify(service, a["hours"])
+                svc_class = hour_classes[hk]
+            else:
+                svc_class = service_classes.get(service, "day")
+
+            rows.append({
+                "date_str": date_str,
+                "date": d,
+                "day_of_week": dow,
+                "is_weekend": dow in ("Sat", "Sun"),
+                "service": service,
+                "hours": a["hours"],
+                "service_class": svc_class,
+                "html_provider": raw,
+                "provider": cleaned,
+                "canonical": canonical,
+                "moonlighting": a["moonlighting"],
+                "telehealth": a["telehealth"],
+                "note": a.get("note", ""),
+            })
+
+    _rows[key] = rows
+    return rows
+
+
+def clear_memory_cache():
+    """Forget in-process results (the on-disk cache is kept)."""
+    _digests.clear()
+    _months.clear()
+    _merged.clear()
+    _rows.clear()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main(paths):
+    if not paths:
+        print("Usage: python schedule_corpus.py FILE.html [FILE.html ...]")
+        return 1
+    for path in paths:
+        t0 = time.perf_counter()
+        month = parse_month(path)
+        print(f"  {os.path.basename(path)}: {len(month['schedule'])} days, "
+              f"{len(month['services'])} services ({time.perf_counter() - t0:.3f}s)")
+    print(f"Cache: {CACHE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
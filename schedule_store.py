@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Compact, typed store for merged Amion schedules.
+
+merge_schedules() builds one large dict per run (every assignment as a dict,
+plus a by_provider copy of each shift), and write_json() saves it as
+indented JSON that consumers reload in full. This module keeps the same
+data as integer-coded columns instead:
+
+  - providers, notes and (service, hours) pairs are interned into string
+    tables; each assignment is one row of array-backed columns
+    (day, service, provider, note, flags)
+  - months are appended one at a time, so a fiscal year can be built while
+    holding only one parsed month in memory
+  - the binary file keeps each column contiguous with a per-day row index,
+    so load(start=..., end=...) reads only the rows for that date range
+
+to_merged() rebuilds exactly what merge_schedules() returns.
+
+Usage:
+    from schedule_store import ScheduleStore, build_store
+
+    store = build_store(sorted(glob.glob("input/*.html")))
+    store.save("output/all_months_schedule.bin")
+    block = ScheduleStore.load("output/all_months_schedule.bin",
+                               start=date(2026, 3, 2), end=date(2026, 6, 28))
+
+    # Load time and peak memory: JSON vs store
+    python schedule_store.py compare output/all_months_schedule.json output/all_months_schedule.bin
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import defaultdict
+from datetime import date
+
+from parse_schedule import parse_schedule
+
+MAGIC = b"AMSCHED1\n"
+STORE_VERSION = 1
+
+_MOONLIGHTING = 1
+_TELEHEALTH = 2
+
+# Column name -> array typecode, in on-disk order
+_COLUMNS = (("day", "I"), ("service", "I"), ("provider", "I"), ("note", "I"), ("flags", "B"))
+
+
+def _date_ordinal(date_str):
+    """Ordinal of an M/D/YYYY date string, or 0 when it has no year."""
+    try:
+        parts = date_str.split("/")
+        if len(parts) == 3:
+            return date(int(parts[2]), int(parts[0]), int(parts[1])).toordinal()
+    except (ValueError, IndexError):
+        pass
+    return 0
+
+
+class ScheduleRow:
+    """One assignment, decoded from the store."""
+
+    __slots__ = ("date", "day_of_week", "ordinal", "service", "hours",
+                 "provider", "moonlighting", "telehealth", "note")
+
+    def __init__(self, date, day_of_week, ordinal, service, hours,
+                 provider, moonlighting, telehealth, note):
+        self.date = date
+        self.day_of_week = day_of_week
+        self.ordinal = ordinal
+        self.service = service
+        self.hours = hours
+        self.provider = provider
+        self.moonlighting = moonlighting
+        self.telehealth = telehealth
+        self.note = note
+
+
+class ScheduleStore:
+    """Integer-coded rows for a merged multi-month schedule."""
+
+    def __init__(self):
+        self.services = []                 # merged service list (first wins by name)
+        self._service_names = set()
+        self.providers = [""]              # provider id -> name ("" = unassigned)
+        self.notes = [""]                  # note id -> text ("" = no note)
+        self.service_keys = []             # service id -> (name, hours)
+        self.days = []                     # day id -> (date_str, day_of_week, ordinal)
+        self.day_offsets = array("I", [0])  # rows of day i: day_offsets[i]:day_offsets[i+1]
+        self.columns = {name: array(code) for name, code in _COLUMNS}
+        self._provider_ids = {"": 0}
+        self._note_ids = {"": 0}
+        self._service_ids = {}
+
+    def __len__(self):
+        return len(self.columns["day"])
+
+    # ── building ──
+
+    def _intern(self, table, ids, value):
+        idx = ids.get(value)
+        if idx is None:
+            idx = ids[value] = len(table)
+            table.append(value)
+        return idx
+
+    def append_month(self, month_data):
+        """Append one parse_schedule() result, with merge_schedules() semantics."""
+        for s in month_data["services"]:
+            if s["name"] not in self._service_names:
+                self._service_names.add(s["name"])
+                self.services.append(s)
+
+        col_day = self.columns["day"]
+        col_service = self.columns["service"]
+        col_provider = self.columns["provider"]
+        col_note = self.columns["note"]
+        col_flags = self.columns["flags"]
+
+        for day in month_data["schedule"]:
+            day_id = len(self.days)
+            self.days.append((day["date"], day["day_of_week"], _date_ordinal(day["date"])))
+            for a in day["assignments"]:
+                col_day.append(day_id)
+                col_service.append(self._intern(
+                    self.service_keys, self._service_ids, (a["service"], a["hours"])))
+                col_provider.append(self._intern(self.providers, self._provider_ids, a["provider"]))
+                col_note.append(self._intern(self.notes, self._note_ids, a.get("note", "")))
+                col_flags.append((_MOONLIGHTING if a["moonlighting"] else 0)
+                                 | (_TELEHEALTH if a["telehealth"] else 0))
+            self.day_offsets.append(len(col_day))
+
+    # ── reading ──
+
+    def _assignment(self, r):
+        name, hours = self.service_keys[self.columns["service"][r]]
+        flags = self.columns["flags"][r]
+        a = {
+            "service": name,
+            "hours": hours,
+            "provider": self.providers[self.columns["provider"][r]],
+            "moonlighting": bool(flags & _MOONLIGHTING),
+            "telehealth": bool(flags & _TELEHEALTH),
+        }
+        note = self.columns["note"][r]
+        if note:
+            a["note"] = self.notes[note]
+        return a
+
+    def iter_days(self):
+        """Yield parse_schedule()-style day entries, one at a time."""
+        for day_id, (date_str, dow, _) in enumerate(self.days):
+            yield {
+                "date": date_str,
+                "day_of_week": dow,
+                "assignments": [self._assignment(r) for r in
+                                range(self.day_offsets[day_id], self.day_offsets[day_id + 1])],
+            }
+
+    def rows(self):
+        """Yield every assignment as a ScheduleRow."""
+        col_day = self.columns["day"]
+        col_service = self.columns["service"]
+        col_provider = self.columns["provider"]
+        col_note = self.columns["note"]
+        col_flags = self.columns["flags"]
+        for r in range(len(col_day)):
+            date_str, dow, ordinal = self.days[col_day[r]]
+            name, hours = self.service_keys[col_service[r]]
+            flags = col_flags[r]
+            yield ScheduleRow(date_str, dow, ordinal, name, hours,
+                              self.providers[col_provider[r]],
+                              bool(flags & _MOONLIGHTING), bool(flags & _TELEHEALTH),
+                              self.notes[col_note[r]])
+
+    def to_merged(self):
+        """The dict merge_schedules() would return for the appended months."""
+        schedule = list(self.iter_days())
+        by_provider = defaultdict(list)
+        for day in schedule:
+            for a in day["assignments"]:
+                if a["provider"] and a["provider"] != "OPEN SHIFT":
+                    by_provider[a["provider"]].append({
+                        "date": day["date"],
+                        "day_of_week": day["day_of_week"],
+                        "service": a["service"],
+                        "hours": a["hours"],
+                        "moonlighting": a["moonlighting"],
+                        "telehealth": a["telehealth"],
+                        "note": a.get("note", ""),
+                    })
+        return {
+            "services": list(self.services),
+            "schedule": schedule,
+            "by_provider": dict(by_provider),
+        }
+
+    # ── persistence ──
+
+    def save(self, path):
+        """Write the store atomically: header JSON, then each column's bytes."""
+        header = {
+            "version": STORE_VERSION,
+            "byteorder": sys.byteorder,
+            "n_rows": len(self),
+            "services": self.services,
+            "providers": self.providers,
+            "notes": self.notes,
+            "service_keys": self.service_keys,
+            "days": self.days,
+            "day_offsets": self.day_offsets.tolist(),
+            "columns": [[name, code] for name, code in _COLUMNS],
+        }
+        blob = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(blob)))
+            f.write(blob)
+            for name, _ in _COLUMNS:
+                self.columns[name].tofile(f)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path, start=None, end=None):
+        """Load a saved store, optionally only the days in [start, end].
+
+        With a date range, only the matching rows are read from disk; days
+        whose date has no year are left out.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a schedule store: {path}")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            if header["version"] != STORE_VERSION:
+                raise ValueError(f"Unsupported schedule store version {header['version']}")
+            data_start = f.tell()
+
+            store = cls()
+            store.services = header["services"]
+            store._service_names = {s["name"] for s in store.services}
+            store.providers = header["providers"]
+            store.notes = header["notes"]
+            store.service_keys = [tuple(k) for k in header["service_keys"]]
+            store._provider_ids = {p: i for i, p in enumerate(store.providers)}
+            store._note_ids = {n: i for i, n in enumerate(store.notes)}
+            store._service_ids = {k: i for i, k in enumerate(store.service_keys)}
+
+            days = [tuple(d) for d in header["days"]]
+            offsets = header["day_offsets"]
+            n_rows = header["n_rows"]
+            swap = header["byteorder"] != sys.byteorder
+
+            lo = start.toordinal() if start is not None else None
+            hi = end.toordinal() if end is not None else None
+            if lo is None and hi is None:
+                selected = list(range(len(days)))
+            else:
+                selected = [i for i, (_, _, o) in enumerate(days)
+                            if o and (lo is None or o >= lo) and (hi is None or o <= hi)]
+
+            # Contiguous row runs covering the selected days
+            runs = []
+            for i in selected:
+                r0, r1 = offsets[i], offsets[i + 1]
+                if runs and runs[-1][1] == r0:
+                    runs[-1][1] = r1
+                elif r1 > r0:
+                    runs.append([r0, r1])
+
+            col_pos = data_start
+            for name, code in header["columns"]:
+                col = array(code)
+                for r0, r1 in runs:
+                    f.seek(col_pos + r0 * col.itemsize)
+                    col.fromfile(f, r1 - r0)
+                if swap:
+                    col.byteswap()
+                store.columns[name] = col
+                col_pos += n_rows * col.itemsize
+
+        # Re-number the kept days
+        remap = {}
+        store.days = []
+        store.day_offsets = array("I", [0])
+        total = 0
+        for i in selected:
+            remap[i] = len(store.days)
+            store.days.append(days[i])
+            total += offsets[i + 1] - offsets[i]
+            store.day_offsets.append(total)
+        if len(selected) != len(days):
+            store.columns["day"] = array("I", (remap[d] for d in store.columns["day"]))
+        return store
+
+
+def build_store(html_files):
+    """Parse monthly HTML files one at a time into a new store."""
+    store = ScheduleStore()
+    for path in html_files:
+        store.append_month(parse_schedule(path))
+    return store
+
+
+def load_schedule_file(path, start=None, end=None):
+    """Merged-schedule dict from a .json or store file.
+
+    A store is read lazily for the date range and returned with only the
+    "services" and "schedule" keys; JSON is read whole, as before.
+    """
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+    store = ScheduleStore.load(path, start, end)
+    return {"services": store.services, "schedule": list(store.iter_days())}
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _measure(fn):
+    """Run fn once, returning (result, seconds, peak traced bytes)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == "build":
+        out, files = argv[1], argv[2:]
+        t0 = time.perf_counter()
+        store = build_store(files)
+        store.save(out)
+        print(f"Stored {len(store)} assignments over {len(store.days)} days "
+              f"from {len(files)} files in {time.perf_counter() - t0:.2f}s -> {out} "
+              f"({os.path.getsize(out) / 1e6:.2f} MB)")
+        return 0
+    if len(argv) == 3 and argv[0] == "compare":
+        json_path, store_path = argv[1], argv[2]
+        loaded, json_s, json_peak = _measure(lambda: load_schedule_file(json_path))
+        store, store_s, store_peak = _measure(lambda: ScheduleStore.load(store_path))
+        days = [d for _, _, d in store.days if d]
+        mid = date.fromordinal(days[len(days) // 2]) if days else None
+        ranged, range_s, range_peak = _measure(
+            lambda: ScheduleStore.load(store_path, start=mid, end=mid))
+        print(f"{'Source':<22} {'Size':>9} {'Load time':>10} {'Peak memory':>12}")
+        print(f"{'JSON':<22} {os.path.getsize(json_path) / 1e6:>7.2f}MB "
+              f"{json_s * 1000:>8.1f}ms {json_peak / 1e6:>10.2f}MB")
+        print(f"{'store (all days)':<22} {os.path.getsize(store_path) / 1e6:>7.2f}MB "
+              f"{store_s * 1000:>8.1f}ms {store_peak / 1e6:>10.2f}MB")
+        print(f"{'store (one day)':<22} {'':>9} {range_s * 1000:>8.1f}ms {range_peak / 1e6:>10.2f}MB")
+        same = store.to_merged() == loaded
+        print(f"Identical merged schedule: {same}")
+        return 0 if same else 1
+    print("Usage:\n"
+          "  python schedule_store.py build OUT.bin FILE.html [FILE.html ...]\n"
+          "  python schedule_store.py compare all_months_schedule.json all_months_schedule.bin")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))